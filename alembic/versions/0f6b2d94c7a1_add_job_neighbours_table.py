@@ -0,0 +1,37 @@
+"""add job neighbours table
+
+Revision ID: 0f6b2d94c7a1
+Revises: e5d83a1f6c90
+Create Date: 2025-06-16 10:27:33.640182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0f6b2d94c7a1'
+down_revision: Union[str, None] = 'e5d83a1f6c90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('job_likes', sa.Column('created_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'),
+                                         nullable=False))
+    op.create_table('job_neighbours',
+    sa.Column('job_uid', sa.Uuid(), nullable=False),
+    sa.Column('neighbour_uids', postgresql.ARRAY(postgresql.UUID(as_uuid=True)), nullable=False),
+    sa.Column('scores', postgresql.ARRAY(postgresql.REAL()), nullable=False),
+    sa.Column('computed_at', postgresql.TIMESTAMP(), nullable=False),
+    sa.ForeignKeyConstraint(['job_uid'], ['jobs.uid'], ),
+    sa.PrimaryKeyConstraint('job_uid')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_neighbours')
+    op.drop_column('job_likes', 'created_at')
@@ -0,0 +1,30 @@
+"""add cover letter terms to applications
+
+Revision ID: 3d7c1a9e5f62
+Revises: 5b0e2f7a9c14
+Create Date: 2025-07-08 09:41:17.204318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3d7c1a9e5f62'
+down_revision: Union[str, None] = '5b0e2f7a9c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # existing applications are packed by `python -m app.applications.relevance`, until then they are
+    # tokenized when their job is ranked
+    op.add_column('applications', sa.Column('cover_letter_terms', postgresql.BYTEA(), nullable=True))
+    op.add_column('applications', sa.Column('cover_letter_length', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('applications', 'cover_letter_length')
+    op.drop_column('applications', 'cover_letter_terms')
@@ -0,0 +1,39 @@
+"""add attachment text search
+
+Revision ID: 5b0e2f7a9c14
+Revises: a9e41c6d3b82
+Create Date: 2025-07-04 11:08:43.926157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0e2f7a9c14'
+down_revision: Union[str, None] = 'a9e41c6d3b82'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('attachments', sa.Column('text', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.add_column('attachments', sa.Column('extraction_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.add_column('attachments', sa.Column('extracted_at', postgresql.TIMESTAMP(), nullable=True))
+    op.create_index('ix_attachments_pending_extraction', 'attachments', ['created_at'], unique=False,
+                    postgresql_where=sa.text('extracted_at IS NULL'))
+    op.add_column('applications', sa.Column('resume_vector', postgresql.TSVECTOR(), nullable=True))
+    op.create_index('ix_applications_resume_vector', 'applications', ['resume_vector'], unique=False,
+                    postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_applications_resume_vector', table_name='applications', postgresql_using='gin')
+    op.drop_column('applications', 'resume_vector')
+    op.drop_index('ix_attachments_pending_extraction', table_name='attachments')
+    op.drop_column('attachments', 'extracted_at')
+    op.drop_column('attachments', 'extraction_error')
+    op.drop_column('attachments', 'text')
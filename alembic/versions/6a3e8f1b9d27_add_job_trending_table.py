@@ -0,0 +1,40 @@
+"""add job trending table
+
+Revision ID: 6a3e8f1b9d27
+Revises: 0f6b2d94c7a1
+Create Date: 2025-06-20 13:52:18.902774
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '6a3e8f1b9d27'
+down_revision: Union[str, None] = '0f6b2d94c7a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('job_trending',
+    sa.Column('job_uid', sa.Uuid(), nullable=False),
+    sa.Column('log_score', postgresql.DOUBLE_PRECISION(), nullable=False),
+    sa.ForeignKeyConstraint(['job_uid'], ['jobs.uid'], ),
+    sa.PrimaryKeyConstraint('job_uid')
+    )
+    op.create_index(op.f('ix_job_trending_log_score'), 'job_trending', ['log_score'], unique=False)
+    op.create_table('trending_settings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('half_life_hours', postgresql.DOUBLE_PRECISION(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('trending_settings')
+    op.drop_index(op.f('ix_job_trending_log_score'), table_name='job_trending')
+    op.drop_table('job_trending')
@@ -0,0 +1,47 @@
+"""add attachments table
+
+Revision ID: a9e41c6d3b82
+Revises: f4c82e1a7b39
+Create Date: 2025-07-02 14:26:08.517394
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e41c6d3b82'
+down_revision: Union[str, None] = 'f4c82e1a7b39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('attachments',
+    sa.Column('uid', sa.UUID(), nullable=False),
+    sa.Column('sha256', postgresql.VARCHAR(length=64), nullable=False),
+    sa.Column('size', postgresql.BIGINT(), nullable=False),
+    sa.Column('content_type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('blob_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('created_at', postgresql.TIMESTAMP(), nullable=False),
+    sa.PrimaryKeyConstraint('uid'),
+    sa.UniqueConstraint('uid'),
+    sa.UniqueConstraint('sha256')
+    )
+    op.add_column('applications', sa.Column('attachment_uid', sa.Uuid(), nullable=True))
+    op.add_column('applications', sa.Column('attachment_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    op.create_foreign_key('applications_attachment_uid_fkey', 'applications', 'attachments', ['attachment_uid'],
+                          ['uid'])
+    # the orphan cleanup looks up applications by attachment
+    op.create_index('ix_applications_attachment_uid', 'applications', ['attachment_uid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_applications_attachment_uid', table_name='applications')
+    op.drop_constraint('applications_attachment_uid_fkey', 'applications', type_='foreignkey')
+    op.drop_column('applications', 'attachment_name')
+    op.drop_column('applications', 'attachment_uid')
+    op.drop_table('attachments')
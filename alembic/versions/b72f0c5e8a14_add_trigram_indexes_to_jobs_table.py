@@ -0,0 +1,32 @@
+"""add trigram indexes to jobs table
+
+Revision ID: b72f0c5e8a14
+Revises: 4c1e9a7d2b35
+Create Date: 2025-06-04 09:41:07.803216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b72f0c5e8a14'
+down_revision: Union[str, None] = '4c1e9a7d2b35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_jobs_title_trgm', 'jobs', ['title'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_where=sa.text('is_active'))
+    op.create_index('ix_jobs_category_trgm', 'jobs', ['category'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'category': 'gin_trgm_ops'}, postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_category_trgm', table_name='jobs')
+    op.drop_index('ix_jobs_title_trgm', table_name='jobs')
@@ -0,0 +1,46 @@
+"""add near duplicate detection tables
+
+Revision ID: c39d7e2a5f48
+Revises: 6a3e8f1b9d27
+Create Date: 2025-06-25 16:34:09.215587
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c39d7e2a5f48'
+down_revision: Union[str, None] = '6a3e8f1b9d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('jobs', sa.Column('duplicate_of', sa.Uuid(), nullable=True))
+    op.create_foreign_key('jobs_duplicate_of_fkey', 'jobs', 'jobs', ['duplicate_of'], ['uid'])
+    op.create_table('job_minhashes',
+    sa.Column('job_uid', sa.Uuid(), nullable=False),
+    sa.Column('signature', postgresql.BYTEA(), nullable=False),
+    sa.ForeignKeyConstraint(['job_uid'], ['jobs.uid'], ),
+    sa.PrimaryKeyConstraint('job_uid')
+    )
+    op.create_table('job_lsh_bands',
+    sa.Column('band', postgresql.SMALLINT(), nullable=False),
+    sa.Column('bucket', postgresql.BIGINT(), nullable=False),
+    sa.Column('job_uid', sa.Uuid(), nullable=False),
+    sa.ForeignKeyConstraint(['job_uid'], ['jobs.uid'], ),
+    sa.PrimaryKeyConstraint('band', 'bucket', 'job_uid')
+    )
+    op.create_index(op.f('ix_job_lsh_bands_job_uid'), 'job_lsh_bands', ['job_uid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_job_lsh_bands_job_uid'), table_name='job_lsh_bands')
+    op.drop_table('job_lsh_bands')
+    op.drop_table('job_minhashes')
+    op.drop_constraint('jobs_duplicate_of_fkey', 'jobs', type_='foreignkey')
+    op.drop_column('jobs', 'duplicate_of')
@@ -0,0 +1,45 @@
+"""add updated_at columns
+
+Revision ID: d81f4b6a2c93
+Revises: c39d7e2a5f48
+Create Date: 2025-06-27 10:12:51.604218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4b6a2c93'
+down_revision: Union[str, None] = 'c39d7e2a5f48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('jobs', 'applications', 'notifications')
+
+
+def upgrade() -> None:
+    # one trigger function keeps updated_at in sync for every table, whatever code path writes the row
+    op.execute("""
+        CREATE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', postgresql.TIMESTAMP(), server_default=sa.text('now()'),
+                                       nullable=False))
+        op.execute(f"CREATE TRIGGER {table}_set_updated_at BEFORE UPDATE ON {table} "
+                   f"FOR EACH ROW EXECUTE FUNCTION set_updated_at()")
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER {table}_set_updated_at ON {table}")
+        op.drop_column(table, 'updated_at')
+    op.execute("DROP FUNCTION set_updated_at()")
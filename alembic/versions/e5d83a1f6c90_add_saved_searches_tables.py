@@ -0,0 +1,47 @@
+"""add saved searches tables
+
+Revision ID: e5d83a1f6c90
+Revises: b72f0c5e8a14
+Create Date: 2025-06-09 15:02:55.186430
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5d83a1f6c90'
+down_revision: Union[str, None] = 'b72f0c5e8a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('saved_searches',
+    sa.Column('uid', sa.UUID(), nullable=False),
+    sa.Column('user_uid', sa.Uuid(), nullable=False),
+    sa.Column('keywords', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('category', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('type', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('term_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', postgresql.TIMESTAMP(), nullable=False),
+    sa.ForeignKeyConstraint(['user_uid'], ['users.uid'], ),
+    sa.PrimaryKeyConstraint('uid'),
+    sa.UniqueConstraint('uid')
+    )
+    op.create_index(op.f('ix_saved_searches_user_uid'), 'saved_searches', ['user_uid'], unique=False)
+    op.create_table('saved_search_terms',
+    sa.Column('term', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('saved_search_uid', sa.Uuid(), nullable=False),
+    sa.ForeignKeyConstraint(['saved_search_uid'], ['saved_searches.uid'], ),
+    sa.PrimaryKeyConstraint('term', 'saved_search_uid')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('saved_search_terms')
+    op.drop_index(op.f('ix_saved_searches_user_uid'), table_name='saved_searches')
+    op.drop_table('saved_searches')
@@ -0,0 +1,40 @@
+"""add avatar_blobs column to users table
+
+Revision ID: f4c82e1a7b39
+Revises: d81f4b6a2c93
+Create Date: 2025-06-30 09:41:17.382650
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c82e1a7b39'
+down_revision: Union[str, None] = 'd81f4b6a2c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('avatar_blobs', postgresql.ARRAY(sa.VARCHAR()), nullable=True))
+    # resized avatars: /auth/avatars/<uid>/<version> -> the 64/128/512 px webp and jpg variants
+    op.execute("""
+        UPDATE users SET avatar_blobs = ARRAY(
+            SELECT format('profile_pictures/%s/%s/%s.%s', uid, split_part(avatar_url, '/', 5), size, extension)
+            FROM unnest(ARRAY[64, 128, 512]) AS size, unnest(ARRAY['webp', 'jpg']) AS extension
+        )
+        WHERE avatar_url LIKE '/auth/avatars/%'
+    """)
+    # original uploads: the blob url ends with profile_pictures/<uid>.<extension>
+    op.execute("""
+        UPDATE users SET avatar_blobs = ARRAY[substring(avatar_url FROM 'profile_pictures/[^/?]+')]
+        WHERE avatar_url LIKE '%profile_pictures/%' AND avatar_url NOT LIKE '/auth/avatars/%'
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'avatar_blobs')
@@ -1,10 +1,41 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from .auth.routes import auth_router
 from .jobs.routes import job_router
 from .applications.routes import application_router
 from .notifications.routes import notification_router
+from .alerts.routes import alert_router
 from .errors import register_all_errors
+from .db.listener import invalidation_listener
+from .storage import storage
+from .storage.routes import storage_router
+from .auth.avatars import avatar_processor
+from .metrics import MetricsMiddleware, CacheCollector, metrics_registry, metrics_router
+from .cache import shared_caches
+from .jobs.service import suggestion_cache, job_detail_cache, job_detail_flight
+from .jobs.similarity import similarity_index
+from .jobs.trending import TrendingService
+from .db.main import async_session_maker
+from .recommendations.service import recommendation_cache
+from .applications.relevance import relevance_cache
+from .config import Config
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    avatar_processor.start()  # fork the image workers before any other thread exists
+    await invalidation_listener.start()  # keep shared in-process caches consistent across workers
+    async with async_session_maker() as session:  # rebuilds the trending scores after a half-life change
+        await TrendingService().sync_half_life(session)
+    similarity_index.start()
+    yield
+    await similarity_index.close()  # write the job changes of this worker into the shared snapshot
+    await avatar_processor.close()
+    await storage.close()  # the storage client (one connection pool per worker) is created on first use
+    await invalidation_listener.stop()
+
 
 version = 'v1'
 app = FastAPI(
@@ -19,6 +50,8 @@ app = FastAPI(
                 "This API supports role-based access control (RBAC) to ensure that each user can perform actions appropriate to their role.\n\n"
                 "Notification Center: Implemented using webhooks. Notifications are triggered when a job is liked, an application is sent, or an application status is changed.",
     version=version,
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # orjson encodes large lists several times faster than the stdlib json
     contact={
         'name': 'Dimitar Draganov',
         'url': 'https://github.com/draganovdimitar2',
@@ -35,8 +68,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)  # outermost, so the latency includes every other middleware
+metrics_registry.register(CacheCollector(
+    caches={**shared_caches, 'suggestions': suggestion_cache, 'job_details': job_detail_cache,
+            'recommendations': recommendation_cache, 'relevance': relevance_cache},
+    flights={'job_details': job_detail_flight}
+))
 
 app.include_router(auth_router, prefix='/auth', tags=['auth'])
 app.include_router(job_router, prefix='/jobs', tags=['jobs'])
 app.include_router(application_router, prefix='/application', tags=['applications'])
-app.include_router(notification_router, prefix='/notification', tags=['notifications'])
\ No newline at end of file
+app.include_router(notification_router, prefix='/notification', tags=['notifications'])
+app.include_router(alert_router, prefix='/alerts', tags=['alerts'])
+app.include_router(metrics_router, tags=['metrics'])
+if Config.STORAGE_BACKEND == 'local':  # the local storage backend serves its files itself
+    app.include_router(storage_router, prefix=Config.LOCAL_STORAGE_URL, tags=['storage'])
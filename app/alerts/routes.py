@@ -0,0 +1,40 @@
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.main import get_session
+from app.db.models import User
+from app.alerts.service import AlertService
+from app.alerts.schemas import SavedSearchCreateModel
+from app.auth.dependencies import RoleChecker
+from fastapi import APIRouter, Depends
+
+user_role_checker = RoleChecker(['USER'])  # user role for RBAC
+alert_service = AlertService()
+alert_router = APIRouter()
+
+
+@alert_router.post('/search')
+async def create_saved_search(search_data: SavedSearchCreateModel,
+                              current_user: User = Depends(user_role_checker),
+                              session: AsyncSession = Depends(get_session)) -> dict:
+    """
+    Endpoint to save a search. The user is notified whenever a new job matches it.
+    """
+    return await alert_service.create_saved_search(search_data, str(current_user.uid), session)
+
+
+@alert_router.get('/search')
+async def get_saved_searches(current_user: User = Depends(user_role_checker),
+                             session: AsyncSession = Depends(get_session)) -> list:
+    """
+    Endpoint to fetch all saved searches of the current user.
+    """
+    return await alert_service.get_saved_searches(str(current_user.uid), session)
+
+
+@alert_router.delete('/search/{search_uid}')
+async def delete_saved_search(search_uid: str,
+                              current_user: User = Depends(user_role_checker),
+                              session: AsyncSession = Depends(get_session)) -> dict:
+    """
+    Endpoint to delete a saved search by it's uid.
+    """
+    return await alert_service.delete_saved_search(search_uid, str(current_user.uid), session)
@@ -0,0 +1,23 @@
+from pydantic import BaseModel, field_validator, model_validator
+from typing import Optional
+from app.text import tokenize
+
+
+class SavedSearchCreateModel(BaseModel):
+    keywords: Optional[str] = ''
+    category: Optional[str] = None
+    type: Optional[str] = None
+
+    @field_validator('category', 'type')
+    @classmethod
+    def strip_blank(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            value = value.strip() or None  # stored as None when blank, not as a term matching nothing
+        return value
+
+    @model_validator(mode='after')
+    def check_not_empty(self):
+        # keywords made only of stop words or punctuation have no index terms, such a search could never match
+        if not tokenize(self.keywords or '') and not self.category and not self.type:
+            raise ValueError('A saved search needs keywords, a category or a type')
+        return self
@@ -0,0 +1,154 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import bindparam, func, String, insert
+import sqlalchemy.dialects.postgresql as pg
+from sqlmodel import select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.alerts.schemas import SavedSearchCreateModel
+from app.db.models import SavedSearch, SavedSearchTerm, Jobs, Notification
+from app.errors import SavedSearchNotFound
+from app.text import tokenize
+
+ALERT_MATCH_BATCH_SIZE = 200  # jobs matched per query
+NOTIFICATION_INSERT_BATCH_SIZE = 1000
+
+
+def search_terms(keywords: str, category: str = None, job_type: str = None) -> set:
+    """
+    Terms of a saved search. Category and type are indexed as prefixed terms, so they are matched the same way.
+    Blank ones are no terms.
+    """
+    terms = set(tokenize(keywords))
+    category, job_type = (category or '').strip().lower(), (job_type or '').strip().lower()
+    if category:
+        terms.add(f"category:{category}")
+    if job_type:
+        terms.add(f"type:{job_type}")
+    return terms
+
+
+def job_terms(job: Jobs) -> set:
+    """Terms of a job, comparable with the terms of a saved search."""
+    return search_terms(f"{job.title} {job.description or ''}", job.category, job.type)
+
+
+class AlertService:
+
+    async def create_saved_search(self, search_data: SavedSearchCreateModel, user_uid: str,
+                                  session: AsyncSession) -> dict:
+        """Save a search and add its terms to the inverted index."""
+        terms = search_terms(search_data.keywords, search_data.category, search_data.type)
+        saved_search = SavedSearch(
+            user_uid=user_uid,
+            keywords=search_data.keywords or '',
+            category=search_data.category,
+            type=search_data.type,
+            term_count=len(terms)
+        )
+        session.add(saved_search)
+        await session.flush()  # the search has to exist before its index terms
+        session.add_all([SavedSearchTerm(term=term, saved_search_uid=saved_search.uid) for term in terms])
+        await session.commit()
+
+        return {"message": "Search saved successfully", "search": self.saved_search_dict(saved_search)}
+
+    async def get_saved_searches(self, user_uid: str, session: AsyncSession) -> list:
+        """Fetch all saved searches of a user."""
+        statement = select(SavedSearch).where(SavedSearch.user_uid == user_uid).order_by(SavedSearch.created_at)
+        result = await session.exec(statement)
+        return [self.saved_search_dict(saved_search) for saved_search in result.all()]
+
+    async def delete_saved_search(self, search_uid: str, user_uid: str, session: AsyncSession) -> dict:
+        """Delete a saved search of the current user together with its index terms."""
+        statement = select(SavedSearch).where(SavedSearch.uid == search_uid, SavedSearch.user_uid == user_uid)
+        result = await session.exec(statement)
+        if result.first() is None:
+            raise SavedSearchNotFound()
+
+        await session.execute(delete(SavedSearchTerm).where(SavedSearchTerm.saved_search_uid == search_uid))
+        await session.execute(delete(SavedSearch).where(SavedSearch.uid == search_uid))
+        await session.commit()
+        return {"message": "Saved search deleted successfully"}
+
+    async def match_jobs(self, jobs: list, session: AsyncSession) -> int:
+        """
+        Match new/activated jobs against all saved searches and notify the owners in bulk.
+        Only index entries for the terms of the jobs are read, not every saved search.
+        Returns the number of created notifications.
+        """
+        created = 0
+        for start in range(0, len(jobs), ALERT_MATCH_BATCH_SIZE):
+            batch = jobs[start:start + ALERT_MATCH_BATCH_SIZE]
+            matches = await self._find_matches(batch, session)
+            created += await self._notify(batch, matches, session)
+        return created
+
+    async def _find_matches(self, jobs: list, session: AsyncSession) -> set:
+        """Return the (job_uid, user_uid) pairs where the job contains all terms of one of the user's searches."""
+        job_uids, terms = [], []
+        for job in jobs:
+            for term in job_terms(job):
+                job_uids.append(job.uid)
+                terms.append(term)
+        if not terms:
+            return set()
+
+        # (job_uid, term) pairs are sent as two arrays, so the number of bind parameters stays constant
+        job_term_pairs = func.unnest(
+            bindparam('job_uids', job_uids, type_=pg.ARRAY(pg.UUID)),
+            bindparam('terms', terms, type_=pg.ARRAY(String))
+        ).table_valued('job_uid', 'term').render_derived(name='job_terms')
+
+        result = await session.execute(self.match_statement(job_term_pairs))
+        return {(row.job_uid, row.user_uid) for row in result.all()}
+
+    @staticmethod
+    def match_statement(job_term_pairs):
+        """
+        (job_uid, user_uid) of the saved searches all of whose terms are among the terms of a job. job_term_pairs is
+        a selectable of (job_uid, term) rows.
+        """
+        return (
+            select(job_term_pairs.c.job_uid, SavedSearch.user_uid)
+            .select_from(job_term_pairs)
+            .join(SavedSearchTerm, SavedSearchTerm.term == job_term_pairs.c.term)
+            .join(SavedSearch, SavedSearch.uid == SavedSearchTerm.saved_search_uid)
+            .group_by(job_term_pairs.c.job_uid, SavedSearch.uid)
+            .having(func.count() == SavedSearch.term_count)
+        )
+
+    async def _notify(self, jobs: list, matches: set, session: AsyncSession) -> int:
+        """Insert one notification per matched (job, user) pair with multi-row inserts."""
+        jobs_by_uid = {job.uid: job for job in jobs}
+        now = datetime.utcnow()
+        notifications = []
+        for job_uid, user_uid in matches:
+            job = jobs_by_uid[job_uid]
+            if user_uid == job.author_uid:  # don't alert organizations about their own jobs
+                continue
+            notifications.append({
+                "uid": uuid.uuid4(),
+                "recipient_uid": user_uid,
+                "sender_uid": job.author_uid,
+                # the author's username is appended when notifications are displayed
+                "message": f"New job {job.title} matching your saved search was posted by ",
+                "is_read": False,
+                "created_at": now,
+                "job_id": job.uid
+            })
+
+        for start in range(0, len(notifications), NOTIFICATION_INSERT_BATCH_SIZE):
+            await session.execute(insert(Notification), notifications[start:start + NOTIFICATION_INSERT_BATCH_SIZE])
+        if notifications:
+            await session.commit()
+        return len(notifications)
+
+    @staticmethod
+    def saved_search_dict(saved_search: SavedSearch) -> dict:
+        return {
+            "_id": str(saved_search.uid),
+            "keywords": saved_search.keywords,
+            "category": saved_search.category,
+            "type": saved_search.type,
+            "createdAt": saved_search.created_at
+        }
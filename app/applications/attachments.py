@@ -0,0 +1,147 @@
+"""
+CV attachments of applications. Files are stored once per content: identical CVs sent with several applications
+share one attachments row and one blob. Attachments no application references anymore are removed by
+
+    python -m app.applications.attachments
+"""
+import asyncio
+import hashlib
+import uuid
+import zipfile
+from datetime import datetime
+from typing import Optional
+from fastapi import UploadFile
+from sqlalchemy import exists
+from sqlmodel import select, delete
+import sqlalchemy.dialects.postgresql as pg
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import Config
+from app.db.models import Attachments, Applications, Jobs, User
+from app.errors import FileTooLarge, InvalidAttachment, AttachmentNotFound, InsufficientPermission
+from app.storage import storage
+
+PDF = 'application/pdf'
+DOCX = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def inspect_attachment(file) -> tuple:
+    """
+    (content type, sha256, size) of a spooled upload, read in chunks. Runs in a worker thread.
+    The type is detected from the content: the PDF signature, or a zip archive containing a Word document.
+    """
+    file.seek(0)
+    signature = file.read(5)
+    if signature.startswith(b'%PDF-'):
+        content_type = PDF
+    elif signature.startswith(b'PK\x03\x04'):
+        file.seek(0)
+        try:
+            with zipfile.ZipFile(file) as archive:  # reads the central directory only
+                if 'word/document.xml' not in archive.namelist():
+                    raise InvalidAttachment()
+        except zipfile.BadZipFile:
+            raise InvalidAttachment()
+        content_type = DOCX
+    else:
+        raise InvalidAttachment()
+
+    file.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        size += len(chunk)
+    file.seek(0)
+    return content_type, digest.hexdigest(), size
+
+
+def attachment_dict(name: Optional[str], size: Optional[int], content_type: Optional[str]) -> Optional[dict]:
+    if size is None:  # application without attachment
+        return None
+    return {"name": name, "size": size, "contentType": content_type}
+
+
+class AttachmentService:
+
+    async def store(self, file: UploadFile, session: AsyncSession) -> Attachments:
+        """
+        Store an uploaded CV, or reuse the attachment with identical content. Runs in the caller's transaction,
+        the caller has to commit. Memory use is constant: the upload is hashed and sent to the storage in chunks.
+        """
+        if file.size is not None and file.size > Config.ATTACHMENT_MAX_BYTES:  # the body limit includes the letter
+            raise FileTooLarge()
+        content_type, sha256, size = await asyncio.to_thread(inspect_attachment, file.file)
+        if size > Config.ATTACHMENT_MAX_BYTES:
+            raise FileTooLarge()
+
+        attachment = await self.get_by_sha256(sha256, session)
+        if attachment:  # identical file, no upload needed
+            return attachment
+
+        # the uid is part of the blob name, so a blob of a removed orphan is never reused by a new attachment
+        attachment_uid = uuid.uuid4()
+        blob_name = f"attachments/{sha256[:2]}/{attachment_uid}"
+        await storage.upload_stream(blob_name, file, max_size=Config.ATTACHMENT_MAX_BYTES, content_type=content_type)
+        statement = (
+            pg.insert(Attachments)
+            .values(uid=attachment_uid, sha256=sha256, size=size, content_type=content_type, blob_name=blob_name,
+                    created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=['sha256'])
+            .returning(Attachments.uid)
+        )
+        result = await session.execute(statement)
+        if result.scalar() is None:  # the same file was stored concurrently, keep that one
+            await storage.delete(blob_name)
+        return await self.get_by_sha256(sha256, session)
+
+    @staticmethod
+    async def get_by_sha256(sha256: str, session: AsyncSession) -> Optional[Attachments]:
+        # key share lock: the orphan cleanup can't remove the row before the referencing application is committed
+        statement = select(Attachments).where(Attachments.sha256 == sha256).with_for_update(key_share=True)
+        result = await session.exec(statement)
+        return result.first()
+
+    async def get_application_attachment(self, application_id: str, user: User, session: AsyncSession) -> tuple:
+        """The attachment of an application and its file name, for the applicant and the job's author only."""
+        statement = (
+            select(Attachments, Applications.attachment_name, Applications.user_uid, Jobs.author_uid)
+            .join(Applications, Applications.attachment_uid == Attachments.uid)
+            .join(Jobs, Jobs.uid == Applications.job_uid)
+            .where(Applications.uid == application_id)
+        )
+        result = await session.execute(statement)
+        row = result.first()
+        if not row:
+            raise AttachmentNotFound()
+        if user.uid not in (row.user_uid, row.author_uid):
+            raise InsufficientPermission()
+        return row.Attachments, row.attachment_name
+
+
+async def delete_orphaned_attachments(session: AsyncSession) -> int:
+    """Remove the attachments of deleted applications (and their blobs)."""
+    statement = (
+        delete(Attachments)
+        .where(~exists().where(Applications.attachment_uid == Attachments.uid))
+        .returning(Attachments.blob_name)
+    )
+    result = await session.execute(statement)
+    blob_names = result.scalars().all()
+    await session.commit()
+    if blob_names:
+        await storage.delete_many(blob_names)
+    return len(blob_names)
+
+
+async def main():
+    from app.db.main import async_session_maker
+
+    async with async_session_maker() as session:
+        deleted = await delete_orphaned_attachments(session)
+    await storage.close()
+    print(f"Deleted {deleted} orphaned attachments")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,178 @@
+"""
+Text extraction of CV attachments and full-text indexing of the applications they belong to.
+Runs as its own process, off the request path. All progress is database state, so it can be stopped and restarted
+at any time and several instances can run side by side:
+
+    python -m app.applications.extraction          # keep indexing new attachments
+    python -m app.applications.extraction --once   # index the backlog and exit
+"""
+import argparse
+import asyncio
+import io
+import logging
+import re
+import time
+import unicodedata
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from xml.etree import ElementTree
+from sqlalchemy import func, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.applications.attachments import PDF
+from app.config import Config
+from app.db.models import Attachments, Applications
+from app.storage import storage
+
+logger = logging.getLogger(__name__)
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+CONTROL_CHARACTERS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')  # NUL can't even be stored in a text column
+WHITESPACE = re.compile(r'\s+')
+
+
+def pdf_text(data: bytes, max_chars: int) -> str:
+    from pypdf import PdfReader  # only needed in the worker processes
+
+    parts, length = [], 0
+    for page in PdfReader(io.BytesIO(data)).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+        if length >= max_chars:  # long documents are truncated anyway, skip the remaining pages
+            break
+    return '\n'.join(parts)
+
+
+def docx_text(data: bytes, max_chars: int) -> str:
+    """Text runs of the main document part, parsed incrementally (the xml may decompress to much more than the file)."""
+    parts, length = [], 0
+    with zipfile.ZipFile(io.BytesIO(data)) as archive, archive.open('word/document.xml') as document:
+        for _, element in ElementTree.iterparse(document):
+            if element.tag == WORD_NAMESPACE + 't':
+                parts.append(element.text or '')
+                length += len(parts[-1])
+            elif element.tag == WORD_NAMESPACE + 'p':  # paragraph end
+                parts.append('\n')
+                element.clear()
+            if length >= max_chars:
+                break
+    return ''.join(parts)
+
+
+def extract_text(data: bytes, content_type: str, max_chars: int) -> str:
+    """Normalized plain text of a PDF or DOCX document. Runs in a worker process."""
+    text = pdf_text(data, max_chars) if content_type == PDF else docx_text(data, max_chars)
+    text = CONTROL_CHARACTERS.sub(' ', unicodedata.normalize('NFKC', text))
+    return WHITESPACE.sub(' ', text).strip()[:max_chars]
+
+
+class ExtractionWorker:
+    """
+    Claims batches of attachments without text (FOR NO KEY UPDATE SKIP LOCKED, so concurrent workers never take
+    the same ones, while applications can still reference them), extracts them in a process pool and writes the
+    text. The search vectors of the applications are then filled from the attachment text.
+    """
+
+    def __init__(self, processes: int, batch_size: int):
+        self.pool = ProcessPoolExecutor(max_workers=processes)
+        self.downloads = asyncio.Semaphore(processes * 2)  # documents held in memory at the same time
+        self.batch_size = batch_size
+        self.stats = {"attachments": 0, "failed": 0, "bytes": 0, "applications": 0, "seconds": 0.0}
+
+    async def extract(self, attachment) -> tuple:
+        """(text, error) of one attachment. Unreadable documents are stored with an empty text and the error."""
+        async with self.downloads:
+            try:
+                data = b''.join([chunk async for chunk in storage.stream(attachment.blob_name)])
+                text = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, extract_text, data, attachment.content_type, Config.EXTRACTION_MAX_CHARS)
+                return text, None
+            except Exception as e:
+                logger.warning("Text extraction of attachment %s failed: %s", attachment.uid, e)
+                return '', str(e)[:500]
+
+    async def extract_batch(self, session: AsyncSession) -> int:
+        statement = (
+            select(Attachments.uid, Attachments.blob_name, Attachments.content_type, Attachments.size)
+            .where(Attachments.extracted_at == None)
+            .order_by(Attachments.created_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True, key_share=True)  # FOR NO KEY UPDATE
+        )
+        result = await session.execute(statement)
+        attachments = result.all()
+        if not attachments:
+            await session.commit()
+            return 0
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(self.extract(attachment) for attachment in attachments))
+        extracted_at = datetime.utcnow()
+        await session.execute(update(Attachments), [  # bulk update by primary key
+            {"uid": attachment.uid, "text": text, "extraction_error": error, "extracted_at": extracted_at}
+            for attachment, (text, error) in zip(attachments, results)
+        ])
+        await session.commit()
+
+        self.stats["seconds"] += time.monotonic() - started
+        self.stats["attachments"] += len(attachments)
+        self.stats["failed"] += sum(error is not None for _, error in results)
+        self.stats["bytes"] += sum(attachment.size for attachment in attachments)
+        return len(attachments)
+
+    async def index_applications(self, session: AsyncSession) -> int:
+        """Fill the search vector of applications whose attachment has been extracted, in batches."""
+        applications = Applications.__table__
+        indexed = 0
+        while True:
+            pending = (
+                select(applications.c.uid)
+                .join(Attachments, Attachments.uid == applications.c.attachment_uid)
+                .where(applications.c.resume_vector == None, Attachments.extracted_at != None)
+                .limit(self.batch_size * 10)
+            )
+            statement = (
+                update(applications)
+                .values(resume_vector=func.to_tsvector('english', Attachments.text))
+                .where(applications.c.attachment_uid == Attachments.uid, applications.c.uid.in_(pending))
+            )
+            result = await session.execute(statement)
+            await session.commit()
+            if not result.rowcount:
+                self.stats["applications"] += indexed
+                return indexed
+            indexed += result.rowcount
+
+    def report(self):
+        seconds = max(self.stats["seconds"], 1e-9)
+        logger.info("Extracted %d attachments (%d failed) at %.1f documents/s, %.2f MB/s; indexed %d applications",
+                    self.stats["attachments"], self.stats["failed"], self.stats["attachments"] / seconds,
+                    self.stats["bytes"] / seconds / 1e6, self.stats["applications"])
+
+    async def run(self, once: bool = False):
+        from app.db.main import async_session_maker
+
+        try:
+            async with async_session_maker() as session:
+                while True:
+                    extracted = await self.extract_batch(session)
+                    indexed = await self.index_applications(session)
+                    if extracted or indexed:
+                        self.report()
+                    elif once:
+                        return
+                    else:  # nothing to do, wait for new applications
+                        await asyncio.sleep(Config.EXTRACTION_IDLE_SECONDS)
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            await storage.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Extract and index the text of application attachments")
+    parser.add_argument('--once', action='store_true', help="exit when the backlog has been processed")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(ExtractionWorker(Config.EXTRACTION_PROCESSES, Config.EXTRACTION_BATCH_SIZE).run(args.once))
@@ -0,0 +1,130 @@
+"""
+BM25 ranking of a job's applicants by their cover letter. Cover letters are tokenized once, when the application
+is created: the term counts are stored packed with the application (cover_letter_terms), so ranking a job only
+loads them and computes one sparse matrix-vector product.
+
+    python -m app.applications.relevance    # pack the terms of applications created before they were stored
+"""
+import asyncio
+import zlib
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import bindparam, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.cache import LRUCache
+from app.db.models import Applications
+from app.text import tokenize, TOKEN_PATTERN, STOP_WORDS
+
+BM25_K1 = 1.2  # term frequency saturation
+BM25_B = 0.75  # document length normalization
+TITLE_WEIGHT = 2  # job title terms count twice in the query
+BATCH_SIZE = 1000
+
+# (job uid, application set version) -> {application uid: score}. A new/removed application or an edited job
+# changes the version, so stale entries are never read and simply age out of the LRU
+relevance_cache = LRUCache(maxsize=512)
+
+
+def job_query_text(title: str, description: str) -> str:
+    return f"{title} " * TITLE_WEIGHT + (description or "")
+
+
+def term_hash(term: str) -> int:
+    return zlib.crc32(term.encode())
+
+
+def pack_terms(document: str) -> tuple:
+    """
+    (packed term counts, length in tokens) of a document. The counts are (crc32 of the term, count) uint32 pairs
+    sorted by hash. Stop words count into the length but are not stored, they never match a query term.
+    """
+    tokens = TOKEN_PATTERN.findall(document.lower()) if document else []
+    hashes = np.fromiter((term_hash(token) for token in tokens if token not in STOP_WORDS), dtype=np.uint32)
+    terms, counts = np.unique(hashes, return_counts=True)
+    return np.column_stack((terms, counts.astype(np.uint32))).tobytes(), len(tokens)
+
+
+def bm25_packed_scores(query_text: str, packed_terms: list, lengths: list) -> np.ndarray:
+    """
+    BM25 score of every document, given as pack_terms() output, against the query, computed over the whole
+    document set at once. Only query terms can contribute to a score, so the term matrix is restricted to them.
+    """
+    query_terms = {}
+    for term in map(term_hash, tokenize(query_text)):
+        query_terms[term] = query_terms.get(term, 0) + 1
+    n_docs = len(packed_terms)
+    if not n_docs or not query_terms:
+        return np.zeros(n_docs, dtype=np.float32)
+
+    query_hashes = np.array(sorted(query_terms), dtype=np.uint32)
+    query_tf = np.array([query_terms[term] for term in query_hashes.tolist()], dtype=np.float32)
+
+    rows = [np.frombuffer(packed, dtype=np.uint32) for packed in packed_terms]
+    pairs = np.concatenate(rows).reshape(-1, 2)
+    doc_ids = np.repeat(np.arange(n_docs, dtype=np.int32), [len(row) // 2 for row in rows])
+    positions = np.minimum(np.searchsorted(query_hashes, pairs[:, 0]), len(query_hashes) - 1)
+    matched = query_hashes[positions] == pairs[:, 0]
+    # every (doc, term) pair is stored once, so the entries are the term frequencies
+    tf = sp.csr_matrix((pairs[matched, 1].astype(np.float32), (doc_ids[matched], positions[matched])),
+                       shape=(n_docs, len(query_hashes)))
+
+    doc_lengths = np.asarray(lengths, dtype=np.float32)
+    df = np.bincount(tf.indices, minlength=len(query_hashes))
+    idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    avg_length = max(float(doc_lengths.mean()), 1.0)
+    length_norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / avg_length)
+    doc_of_entry = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+    tf.data = tf.data * (BM25_K1 + 1) / (tf.data + length_norm[doc_of_entry])
+
+    return tf @ (idf * query_tf)
+
+
+def bm25_scores(query_text: str, documents: list) -> np.ndarray:
+    """BM25 scores of raw documents, tokenized on the spot (documents without stored terms)."""
+    packed = [pack_terms(document) for document in documents]
+    return bm25_packed_scores(query_text, [terms for terms, _ in packed], [length for _, length in packed])
+
+
+def application_set_version(job_title: str, job_description: str, count: int, latest_applied_at) -> tuple:
+    """
+    Cheap version of a job's applicant set (count and latest appliedAt of all its applications): it changes when
+    an application is added/removed or the job is edited.
+    """
+    return count, latest_applied_at, zlib.crc32(job_query_text(job_title, job_description).encode())
+
+
+async def pack_missing(session: AsyncSession) -> int:
+    """Store the packed cover letter terms of all applications which don't have them yet, in batches."""
+    applications = Applications.__table__
+    packed = 0
+    while True:
+        statement = (select(applications.c.uid, applications.c.coverLetter)
+                     .where(applications.c.cover_letter_terms == None).limit(BATCH_SIZE))
+        result = await session.execute(statement)
+        rows = result.all()
+        if not rows:
+            return packed
+
+        terms = await asyncio.to_thread(lambda: [pack_terms(row.coverLetter) for row in rows])
+        statement = (update(applications).where(applications.c.uid == bindparam('application_uid'))
+                     .values(cover_letter_terms=bindparam('terms'), cover_letter_length=bindparam('length')))
+        await session.execute(statement, [
+            {"application_uid": row.uid, "terms": packed_terms, "length": length}
+            for row, (packed_terms, length) in zip(rows, terms)
+        ])
+        await session.commit()
+        packed += len(rows)
+
+
+async def main():
+    from app.db.main import async_session_maker
+
+    async with async_session_maker() as session:
+        packed = await pack_missing(session)
+    print(f"Packed the cover letter terms of {packed} applications")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
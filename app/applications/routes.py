@@ -1,10 +1,24 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.instrumentation import QueryBudget
 from app.db.main import get_session
 from app.db.models import User
-from app.applications.service import ApplicationService
-from app.applications.schemas import ApplicationRequestModel, ApplicationUpdateModel
-from app.auth.dependencies import RoleChecker, CustomTokenBearer
-from fastapi import APIRouter, Depends
+from app.applications.service import ApplicationService, APPLICATION_FIELDS, attachment_service
+from app.jobs.utils import parse_fields
+from app.applications.schemas import (
+    ApplicationRequestModel,
+    ApplicationUpdateModel,
+    ApplicationResponseModel,
+    ApplicantResponseModel
+)
+from app.auth.dependencies import RoleChecker, CustomTokenBearer, get_current_user
+from app.config import Config
+from app.errors import FileTooLarge
+from app.storage.responses import blob_response
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from starlette.datastructures import UploadFile
+from typing import List, Literal, Optional
 
 user_role_checker = RoleChecker(['USER'])  # user role for RBAC
 organization_role_checker = RoleChecker(['ORGANIZATION'])  # org role for RBAC
@@ -12,39 +26,115 @@ access_token_bearer = CustomTokenBearer()
 application_service = ApplicationService()
 application_router = APIRouter()
 
+APPLY_REQUEST_BODY = {  # documents both accepted bodies, they are parsed by application_form
+    'requestBody': {'required': True, 'content': {
+        'application/json': {'schema': ApplicationRequestModel.model_json_schema()},
+        'multipart/form-data': {'schema': {
+            'type': 'object',
+            'required': ['coverLetter'],
+            'properties': {'coverLetter': {'type': 'string'},
+                           'attachment': {'type': 'string', 'format': 'binary', 'description': 'CV, PDF or DOCX'}}
+        }}
+    }}
+}
+# the CV plus the cover letter (multipart text fields are limited to 1 MiB by Starlette) and the multipart framing
+APPLICATION_BODY_MAX_BYTES = Config.ATTACHMENT_MAX_BYTES + 1024 * 1024
 
-@application_router.post("/apply/{job_uid}")
+
+def limit_body(request: Request, max_bytes: int) -> Request:
+    """
+    The request with a receive channel raising FileTooLarge as soon as more than max_bytes of body have arrived,
+    for bodies without (or with a wrong) Content-Length, e.g. chunked uploads.
+    """
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        if message['type'] == 'http.request':
+            received += len(message.get('body', b''))
+            if received > max_bytes:
+                raise FileTooLarge()
+        return message
+
+    return Request(request.scope, receive)
+
+
+async def application_form(request: Request):
+    """
+    Cover letter and optional CV of an application. JSON bodies work as before, multipart/form-data bodies
+    carry the CV as `attachment`. Starlette parses (and spools to disk) the whole body before the endpoint runs,
+    so the size limit is enforced here: bodies declaring a larger Content-Length are rejected before they are read
+    and any other body is cut off once it exceeds the limit.
+    """
+    content_length = request.headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > APPLICATION_BODY_MAX_BYTES:
+        raise FileTooLarge()
+    request = limit_body(request, APPLICATION_BODY_MAX_BYTES)
+
+    form, attachment = None, None
+    try:
+        if request.headers.get('content-type', '').startswith('multipart/form-data'):
+            form = await request.form(max_files=1, max_fields=10)
+            attachment = form.get('attachment')
+            application_data = ApplicationRequestModel.model_validate({'coverLetter': form.get('coverLetter')})
+        else:
+            application_data = ApplicationRequestModel.model_validate_json(await request.body())
+    except ValidationError as e:
+        if form is not None:
+            await form.close()
+        raise RequestValidationError(e.errors())
+
+    try:
+        yield application_data, attachment if isinstance(attachment, UploadFile) else None
+    finally:
+        if form is not None:
+            await form.close()
+
+
+@application_router.post("/apply/{job_uid}", openapi_extra=APPLY_REQUEST_BODY)
 async def apply_for_job(job_uid: str,
-                        application_data: ApplicationRequestModel,
+                        form: tuple = Depends(application_form),
                         current_user: User = Depends(user_role_checker),  # implement the RBAC
                         session: AsyncSession = Depends(get_session)
                         ) -> dict:
     """
-    Endpoint to apply for a job by it's uid.
+    Endpoint to apply for a job by it's uid, with an optional CV (PDF or DOCX) sent as multipart/form-data.
     """
-    application = await application_service.apply_for_job(application_data, str(current_user.uid), job_uid, session)
+    application_data, attachment = form
+    application = await application_service.apply_for_job(application_data, str(current_user.uid), job_uid, session,
+                                                          attachment)
     return application
 
 
-@application_router.get("/my-applications")
-async def my_applications(current_user: User = Depends(user_role_checker),
-                          session: AsyncSession = Depends(get_session)
-                          ) -> list:
+@application_router.get("/my-applications", response_model_exclude_unset=True)  # keys not requested stay out
+async def my_applications(fields: Optional[str] = Query(default=None, max_length=500),
+                          current_user: User = Depends(user_role_checker),
+                          session: AsyncSession = Depends(get_session),
+                          query_budget: None = Depends(QueryBudget(2))  # applications with jobs, liked jobs
+                          ) -> List[ApplicationResponseModel]:
     """
     Endpoint to fetch all user's applications.
+    fields (e.g. status,job.title,job.authorName) limits the returned keys, job.* selects job keys.
     """
-    applications = await application_service.my_applications(str(current_user.uid), session)
+    applications = await application_service.my_applications(str(current_user.uid), session,
+                                                              parse_fields(fields, APPLICATION_FIELDS))
     return applications
 
 
-@application_router.get("/applicants/{job_uid}")
+@application_router.get("/applicants/{job_uid}", response_model_exclude_unset=True)  # relevance only when sorted
 async def get_job_applicants(job_uid: str,
+                             sort: Optional[Literal['relevance']] = Query(default=None),
+                             q: Optional[str] = Query(default=None, max_length=200),
                              current_user: User = Depends(organization_role_checker),
-                             session: AsyncSession = Depends(get_session)) -> list:
+                             session: AsyncSession = Depends(get_session),
+                             query_budget: None = Depends(QueryBudget(3))  # job, applicants, letters to rank
+                             ) -> List[ApplicantResponseModel]:
     """
-    Endpoint to fetch all applicants to specific job.
+    Endpoint to fetch all applicants to specific job. sort=relevance ranks them by how well
+    their cover letter matches the job. q searches the applicants' CVs (e.g. q="python -java").
     """
-    application = await application_service.get_job_applicants(job_uid, str(current_user.uid), session)
+    application = await application_service.get_job_applicants(job_uid, str(current_user.uid), session, sort, q)
     return application
 
 
@@ -59,3 +149,17 @@ async def update_application_status(application_uid: str,
     application_status_update = await application_service.update_application_status(update_data, str(current_user.uid),
                                                                                     application_uid, session)
     return application_status_update
+
+
+@application_router.get("/application/{application_uid}/attachment")
+async def download_attachment(application_uid: str,
+                              request: Request,
+                              current_user: User = Depends(get_current_user),
+                              session: AsyncSession = Depends(get_session)):
+    """
+    Endpoint to download the CV of an application, for the applicant and the job's author.
+    Supports Range requests, so interrupted downloads can be resumed.
+    """
+    attachment, filename = await attachment_service.get_application_attachment(application_uid, current_user, session)
+    return blob_response(request, attachment.blob_name, attachment.size, attachment.content_type,
+                         f'"{attachment.sha256}"', filename)
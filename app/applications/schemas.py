@@ -1,9 +1,51 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from app.jobs.schemas import JobDetailResponseModel
 
 
 class ApplicationRequestModel(BaseModel):
     coverLetter: str
 
 
+class AttachmentResponseModel(BaseModel):  # metadata of a CV, downloaded from .../application/{uid}/attachment
+    name: Optional[str] = None
+    size: int
+    contentType: str
+
+
 class ApplicationUpdateModel(BaseModel):
     status: str
+
+
+class ApplicationResponseModel(BaseModel):  # an application as seen by the applicant, fields may be left out
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str = Field(alias='_id')
+    job: Optional[JobDetailResponseModel] = None
+    status: Optional[str] = None
+    coverLetter: Optional[str] = None
+    appliedAt: Optional[datetime] = None
+
+
+class ApplicantUserModel(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str = Field(alias='_id')
+    username: str
+    email: str
+    firstName: str
+    lastName: str
+
+
+class ApplicantResponseModel(BaseModel):  # an application as seen by the organization
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str = Field(alias='_id')
+    user: ApplicantUserModel
+    job: str
+    status: str
+    coverLetter: str
+    attachment: Optional[AttachmentResponseModel] = None
+    appliedAt: str
+    relevance: Optional[float] = None  # only set when sorted by relevance
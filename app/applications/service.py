@@ -1,16 +1,33 @@
+import asyncio
+import os
 import uuid
+from typing import Optional
 
+from fastapi import UploadFile
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
+from sqlalchemy import case, func, update
 from app.applications.schemas import ApplicationRequestModel, ApplicationUpdateModel
-from app.jobs.service import JobService
+from app.jobs.service import JobService, JOB_COLUMNS, FEED_FIELDS, job_columns
+from app.jobs.utils import wants
 from app.auth.service import UserService
 from datetime import datetime
 from app.notifications.service import NotificationService
+from app.recommendations.service import recommendation_cache
+from app.jobs.trending import TrendingService, APPLICATION_WEIGHT
+from app.applications.relevance import (
+    relevance_cache,
+    pack_terms,
+    bm25_packed_scores,
+    job_query_text,
+    application_set_version
+)
+from app.applications.attachments import AttachmentService, attachment_dict
 from app.db.models import (
     Jobs,
     User,
-    Applications
+    Applications,
+    Attachments
 )
 from app.errors import (
     JobNotFound,
@@ -24,6 +41,17 @@ from app.errors import (
 job_service = JobService()
 notification_service = NotificationService()
 user_service = UserService()
+trending_service = TrendingService()
+attachment_service = AttachmentService()
+
+# response field -> column of my-applications, projected according to ?fields=
+APPLICATION_COLUMNS = {
+    "status": Applications.status,
+    "coverLetter": Applications.coverLetter,
+    "appliedAt": Applications.appliedAt
+}
+# job fields are requested as job.<field>, plain "job" requests all of them
+APPLICATION_FIELDS = (*APPLICATION_COLUMNS, "job", *(f"job.{field}" for field in (*FEED_FIELDS, "author_uid")))
 
 
 class ApplicationService:
@@ -32,9 +60,10 @@ class ApplicationService:
                             cover_letter: ApplicationRequestModel,
                             user_id: str,
                             job_id: str,
-                            session: AsyncSession
+                            session: AsyncSession,
+                            attachment: Optional[UploadFile] = None
                             ) -> dict:
-        """Apply for a job"""
+        """Apply for a job, optionally with a CV attachment"""
         job = await job_service.get_job_by_its_id(job_id, user_id, session)
         if not job:
             raise JobNotFound()
@@ -47,10 +76,16 @@ class ApplicationService:
         if application_existence:  # if user has already applied for this offer, raise an exception
             raise AlreadyApplied()
 
+        # stored (or deduplicated) only once the application is known to be valid
+        stored_attachment = await attachment_service.store(attachment, session) if attachment else None
+        attachment_name = (os.path.basename(attachment.filename or "")[:255] or None) if attachment else None
+
         application = Applications(
             user_uid=user_id,
             job_uid=job_id,
             coverLetter=cover_letter.coverLetter,
+            attachment_uid=stored_attachment.uid if stored_attachment else None,
+            attachment_name=attachment_name,
             appliedAt=datetime.now()  # Set the appliedAt field
         )
         # trigger the notification
@@ -59,8 +94,17 @@ class ApplicationService:
                                                         session, job_id=uuid.UUID(job_id))
         # Add the application to the session
         session.add(application)
+        # tokenized once here, ranking the applicants of a job only loads the term counts
+        terms, length = pack_terms(application.coverLetter)
+        await session.flush()
+        applications = Applications.__table__
+        await session.execute(update(applications).where(applications.c.uid == application.uid)
+                              .values(cover_letter_terms=terms, cover_letter_length=length))
+        # weighted at appliedAt, like when the scores are rebuilt from the applications
+        await trending_service.record_event(uuid.UUID(job_id), APPLICATION_WEIGHT, session, at=application.appliedAt)
 
         await session.commit()
+        recommendation_cache.invalidate(user_id)  # the user's interests have changed
 
         application_dict = {
             "_id": str(application.uid),  # Use the instance's uid
@@ -68,6 +112,8 @@ class ApplicationService:
             "job": job_id,
             "status": application.status,
             "coverLetter": application.coverLetter,
+            "attachment": attachment_dict(attachment_name, stored_attachment.size, stored_attachment.content_type)
+            if stored_attachment else None,
             "appliedAt": application.appliedAt
         }
 
@@ -76,61 +122,153 @@ class ApplicationService:
 
     async def my_applications(self,
                               user_id: str,
-                              session: AsyncSession
+                              session: AsyncSession,
+                              fields: Optional[frozenset] = None
                               ) -> list:
-        """Fetch all user applications"""
-        statement = await session.exec(select(Applications).where(Applications.user_uid == user_id))
-        all_applications = statement.all()
-        applications_list = []
-
-        for application in all_applications:
-            job_data_dict = await job_service.get_job_by_its_id(application.job_uid, user_id,
-                                                                session)  # fetch the job data
-            application_dict = {
-                "_id": str(application.uid),
-                "job": job_data_dict,
-                "status": application.status,
-                "coverLetter": application.coverLetter,
-                "appliedAt": application.appliedAt
-            }
-            applications_list.append(application_dict)
+        """Fetch all user applications. fields limits the columns, joins and keys to the requested ones."""
+        if fields is None or "job" in fields:
+            job_fields = None
+        else:
+            job_fields = frozenset(field.removeprefix("job.") for field in fields if field.startswith("job."))
+        with_job = job_fields is None or bool(job_fields)
 
-        return applications_list
+        # applications (and jobs with their authors when requested) in one query of plain columns
+        statement = select(Applications.uid, *(column.label(name) for name, column in APPLICATION_COLUMNS.items()
+                                               if wants(fields, name)))
+        if with_job:
+            columns = job_columns(job_fields)
+            if wants(job_fields, "author_uid"):
+                columns.append(Jobs.author_uid)
+            if wants(job_fields, "authorName"):
+                columns.append(User.username.label("authorName"))
+            statement = statement.add_columns(Applications.job_uid, *columns)
+            if columns:  # with only _id/isLiked requested the jobs table is not needed
+                statement = statement.join(Jobs, Jobs.uid == Applications.job_uid)
+            if wants(job_fields, "authorName"):
+                statement = statement.join(User, User.uid == Jobs.author_uid)
+        result = await session.execute(statement.where(Applications.user_uid == user_id))
+        liked = await job_service.liked_job_uids(user_id, session) if with_job and wants(job_fields, "isLiked") else None
 
-    async def get_job_applicants(self, job_id: str, user_id: str, session: AsyncSession) -> list:
-        """Get applicants for a job in the desired format"""
+        applications = []
+        for row in result.all():
+            application = {"_id": str(row.uid)}
+            if with_job:
+                job = {"_id": str(row.job_uid), **{name: row._mapping[name] for name in JOB_COLUMNS
+                                                   if wants(job_fields, name)}}
+                if wants(job_fields, "author_uid"):
+                    job["author_uid"] = str(row.author_uid)
+                if liked is not None:
+                    job["isLiked"] = str(row.job_uid) in liked
+                if wants(job_fields, "authorName"):
+                    job["authorName"] = row.authorName
+                application["job"] = job
+            application.update({name: row._mapping[name] for name in APPLICATION_COLUMNS if wants(fields, name)})
+            applications.append(application)
+        return applications
 
-        # Fetch Applications and associated Users
+    async def get_job_applicants(self, job_id: str, user_id: str, session: AsyncSession,
+                                 sort: Optional[str] = None, q: Optional[str] = None) -> list:
+        """
+        Get applicants for a job in the desired format, optionally ranked by cover letter relevance.
+        q keeps the applicants whose CV matches the keywords (web search syntax), best matches first.
+        Only the job's author may see its applicants.
+        """
+        job = await self.job_applicant_set(job_id, session)
+        if not job:
+            raise JobNotFound()
+        if str(job.author_uid) != user_id:
+            raise InsufficientPermission()
+
+        # Fetch Applications and associated Users as plain columns
         statement = (
-            select(Applications, User)
+            select(Applications.uid, Applications.job_uid, Applications.status, Applications.coverLetter,
+                   Applications.appliedAt, User.uid.label('user_uid'), User.username, User.email, User.firstName,
+                   User.lastName, Applications.attachment_name, Attachments.size.label('attachment_size'),
+                   Attachments.content_type.label('attachment_type'))
             .join(User, Applications.user_uid == User.uid)  # Join Users to fetch user details
+            .outerjoin(Attachments, Attachments.uid == Applications.attachment_uid)
             .where(Applications.job_uid == job_id)  # Filter by job_id
         )
+        if q:  # CVs are indexed by the extraction worker, applications whose CV isn't processed yet don't match
+            resume_vector = Applications.__table__.c.resume_vector
+            query = func.websearch_to_tsquery('english', q)
+            statement = (statement.where(resume_vector.op('@@')(query))
+                         .order_by(func.ts_rank(resume_vector, query).desc(), Applications.appliedAt))
 
-        result = await session.exec(statement)
+        result = await session.execute(statement)
         records = result.all()
 
+        scores = None
+        if sort == "relevance":  # scored over all applicants: BM25 statistics must not depend on the q filter
+            scores = await self.relevance_scores(job, session)
+            # applications created after the scores were computed rank last
+            records = sorted(records, key=lambda record: (-scores.get(record.uid, 0.0), record.appliedAt))
+
         # Format Application Data
         application_list = [
             {
-                "_id": str(application.uid),  # Application ID
+                "_id": str(record.uid),  # Application ID
                 "user": {
-                    "_id": str(user.uid),  # User ID
-                    "username": user.username,  # Username
-                    "email": user.email,  # Email
-                    "firstName": user.firstName or "",  # First Name
-                    "lastName": user.lastName or "",  # Last Name
+                    "_id": str(record.user_uid),  # User ID
+                    "username": record.username,  # Username
+                    "email": record.email,  # Email
+                    "firstName": record.firstName or "",  # First Name
+                    "lastName": record.lastName or "",  # Last Name
                 },
-                "job": str(application.job_uid),  # Job ID
-                "status": application.status,  # Application Status
-                "coverLetter": application.coverLetter,  # Cover Letter
-                "appliedAt": application.appliedAt.isoformat(),  # Application Date (ISO format)
+                "job": str(record.job_uid),  # Job ID
+                "status": record.status,  # Application Status
+                "coverLetter": record.coverLetter,  # Cover Letter
+                "attachment": attachment_dict(record.attachment_name, record.attachment_size, record.attachment_type),
+                "appliedAt": record.appliedAt.isoformat(),  # Application Date (ISO format)
+                **({"relevance": round(scores.get(record.uid, 0.0), 4)} if scores is not None else {})
             }
-            for application, user in records
+            for record in records
         ]
 
         return application_list
 
+    @staticmethod
+    async def job_applicant_set(job_id: str, session: AsyncSession):
+        """The job's author, title and description with the version of its applicant set, None if there's no job."""
+        statement = (
+            select(Jobs.uid, Jobs.author_uid, Jobs.title, Jobs.description,
+                   func.count(Applications.uid).label('count'), func.max(Applications.appliedAt).label('latest'))
+            .outerjoin(Applications, Applications.job_uid == Jobs.uid)
+            .where(Jobs.uid == job_id)
+            .group_by(Jobs.uid)
+        )
+        result = await session.execute(statement)
+        return result.first()
+
+    async def relevance_scores(self, job, session: AsyncSession) -> dict:
+        """
+        BM25 scores of the cover letters of all the job's applicants against the job (a row of job_applicant_set),
+        cached per (job, application set version).
+        """
+        job_id = job.uid
+        cache_key = (str(job_id), application_set_version(job.title, job.description, job.count, job.latest))
+        scores = relevance_cache.get(cache_key)
+        if scores is None:
+            applications = Applications.__table__
+            statement = (  # the letter itself only for applications created before their terms were packed
+                select(applications.c.uid, applications.c.cover_letter_terms, applications.c.cover_letter_length,
+                       case((applications.c.cover_letter_terms == None, applications.c.coverLetter)).label('letter'))
+                .where(applications.c.job_uid == job_id)
+            )
+            result = await session.execute(statement)
+            records = result.all()
+            # CPU bound, keep it off the event loop
+            values = await asyncio.to_thread(self.score_packed, job_query_text(job.title, job.description), records)
+            scores = {record.uid: float(value) for record, value in zip(records, values)}
+            relevance_cache.set(cache_key, scores)
+        return scores
+
+    @staticmethod
+    def score_packed(query_text: str, records: list):
+        packed = [(record.cover_letter_terms, record.cover_letter_length) if record.letter is None
+                  else pack_terms(record.letter) for record in records]
+        return bm25_packed_scores(query_text, [terms for terms, _ in packed], [length for _, length in packed])
+
     async def update_application_status(self,
                                         update_model: ApplicationUpdateModel,
                                         user_id: str,
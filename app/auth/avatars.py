@@ -0,0 +1,134 @@
+"""
+Avatar image pipeline. Uploads are validated by their content (not their file name), cropped to a square and
+re-encoded into fixed size WebP and JPEG variants, which drops all metadata (EXIF incl. GPS position, comments).
+Decoding and encoding are CPU bound, they run in a small process pool so the event loop and the GIL stay free.
+"""
+import asyncio
+import hashlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from PIL import Image, ImageOps
+from app.config import Config
+
+AVATAR_SIZES = (64, 128, 512)  # edge length of the square variants in pixels
+DEFAULT_AVATAR_SIZE = 128
+AVATAR_FORMATS = {  # extension -> (Pillow format, content type, encoder options); jpeg for clients without webp
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP'}  # detected from the file content
+MAX_PIXELS = 40_000_000  # larger images are rejected before decoding (decompression bombs)
+AVATAR_CACHE_CONTROL = 'public, max-age=31536000, immutable'  # variants are content addressed, never change
+AVATAR_URL_PREFIX = '/auth/avatars'  # User.avatar_url: f"{AVATAR_URL_PREFIX}/{user id}/{version}?size=64"
+
+
+def avatar_version(data: bytes) -> str:
+    """Content hash of an upload, part of the variant names, so a new picture always gets new urls."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def avatar_prefix(user_id: str, version: str) -> str:
+    return f"profile_pictures/{user_id}/{version}"
+
+
+def avatar_variant_name(prefix: str, size: int, extension: str) -> str:
+    return f"{prefix}/{size}.{extension}"
+
+
+def avatar_variant_names(prefix: str) -> list:
+    return [avatar_variant_name(prefix, size, extension) for size in AVATAR_SIZES for extension in AVATAR_FORMATS]
+
+
+def avatar_url(user_id: str, version: str) -> str:
+    return f"{AVATAR_URL_PREFIX}/{user_id}/{version}"
+
+
+def avatar_url_version(url: str) -> Optional[str]:
+    """Version of a size-aware avatar url, None for urls of pictures uploaded before the variants existed."""
+    return url.rsplit('/', 1)[-1] if url.startswith(AVATAR_URL_PREFIX + '/') else None
+
+
+def variant_size(requested: int) -> int:
+    """Smallest variant at least as large as the requested size (or the largest one)."""
+    return next((size for size in AVATAR_SIZES if size >= requested), AVATAR_SIZES[-1])
+
+
+def render_variants(data: bytes) -> dict:
+    """
+    Decode an uploaded picture and encode all variants, {(size, extension): bytes}.
+    Runs in a worker process. Raises ValueError if the data is not a supported image.
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise ValueError(f"Unsupported image format: {image.format}")
+            if image.width * image.height > MAX_PIXELS:
+                raise ValueError("Image has too many pixels")
+            largest = AVATAR_SIZES[-1]
+            image.draft('RGB', (largest, largest))  # jpeg decodes directly at a reduced scale, a no-op otherwise
+            image = ImageOps.exif_transpose(image)  # apply the orientation before the exif data is dropped
+            if image.mode in ('RGBA', 'LA', 'P', 'PA'):  # flatten transparency on white, jpeg has no alpha
+                image = image.convert('RGBA')
+                flat = Image.new('RGB', image.size, (255, 255, 255))
+                flat.paste(image, mask=image.getchannel('A'))
+                image = flat
+            else:
+                image = image.convert('RGB')
+    except (OSError, Image.DecompressionBombError) as e:  # UnidentifiedImageError is an OSError
+        raise ValueError(f"Invalid image: {e}")
+
+    variants = {}
+    source = image
+    for size in sorted(AVATAR_SIZES, reverse=True):  # each variant is resized from the next larger one
+        source = ImageOps.fit(source, (size, size), Image.LANCZOS)
+        for extension, (image_format, _, options) in AVATAR_FORMATS.items():
+            output = io.BytesIO()
+            source.save(output, image_format, **options)  # no exif/icc passed, the variant carries no metadata
+            variants[(size, extension)] = output.getvalue()
+    return variants
+
+
+def _warm_up():
+    return None
+
+
+class AvatarProcessor:
+    """
+    Bounded process pool for the image work. At most AVATAR_WORKERS pictures are processed at once and at most
+    AVATAR_QUEUE_SIZE more wait for a worker, so memory stays bounded under a burst of uploads.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def start(self):
+        """Fork the workers at startup, while the process has no other threads yet."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=Config.AVATAR_WORKERS)
+            self._slots = asyncio.Semaphore(Config.AVATAR_WORKERS + Config.AVATAR_QUEUE_SIZE)
+            self._pool.submit(_warm_up)
+
+    async def render_upload(self, file, max_bytes: int) -> Optional[tuple]:
+        """
+        Read an uploaded picture and render its variants: (data, variants), None if it exceeds max_bytes.
+        The picture is read whole instead of streamed: the decoder needs all of it, it's sent to a worker as one
+        pickle and only the variants are stored. It's read once a slot is free, so at most
+        AVATAR_WORKERS + AVATAR_QUEUE_SIZE pictures are held in memory. Raises ValueError for invalid images.
+        """
+        self.start()
+        async with self._slots:
+            data = await file.read(max_bytes + 1)
+            if len(data) > max_bytes:
+                return None
+            return data, await asyncio.get_running_loop().run_in_executor(self._pool, render_variants, data)
+
+    async def close(self):
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+
+avatar_processor = AvatarProcessor()
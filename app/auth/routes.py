@@ -1,16 +1,27 @@
 from fastapi.exceptions import HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, RedirectResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.db.main import get_session
 from app.auth.service import UserService
 from app.auth.dependencies import RoleChecker, CustomTokenBearer
 from .security import verify_password, create_access_token
-from fastapi import APIRouter, Depends, UploadFile, File
+from fastapi import APIRouter, Depends, UploadFile, File, BackgroundTasks, Path, Query
+from typing import Literal
+import uuid
+from app.storage import storage
+from app.auth.avatars import (
+    avatar_prefix,
+    avatar_variant_name,
+    variant_size,
+    DEFAULT_AVATAR_SIZE,
+    AVATAR_CACHE_CONTROL
+)
 from app.auth.schemas import (
     UserCreateModel,
     UserLoginModel,
     UserUpdateRequestModel,
-    UserPasswordChangeModel
+    UserPasswordChangeModel,
+    UserResponseModel
 )
 from app.errors import (
     InvalidRole,
@@ -87,7 +98,7 @@ async def login(login_data: UserLoginModel, session: AsyncSession = Depends(get_
 @auth_router.get("/userDetails")
 async def get_user_details(token_details: dict = Depends(access_token_bearer),
                            session: AsyncSession = Depends(get_session)
-                           ) -> dict:
+                           ) -> UserResponseModel:
     """
     Endpoint to fetch user's details.
     """
@@ -117,17 +128,20 @@ async def get_user(token_details: dict = Depends(access_token_bearer),
 
 @auth_router.delete('/user/{user_uid}')
 async def delete_user(user_uid: str,
+                      background_tasks: BackgroundTasks,
+                      chunked: bool = False,
                       token_details: dict = Depends(access_token_bearer),
                       session: AsyncSession = Depends(get_session)
                       ) -> dict:
     """
     Endpoint to delete user account.
+    Use chunked=true for very active accounts. The account is disabled immediately and removed in the background.
     """
     current_user_id = token_details['id']
     if str(user_uid) != str(current_user_id):  # checks if current user is trying to delete another user
         raise InsufficientPermission()
 
-    await user_service.deleteUser(user_uid, session)
+    await user_service.deleteUser(user_uid, session, background_tasks, chunked)
 
     return {'message': f"User {token_details['userName']} has been deleted successfully"}
 
@@ -183,18 +197,22 @@ async def upload_avatar(token_details: dict = Depends(access_token_bearer), avat
                         session: AsyncSession = Depends(get_session)) -> dict:
     """Endpoint for uploading user avatar (profile picture)"""
 
-    # upload to Azure
-    avatar_url = await user_service.upload_avatar_to_storage(avatar, token_details['id'])
-
-    # update user record in the database with the new avatar URL
-    await user_service.updateUser(
-        user_id=token_details['id'],
-        user_update=UserUpdateRequestModel(avatar_url=avatar_url),
-        session=session
-    )
+    # resized variants to the blob storage, the user record gets the new avatar URL
+    avatar_url = await user_service.save_avatar(avatar, token_details['id'], session)
     return {"message": "Avatar uploaded and saved successfully", "avatar_url": avatar_url}
 
 
+@auth_router.get("/avatars/{user_uid}/{version}")
+async def get_avatar(user_uid: uuid.UUID, version: str = Path(pattern=r'^[0-9a-f]{16}$'),
+                     size: int = Query(DEFAULT_AVATAR_SIZE, gt=0), format: Literal['webp', 'jpg'] = 'webp'):
+    """
+    Size-aware avatar url (User.avatar_url). Redirects to the stored variant fitting the requested size in pixels.
+    The version is the content hash of the picture, so the redirect can be cached forever.
+    """
+    blob_name = avatar_variant_name(avatar_prefix(str(user_uid), version), variant_size(size), format)
+    return RedirectResponse(storage.url(blob_name), headers={'Cache-Control': AVATAR_CACHE_CONTROL})
+
+
 @auth_router.delete("/user/{user_uid}/upload_avatar")
 async def delete_avatar(token_details: dict = Depends(access_token_bearer),
                         session: AsyncSession = Depends(get_session)) -> dict:
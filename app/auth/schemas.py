@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
 
 
 class UserCreateModel(BaseModel):  # registration Model
@@ -27,3 +27,16 @@ class UserUpdateRequestModel(BaseModel):
 class UserPasswordChangeModel(BaseModel):
     oldPassword: str
     newPassword: str
+
+
+class UserResponseModel(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str = Field(alias='_id')
+    username: str
+    email: str
+    roles: List[str]
+    firstName: Optional[str] = None
+    lastName: Optional[str] = None
+    isActive: bool
+    avatar_url: Optional[str] = None  # size-aware, append ?size=<pixels>
@@ -3,13 +3,22 @@ from app.auth.security import generate_password_hash, verify_password
 from sqlmodel import (
     select,
     delete,
-    update
+    update,
+    or_
 )
+from sqlalchemy import func
+from app.db.main import async_session_maker
+from app.db.bulk import delete_in_batches
+from app.jobs.service import JobService, author_name_cache
+from app.cache import notify_invalidation
 from app.db.models import (
     User,
     JobLikes,
     Applications,
-    Jobs
+    Jobs,
+    Notification,
+    SavedSearch,
+    SavedSearchTerm
 )
 from app.auth.schemas import (
     UserCreateModel,
@@ -22,18 +31,25 @@ from app.errors import (
     UserEmailAlreadyExists,
     InvalidPictureFormat,
     InvalidPassword,
+    FileTooLarge,
 )
 from app.config import Config
-from azure.storage.blob import BlobServiceClient, ContentSettings
-from fastapi import UploadFile
-import os
-
-# initialize blob service using account URL + SAS token
-blob_service_client = BlobServiceClient(
-    account_url=Config.AZURE_BLOB_ACCOUNT_URL,
-    credential=Config.AZURE_BLOB_SAS_TOKEN
+from app.storage import storage
+from app.auth.avatars import (
+    avatar_processor,
+    avatar_version,
+    avatar_prefix,
+    avatar_variant_name,
+    avatar_url,
+    AVATAR_FORMATS,
+    AVATAR_CACHE_CONTROL
 )
-container_client = blob_service_client.get_container_client(Config.AZURE_BLOB_CONTAINER_NAME)
+from fastapi import UploadFile, BackgroundTasks
+from typing import Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class UserService:
@@ -80,14 +96,14 @@ class UserService:
     async def getUserDetails(self, user_id: str, session: AsyncSession):
         user = await self.get_user_by_uid(user_id, session)
         user_response_dict = {
-            # not using schemas, because Pydantic automatically excludes fields prefixed with an underscore
-            '_id': user.uid,
+            '_id': str(user.uid),
             'username': user.username,
             'email': user.email,
             'roles': [user.role],
             'firstName': user.firstName,
             'lastName': user.lastName,
-            'isActive': user.is_active
+            'isActive': user.is_active,
+            'avatar_url': user.avatar_url
         }
         return user_response_dict
 
@@ -107,34 +123,104 @@ class UserService:
         }
         return user_response_dict
 
-    async def deleteUser(self, user_id: str, session: AsyncSession):
+    async def deleteUser(self, user_id: str, session: AsyncSession, background_tasks: Optional[BackgroundTasks] = None,
+                         chunked: bool = False):
+        """
+        Delete the user and every row referencing it with set-based statements in one transaction.
+        With chunked, likes, applications and notifications are purged in chunks afterwards (needs background_tasks).
+        The avatar blobs are deleted by a background task when background_tasks is given.
+        """
         user = await self.get_user_by_uid(user_id, session)  # fetch the user from the db
         if not user:  # if user cannot be found
             raise UserNotFound()
-
-        # Remove likes by the user from all jobs
-        statement = select(JobLikes).where(JobLikes.user_id == user_id)
-        result = await session.exec(statement)
-        job_likes = result.all()  # Fetch all JobLikes instances
-
-        # Iterate through each job_like and delete it
-        for job_like in job_likes:
-            await session.delete(job_like)
-
-        # Determine user role
-        role = user.role
-
-        if role == 'USER':  # remove all applications made by the user
-            statement = delete(Applications).where(Applications.user_uid == user_id)
-            await session.exec(statement)
-
-        if role == 'ORGANIZATION':  # Set all jobs created by the organization to inactive (without touching the likes)
-            statement = update(Jobs).where(Jobs.uid == user_id).values(is_active=False)
+        avatar_blobs = list(user.avatar_blobs or [])
+
+        # Keep the likes counter of every liked job in sync before the likes are removed
+        liked_jobs = select(JobLikes.job_id).where(JobLikes.user_id == user_id)
+        await session.execute(update(Jobs).where(Jobs.uid.in_(liked_jobs)).values(likes=Jobs.likes - 1))
+
+        deactivated_jobs = []
+        if user.role == 'ORGANIZATION':  # hide the organization's jobs right away, they are deleted with it
+            statement = update(Jobs).where(Jobs.author_uid == user_id).values(is_active=False).returning(Jobs.uid)
+            result = await session.execute(statement)
+            deactivated_jobs = result.scalars().all()
+
+        if chunked:  # chunked mode for very active users, the purge deletes the avatar blobs too
+            user.is_active = False  # the account is disabled until the purge is done
+            await JobService.jobs_changed(session, removed=deactivated_jobs)
+            background_tasks.add_task(self.purge_user, user_id)
+            return
+
+        if user.role == 'ORGANIZATION':  # jobs.author_uid references the user: remove the jobs and their rows first
+            for statement in JobService.job_cascade_deletes(self.organization_jobs(user_id)):
+                await session.execute(statement)
+            await session.execute(delete(Jobs).where(Jobs.author_uid == user_id))
+
+        # Remove likes, applications (for regular users) and notifications
+        for statement in self.user_cascade_deletes(user_id, user.role):
             await session.execute(statement)
 
         # Finally delete the user
-        await session.delete(user)
-        await session.commit()
+        await session.execute(delete(User).where(User.uid == user_id))
+        await notify_invalidation(session, 'author_names', str(user_id))
+        await JobService.jobs_changed(session, removed=deactivated_jobs)
+        author_name_cache.invalidate(str(user_id))
+        if avatar_blobs:  # storage calls don't hold up the response
+            if background_tasks is not None:
+                background_tasks.add_task(self.delete_avatar_blobs, avatar_blobs)
+            else:
+                await self.delete_avatar_blobs(avatar_blobs)
+
+    @staticmethod
+    def organization_jobs(user_id: str):
+        """Subquery selecting the uids of the jobs posted by an organization."""
+        return select(Jobs.uid).where(Jobs.author_uid == user_id)
+
+    @staticmethod
+    def user_notification_filter(user_id: str):
+        """Notifications sent/received by the user or linked to one of the user's applications."""
+        user_applications = select(Applications.uid).where(Applications.user_uid == user_id)
+        return or_(Notification.recipient_uid == user_id,
+                   Notification.sender_uid == user_id,
+                   Notification.application_id.in_(user_applications))
+
+    def user_cascade_deletes(self, user_id: str, role: str) -> list:
+        """DELETE statements (in execution order) for all rows referencing a user."""
+        user_searches = select(SavedSearch.uid).where(SavedSearch.user_uid == user_id)
+        statements = [
+            delete(Notification).where(self.user_notification_filter(user_id)),
+            delete(JobLikes).where(JobLikes.user_id == user_id),
+            delete(SavedSearchTerm).where(SavedSearchTerm.saved_search_uid.in_(user_searches)),
+            delete(SavedSearch).where(SavedSearch.user_uid == user_id)
+        ]
+        if role == 'USER':  # remove all applications made by the user
+            statements.append(delete(Applications).where(Applications.user_uid == user_id))
+        return statements
+
+    async def purge_user(self, user_id: str):
+        """Delete a user and all rows referencing it in small chunks. Runs as a background task with its own session."""
+        async with async_session_maker() as session:
+            user = await self.get_user_by_uid(user_id, session)
+            if not user:  # already deleted
+                return
+
+            await delete_in_batches(session, Notification, [Notification.uid], self.user_notification_filter(user_id))
+            await delete_in_batches(session, JobLikes, [JobLikes.user_id, JobLikes.job_id], JobLikes.user_id == user_id)
+            user_searches = select(SavedSearch.uid).where(SavedSearch.user_uid == user_id)
+            await session.execute(delete(SavedSearchTerm).where(SavedSearchTerm.saved_search_uid.in_(user_searches)))
+            await session.execute(delete(SavedSearch).where(SavedSearch.user_uid == user_id))
+            if user.role == 'USER':
+                await delete_in_batches(session, Applications, [Applications.uid], Applications.user_uid == user_id)
+            elif user.role == 'ORGANIZATION':  # the organization's jobs, before the user they reference
+                await JobService.purge_jobs(self.organization_jobs(user_id), session)
+
+            avatar_blobs = list(user.avatar_blobs or [])
+            await session.execute(delete(User).where(User.uid == user_id))
+            await notify_invalidation(session, 'author_names', str(user_id))
+            await session.commit()
+            author_name_cache.invalidate(str(user_id))
+            if avatar_blobs:
+                await self.delete_avatar_blobs(avatar_blobs)
 
     async def updateUser(self, user_id: str, user_update: UserUpdateRequestModel, session: AsyncSession):
         user = await self.get_user_by_uid(user_id, session)  # fetch the user from the db
@@ -155,6 +241,7 @@ class UserService:
             user.avatar_url = user_update.avatar_url
 
         # Update fields only if new values are provided
+        username_changed = bool(user_update.username) and user_update.username != user.username
         if user_update.username:
             user.username = user_update.username
 
@@ -167,7 +254,15 @@ class UserService:
         if user_update.lastName:
             user.lastName = user_update.lastName
 
+        if username_changed:  # the username is cached as author name of the user's jobs in every worker
+            await notify_invalidation(session, 'author_names', str(user.uid))
+            # responses embedding the username carry the updated_at of these rows in their ETag, so touch them
+            await session.execute(update(Jobs).where(Jobs.author_uid == user.uid).values(updated_at=func.now()))
+            await session.execute(
+                update(Notification).where(Notification.sender_uid == user.uid).values(updated_at=func.now()))
         await session.commit()
+        if username_changed:
+            author_name_cache.invalidate(str(user.uid))
 
         user_response_dict = {
             # not using schemas, because Pydantic automatically excludes fields prefixed with an underscore
@@ -202,46 +297,74 @@ class UserService:
         await session.commit()  # add the changed password to db
         return {"message": "Password changed successfully"}
 
-    async def upload_avatar_to_storage(self, file: UploadFile, user_id: str) -> str:
-        file_extension = os.path.splitext(file.filename)[-1]
-        if file_extension.lower() not in ['.jpg', '.jpeg', '.png']:  # valid picture formats
+    async def upload_avatar_to_storage(self, file: UploadFile, user_id: str) -> tuple:
+        """
+        Validate a picture by its content and store its resized variants. The file name is ignored.
+        Returns the size-aware avatar url and the names of the stored blobs.
+        """
+        if file.size is not None and file.size > Config.AVATAR_MAX_BYTES:
+            raise FileTooLarge()
+        try:  # read whole, bounded by the size limit and the processor's slots (see render_upload)
+            rendered = await avatar_processor.render_upload(file, Config.AVATAR_MAX_BYTES)  # in the process pool
+        except ValueError:
             raise InvalidPictureFormat()
-
+        if rendered is None:
+            raise FileTooLarge()
+        data, variants = rendered
+
+        version = avatar_version(data)
+        prefix = avatar_prefix(user_id, version)
+        blob_names, uploads = [], []
+        for (size, extension), content in variants.items():
+            blob_name = avatar_variant_name(prefix, size, extension)
+            blob_names.append(blob_name)
+            uploads.append(storage.upload(blob_name, content, content_type=AVATAR_FORMATS[extension][1],
+                                          cache_control=AVATAR_CACHE_CONTROL))
         try:
-            blob_name = f"profile_pictures/{user_id}{file_extension}"
-
-            blob_client = container_client.get_blob_client(blob_name)
-            file_content = await file.read()
-            content_settings = ContentSettings(content_type=file.content_type)
-
-            blob_client.upload_blob(
-                file_content,
-                overwrite=True,  # override the old avatar picture
-                content_settings=content_settings
-            )
-
-            return blob_client.url
+            await asyncio.gather(*uploads)
         except Exception as e:
             raise RuntimeError(f"Failed to upload avatar: {str(e)}")
+        return avatar_url(user_id, version), blob_names
 
-    async def delete_avatar_from_storage(self, user_id: str, session: AsyncSession) -> dict:
-        extensions = ['.jpg', '.jpeg', '.png']  # all supported extensions
+    async def save_avatar(self, file: UploadFile, user_id: str, session: AsyncSession) -> str:
+        """Store a new avatar, record its blob names on the user and delete the blobs of the replaced avatar."""
+        user = await self.get_user_by_uid(user_id, session)
+        if not user:
+            raise UserNotFound()
 
-        deleted = False  # flag var
-        for ext in extensions:
-            blob_name = f"profile_pictures/{user_id}{ext}"
-            blob_client = container_client.get_blob_client(blob_name)
+        url, blob_names = await self.upload_avatar_to_storage(file, user_id)
+        stale_blobs = [name for name in user.avatar_blobs or [] if name not in blob_names]  # same picture, same names
+        user.avatar_url = url
+        user.avatar_blobs = blob_names
+        await session.commit()
+        if stale_blobs:
+            await self.delete_avatar_blobs(stale_blobs)
+        return url
+
+    @staticmethod
+    async def delete_avatar_blobs(blob_names: list) -> int:
+        """
+        Delete the blobs of an avatar which is not referenced anymore, in one batch. Also runs as a background task,
+        so failures are logged instead of raised (the blobs are orphaned, nothing points at them anymore).
+        """
+        try:
+            return await storage.delete_many(blob_names)
+        except Exception:
+            logger.exception("Failed to delete avatar blobs %s", blob_names)
+            return 0
 
+    async def delete_avatar_from_storage(self, user_id: str, session: AsyncSession) -> dict:
+        user = await self.get_user_by_uid(user_id, session)
+        deleted = 0
+        if user and user.avatar_blobs:  # the exact names, no existence checks needed
             try:
-                if blob_client.exists():
-                    blob_client.delete_blob()
-                    deleted = True
+                deleted = await storage.delete_many(user.avatar_blobs)
             except Exception as e:
                 raise RuntimeError(f"Failed to delete avatar: {str(e)}")
 
-        user = await self.get_user_by_uid(user_id, session)
         if user:
             user.avatar_url = None
+            user.avatar_blobs = None
             await session.commit()
 
         if deleted:
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+from sqlalchemy import text
+
+INVALIDATION_CHANNEL = 'cache_invalidation'  # Postgres NOTIFY channel shared by all workers
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU cache with an optional time-to-live for every entry.
+    A value loaded while an invalidation arrives may already be stale. Read `generation` before loading and pass it
+    to set: the value is only stored when nothing was invalidated in between.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl  # seconds, None means entries never expire
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0  # incremented by every invalidation
+        self._data = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or (entry[0] is not None and entry[0] < time.monotonic()):
+            if entry is not None:  # expired
+                del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)  # mark as most recently used
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        if generation is not None and generation != self.generation:  # loaded before an invalidation
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)  # evict the least recently used entry
+
+    def invalidate(self, key: Hashable) -> None:
+        self.generation += 1
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution whose result every caller receives."""
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0  # calls which waited for an execution started by another caller
+        self._in_flight = {}  # key -> asyncio.Task
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        # a cancelled caller (e.g. client disconnect) must not cancel the execution the others wait for
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._in_flight), "executed": self.executed, "coalesced": self.coalesced}
+
+shared_caches = {}  # name -> LRUCache whose invalidations are broadcast to every worker process
+
+
+def shared_cache(name: str, maxsize: int = 1024, ttl: Optional[float] = None) -> LRUCache:
+    """Create an LRUCache that app.db.listener keeps consistent across workers with LISTEN/NOTIFY."""
+    cache = shared_caches[name] = LRUCache(maxsize, ttl)
+    return cache
+
+
+async def notify_invalidation(session, name: str, key: Optional[str] = None) -> None:
+    """
+    Queue the invalidation of a key (every key when None) of a shared cache for all workers.
+    NOTIFY is transactional: it is delivered when the caller commits and dropped on rollback.
+    The caller still invalidates its own cache right after the commit, so it reads its own writes.
+    """
+    payload = json.dumps({"cache": name, "key": key})
+    await session.execute(text("SELECT pg_notify(:channel, :payload)"),
+                          {"channel": INVALIDATION_CHANNEL, "payload": payload})
+
+
+def apply_invalidation(payload: str) -> None:
+    """Apply an invalidation received from another worker."""
+    message = json.loads(payload)
+    cache = shared_caches.get(message["cache"])
+    if cache is None:
+        return
+    if message["key"] is None:
+        cache.clear()
+    else:
+        cache.invalidate(message["key"])
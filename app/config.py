@@ -1,3 +1,5 @@
+from typing import Optional
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,9 +8,36 @@ class Settings(BaseSettings):
     JWT_SECRET: str
     JWT_ALGORITHM: str
 
-    AZURE_BLOB_ACCOUNT_URL: str
-    AZURE_BLOB_CONTAINER_NAME: str
-    AZURE_BLOB_SAS_TOKEN: str
+    STORAGE_BACKEND: str = "azure"  # "azure" or "local"
+    AZURE_BLOB_ACCOUNT_URL: Optional[str] = None  # required by the azure backend only
+    AZURE_BLOB_CONTAINER_NAME: Optional[str] = None
+    AZURE_BLOB_SAS_TOKEN: Optional[str] = None
+    LOCAL_STORAGE_DIR: str = "var/storage"  # root directory of the local backend
+    LOCAL_STORAGE_URL: str = "/files"  # path the local backend's blobs are served under
+    BLOB_BLOCK_SIZE: int = 4 * 1024 * 1024  # bytes per staged block (and per read from the upload)
+    BLOB_MAX_CONCURRENCY: int = 4  # blocks of one upload in flight at the same time
+    AVATAR_MAX_BYTES: int = 5 * 1024 * 1024  # larger avatar uploads are rejected with 413
+    ATTACHMENT_MAX_BYTES: int = 10 * 1024 * 1024  # larger CV uploads are rejected with 413
+    EXTRACTION_PROCESSES: int = 2  # processes of the attachment text extraction worker
+    EXTRACTION_BATCH_SIZE: int = 20  # attachments claimed per transaction
+    EXTRACTION_MAX_CHARS: int = 100_000  # extracted text is truncated to this length
+    EXTRACTION_IDLE_SECONDS: int = 10  # pause of the worker when there is nothing to extract
+    AVATAR_WORKERS: int = 2  # processes resizing avatars, per application worker
+    AVATAR_QUEUE_SIZE: int = 8  # avatars waiting for a free process before uploads wait on the event loop
+
+    SERVER_TIMING: bool = True  # report the request's SQL statements and time in a Server-Timing header
+    N_PLUS_ONE_THRESHOLD: int = 5  # executions of one statement shape in a request from which it's flagged as N+1
+    QUERY_BUDGET_STRICT: bool = False  # fail requests exceeding their route's query budget (tests, development)
+
+    BULK_DELETE_BATCH_SIZE: int = 5000  # rows deleted per transaction when purging in chunks
+
+    SIMILARITY_INDEX_DIR: str = "var/similarity_index"  # memory-mapped TF-IDF snapshots shared by all workers
+    SIMILARITY_PERSIST_EVERY: int = 500  # job changes collected by a worker before it writes a new snapshot
+    SIMILARITY_PERSIST_SECONDS: int = 30  # longest time changes of a worker stay invisible to the other workers
+
+    TRENDING_HALF_LIFE_HOURS: float = Field(default=72, gt=0)  # a like/application counts half as much after this time
+    TRENDING_SIZE: int = 100  # number of jobs kept in the in-process trending leaderboard
+    TRENDING_REFRESH_SECONDS: int = 30  # how often the leaderboard is reloaded from the rollup table
     model_config = SettingsConfigDict(  # read out .env file
         env_file=".env",
         extra="ignore"
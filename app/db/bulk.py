@@ -0,0 +1,28 @@
+from sqlalchemy import tuple_
+from sqlmodel import select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import Config
+
+
+async def delete_in_batches(session: AsyncSession, model, key_columns: list, *criteria,
+                            batch_size: int = None) -> int:
+    """
+    Delete all rows of `model` matching `criteria` in chunks of `batch_size`.
+    Every chunk is committed on its own, so row locks are held only for a short time.
+    Returns the total number of deleted rows.
+    """
+    batch_size = batch_size or Config.BULK_DELETE_BATCH_SIZE
+    if len(key_columns) == 1:
+        key = key_columns[0]
+    else:  # composite primary key (e.g. job_likes)
+        key = tuple_(*key_columns)
+
+    total_deleted = 0
+    while True:
+        batch = select(*key_columns).where(*criteria).limit(batch_size)
+        result = await session.execute(delete(model).where(key.in_(batch)))
+        await session.commit()  # release the locks after every chunk
+
+        total_deleted += result.rowcount
+        if result.rowcount < batch_size:  # nothing left to delete
+            return total_deleted
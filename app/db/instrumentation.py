@@ -0,0 +1,121 @@
+"""
+SQLAlchemy engine and pool event hooks. Statements are counted and timed per request: the request middleware puts
+a RequestQueries object into a context variable, which the hooks update (SQLAlchemy runs the sync events in a
+greenlet sharing the context of the calling task). Outside of requests only the global metrics are updated.
+The per-request statements also feed the N+1 detection and the query budgets of the routes. Counting stops once
+the response is sent: background tasks run in the request's context afterwards, but are not part of the request.
+"""
+import re
+import time
+from contextvars import ContextVar
+from typing import Optional
+from prometheus_client import Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.config import Config
+from app.errors import QueryBudgetExceeded
+
+DB_STATEMENT_SECONDS = Histogram(
+    'db_statement_duration_seconds', 'Execution time of SQL statements',
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+)
+DB_POOL_IN_USE = Gauge('db_pool_connections_in_use', 'Connections checked out of the pool', multiprocess_mode='livesum')
+DB_POOL_OPEN = Gauge('db_pool_connections_open', 'Open database connections of the pool', multiprocess_mode='livesum')
+
+
+PLACEHOLDER = re.compile(r"\$\d+(?:::\w+(?:\[\])?)?")  # asyncpg bind parameters, with their casts
+PLACEHOLDER_LIST = re.compile(r"\?(?:, \?)+")  # expanded IN lists
+
+
+def statement_shape(statement: str) -> str:
+    """A statement with its bind parameters and IN lists collapsed, the same for every iteration of a loop."""
+    return PLACEHOLDER_LIST.sub('?', PLACEHOLDER.sub('?', ' '.join(statement.split())))
+
+
+class RequestQueries:
+    __slots__ = ('count', 'seconds', 'statements', 'budget', 'budget_start', 'over_budget', 'finished')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = {}  # statement -> executions, shapes are only computed at the end of the request
+        self.budget = None  # set by QueryBudget
+        self.budget_start = 0  # statements executed before the budget applied (dependencies)
+        self.over_budget = False
+        self.finished = False  # set when the response is sent, the background tasks' statements are not counted
+
+    def repeated(self, threshold: int) -> list:
+        """[(shape, executions)] of the statement shapes executed at least threshold times: likely N+1 loops."""
+        shapes = {}
+        for statement, executions in self.statements.items():
+            shape = statement_shape(statement)
+            shapes[shape] = shapes.get(shape, 0) + executions
+        return [(shape, executions) for shape, executions in shapes.items() if executions >= threshold]
+
+
+current_queries: ContextVar[Optional[RequestQueries]] = ContextVar('current_queries', default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._started_at
+    DB_STATEMENT_SECONDS.observe(elapsed)
+    queries = current_queries.get()
+    if queries is not None and not queries.finished:
+        queries.count += 1
+        queries.seconds += elapsed
+        queries.statements[statement] = queries.statements.get(statement, 0) + 1
+        if (queries.budget is not None and not queries.over_budget
+                and queries.count - queries.budget_start > queries.budget):
+            queries.over_budget = True
+            if Config.QUERY_BUDGET_STRICT:  # fail the request right at the statement exceeding the budget
+                raise QueryBudgetExceeded(f"More than {queries.budget} statements, exceeded by: {statement}")
+
+
+class QueryBudget:
+    """
+    Route dependency limiting the SQL statements an endpoint executes, e.g. `query_budget: None = Depends(QueryBudget(3))`.
+    Declare it as the last parameter: dependencies are resolved in order, so the statements of the ones before it
+    (authentication, loading the current user) don't count. Exceeding requests are logged and counted in /metrics.
+    With QUERY_BUDGET_STRICT (tests, development) the statement exceeding the budget raises QueryBudgetExceeded.
+    """
+
+    def __init__(self, statements: int):
+        self.statements = statements
+
+    async def __call__(self):
+        queries = current_queries.get()
+        if queries is not None:
+            queries.budget = self.statements
+            queries.budget_start = queries.count
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_IN_USE.inc()
+
+
+def _checkin(dbapi_connection, connection_record):
+    DB_POOL_IN_USE.dec()
+
+
+def _connect(dbapi_connection, connection_record):
+    DB_POOL_OPEN.inc()
+
+
+def _close(dbapi_connection, connection_record):
+    DB_POOL_OPEN.dec()
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Register the hooks on the sync engine behind an AsyncEngine (events are not available on the async facade)."""
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(sync_engine.pool, 'checkout', _checkout)
+    event.listen(sync_engine.pool, 'checkin', _checkin)
+    event.listen(sync_engine.pool, 'connect', _connect)
+    event.listen(sync_engine.pool, 'close', _close)
+    event.listen(sync_engine.pool, 'detach', _close)  # invalidated connections leave the pool's accounting too
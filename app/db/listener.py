@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import asyncpg
+from sqlalchemy.engine import make_url
+from app.cache import INVALIDATION_CHANNEL, shared_caches, apply_invalidation
+from app.config import Config
+
+RECONNECT_DELAY = 5  # seconds between attempts to re-establish the LISTEN connection
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationListener:
+    """
+    Keeps one dedicated connection (outside the SQLAlchemy pool) LISTENing for shared cache invalidations.
+    Started and stopped with the application lifespan.
+    """
+
+    def __init__(self):
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        dsn = make_url(Config.DATABASE_URL).set(drivername='postgresql').render_as_string(hide_password=False)
+        while True:
+            try:
+                connection = await asyncpg.connect(dsn)
+            except (OSError, asyncpg.PostgresError):
+                logger.warning("Cache invalidation listener could not connect, retrying")
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+            try:
+                await connection.add_listener(INVALIDATION_CHANNEL, self._on_notification)
+                # notifications sent while we were not listening are lost, so start from empty caches
+                for cache in shared_caches.values():
+                    cache.clear()
+                await closed.wait()
+            finally:
+                if not connection.is_closed():
+                    await connection.close()
+            logger.warning("Cache invalidation listener lost its connection, reconnecting")
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    @staticmethod
+    def _on_notification(connection, pid, channel, payload):
+        apply_invalidation(payload)
+
+
+invalidation_listener = InvalidationListener()
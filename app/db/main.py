@@ -2,9 +2,17 @@ from sqlmodel import SQLModel
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlmodel.ext.asyncio.session import AsyncSession
 from app.config import Config
+from app.db.instrumentation import instrument_engine
 
 
 engine = create_async_engine(url = Config.DATABASE_URL)
+instrument_engine(engine)  # statement timings, per-request query counts and pool gauges for /metrics
+
+async_session_maker = async_sessionmaker(  # we have to bond it with our AsyncEngine to carry out our CRUD
+    bind=engine,
+    class_=AsyncSession,
+    expire_on_commit=False  # every session can be used after commiting
+)
 
 async def init_db():
     async with engine.begin() as conn:
@@ -13,11 +21,5 @@ async def init_db():
         # function to return our session
 
 async def get_session() -> AsyncSession:
-    async_session = async_sessionmaker(  # we have to bond it with our AsyncEngine to carry out our CRUD
-        bind=engine,
-        class_=AsyncSession,
-        expire_on_commit=False  # every session can be used after commiting
-    )
-
-    async with async_session() as session:
+    async with async_session_maker() as session:
         yield session
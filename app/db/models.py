@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Column, Relationship
+from sqlalchemy import Computed, Index, func
 import sqlalchemy.dialects.postgresql as pg
 from typing import List, Optional
 from enum import Enum
@@ -27,6 +28,8 @@ class User(SQLModel, table=True):
     lastName: Optional[str] = Field(default=None)
     is_active: bool = Field(default=True, nullable=False)
     avatar_url: Optional[str] = Field(default=None, nullable=True)
+    # exact blob names of the avatar (all variants), deleted without probing the storage
+    avatar_blobs: Optional[List[str]] = Field(default=None, sa_column=Column(pg.ARRAY(pg.VARCHAR), nullable=True))
     # Relationships (lazy='selectin' argument optimizes query performance)
     applications: List['Applications'] = Relationship(back_populates='user', sa_relationship_kwargs={
         'lazy': 'selectin'})  # A user can submit multiple job applications. (one-to-many relationship)
@@ -62,6 +65,15 @@ class Jobs(SQLModel, table=True):
     category: str = Field(nullable=False)
     author_uid: uuid.UUID = Field(foreign_key="users.uid", nullable=False)
     is_active: bool = Field(default=True)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(pg.TIMESTAMP, nullable=False, server_default=func.now())
+    )
+    updated_at: datetime = Field(  # bumped by the set_updated_at trigger on every UPDATE
+        default_factory=datetime.utcnow,
+        sa_column=Column(pg.TIMESTAMP, nullable=False, server_default=func.now())
+    )
+    duplicate_of: Optional[uuid.UUID] = Field(default=None, foreign_key="jobs.uid", nullable=True)  # near-duplicate posting
     author: 'User' = Relationship(
         back_populates='jobs', sa_relationship_kwargs={
             'lazy': 'selectin'})  # A job is created by one user (organization)  (Many-to-one relationship)
@@ -73,10 +85,33 @@ class Jobs(SQLModel, table=True):
             'lazy': 'selectin'})  # A job can be liked by multiple users and multiple users can like one job.  (Many-to-many relationship)
 
 
+# Full-text search document of a job, generated and kept in sync by Postgres.
+# The column is added to the table only (not mapped on the model), so the ORM never loads or writes it.
+Jobs.__table__.append_column(Column(
+    'search_vector',
+    pg.TSVECTOR,
+    Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+        persisted=True
+    )
+))
+Index('ix_jobs_search_vector', Jobs.__table__.c.search_vector, postgresql_using='gin')
+# Trigram indexes (pg_trgm) for typo tolerant autocomplete over active jobs
+Index('ix_jobs_title_trgm', Jobs.__table__.c.title, postgresql_using='gin',
+      postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_where=Jobs.__table__.c.is_active)
+Index('ix_jobs_category_trgm', Jobs.__table__.c.category, postgresql_using='gin',
+      postgresql_ops={'category': 'gin_trgm_ops'}, postgresql_where=Jobs.__table__.c.is_active)
+
+
 class JobLikes(SQLModel, table=True):  # association table, which maps user IDs to job IDs.
     __tablename__ = "job_likes"
     user_id: uuid.UUID = Field(foreign_key="users.uid", primary_key=True)
     job_id: uuid.UUID = Field(foreign_key="jobs.uid", primary_key=True)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(pg.TIMESTAMP, nullable=False, server_default=func.now())
+    )
     user: 'User' = Relationship(
         back_populates='liked_jobs')  # Many-to-one relationship with User. A like is associated with one user.
     job: 'Jobs' = Relationship(
@@ -107,7 +142,14 @@ class Applications(SQLModel, table=True):
         nullable=False  # Prevent NULL values
     )
     coverLetter: str = Field(nullable=False)
+    attachment_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="attachments.uid", nullable=True,
+                                                index=True)  # CV
+    attachment_name: Optional[str] = Field(default=None, nullable=True)  # file name given by the applicant
     appliedAt: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+    updated_at: datetime = Field(  # bumped by the set_updated_at trigger on every UPDATE
+        default_factory=datetime.utcnow,
+        sa_column=Column(pg.TIMESTAMP, nullable=False, server_default=func.now())
+    )
 
     # Relationships
     user: 'User' = Relationship(
@@ -118,6 +160,45 @@ class Applications(SQLModel, table=True):
             'lazy': 'selectin'})  # Many-to-one relationship with Jobs. An application is for one job.
 
 
+# Full-text search document of an application's CV, written by the extraction worker from the attachment text.
+# Like the jobs search_vector, it is not mapped on the model, so the ORM never loads it.
+Applications.__table__.append_column(Column('resume_vector', pg.TSVECTOR, nullable=True))
+Index('ix_applications_resume_vector', Applications.__table__.c.resume_vector, postgresql_using='gin')
+# Cover letter term counts packed by app.applications.relevance.pack_terms when the application is created, for
+# BM25 ranking without re-tokenizing every letter. Not mapped either: user.applications loads applications eagerly.
+Applications.__table__.append_column(Column('cover_letter_terms', pg.BYTEA, nullable=True))
+Applications.__table__.append_column(Column('cover_letter_length', pg.INTEGER, nullable=True))
+
+
+class Attachments(SQLModel, table=True):  # uploaded files, stored once per content and shared by applications
+    __tablename__ = 'attachments'
+    uid: uuid.UUID = Field(
+        default_factory=uuid.uuid4,
+        sa_column=Column(
+            pg.UUID,
+            primary_key=True,
+            unique=True,
+            nullable=False
+        )
+    )
+    sha256: str = Field(sa_column=Column(pg.VARCHAR(64), nullable=False, unique=True))  # hex digest of the content
+    size: int = Field(sa_column=Column(pg.BIGINT, nullable=False))
+    content_type: str = Field(nullable=False)
+    blob_name: str = Field(nullable=False)
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(pg.TIMESTAMP, nullable=False)
+    )
+    # set by the extraction worker (app.applications.extraction), attachments without it are still queued
+    text: Optional[str] = Field(default=None, nullable=True)  # normalized plain text
+    extraction_error: Optional[str] = Field(default=None, nullable=True)
+    extracted_at: Optional[datetime] = Field(default=None, sa_column=Column(pg.TIMESTAMP, nullable=True))
+
+
+# Extraction backlog of the worker
+Index('ix_attachments_pending_extraction', Attachments.created_at, postgresql_where=Attachments.extracted_at == None)
+
+
 class Notification(SQLModel, table=True):
     __tablename__ = 'notifications'
     uid: uuid.UUID = Field(
@@ -139,6 +220,10 @@ class Notification(SQLModel, table=True):
         default_factory=datetime.utcnow,
         sa_column=Column(pg.TIMESTAMP, nullable=False)
     )
+    updated_at: datetime = Field(  # bumped by the set_updated_at trigger on every UPDATE
+        default_factory=datetime.utcnow,
+        sa_column=Column(pg.TIMESTAMP, nullable=False, server_default=func.now())
+    )
     # Fields for linking notifications to jobs or applications (based on notification type)
     job_id: Optional[uuid.UUID] = Field(foreign_key="jobs.uid", default=None, nullable=True)
     application_id: Optional[uuid.UUID] = Field(foreign_key="applications.uid", default=None, nullable=True)
@@ -152,3 +237,69 @@ class Notification(SQLModel, table=True):
         back_populates="notifications_sent",
         sa_relationship_kwargs={"foreign_keys": "Notification.sender_uid", "lazy": "selectin"}
     )
+
+
+class SavedSearch(SQLModel, table=True):
+    __tablename__ = 'saved_searches'
+    uid: uuid.UUID = Field(
+        default_factory=uuid.uuid4,
+        sa_column=Column(
+            pg.UUID,
+            primary_key=True,
+            unique=True,
+            nullable=False
+        )
+    )
+    user_uid: uuid.UUID = Field(foreign_key="users.uid", nullable=False, index=True)
+    keywords: str = Field(default='', nullable=False)
+    category: Optional[str] = Field(default=None, nullable=True)
+    type: Optional[str] = Field(default=None, nullable=True)
+    term_count: int = Field(nullable=False)  # a job matches when it contains all terms of the search
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(pg.TIMESTAMP, nullable=False)
+    )
+
+
+class SavedSearchTerm(SQLModel, table=True):  # inverted index, which maps a term to the saved searches containing it
+    __tablename__ = 'saved_search_terms'
+    term: str = Field(primary_key=True)
+    saved_search_uid: uuid.UUID = Field(foreign_key="saved_searches.uid", primary_key=True)
+
+
+class JobNeighbours(SQLModel, table=True):  # precomputed item-item neighbours for recommendations
+    __tablename__ = 'job_neighbours'
+    job_uid: uuid.UUID = Field(foreign_key="jobs.uid", primary_key=True)
+    neighbour_uids: List[uuid.UUID] = Field(sa_column=Column(pg.ARRAY(pg.UUID(as_uuid=True)), nullable=False))
+    scores: List[float] = Field(sa_column=Column(pg.ARRAY(pg.REAL), nullable=False))  # same order as neighbour_uids
+    computed_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(pg.TIMESTAMP, nullable=False)
+    )
+
+
+class JobTrending(SQLModel, table=True):  # rollup of likes and applications with forward exponential decay
+    __tablename__ = 'job_trending'
+    job_uid: uuid.UUID = Field(foreign_key="jobs.uid", primary_key=True)
+    # log2 of the sum of weight * 2 ^ ((event time - epoch) / half-life), -Infinity once the events cancelled out.
+    # Ordering by it equals ordering by the decayed score
+    log_score: float = Field(sa_column=Column(pg.DOUBLE_PRECISION, nullable=False, index=True))
+
+
+class TrendingSettings(SQLModel, table=True):  # single row: the half-life the stored trending scores are based on
+    __tablename__ = 'trending_settings'
+    id: int = Field(default=1, primary_key=True)
+    half_life_hours: float = Field(sa_column=Column(pg.DOUBLE_PRECISION, nullable=False))
+
+
+class JobMinHash(SQLModel, table=True):  # MinHash signature of a job's title + description
+    __tablename__ = 'job_minhashes'
+    job_uid: uuid.UUID = Field(foreign_key="jobs.uid", primary_key=True)
+    signature: bytes = Field(sa_column=Column(pg.BYTEA, nullable=False))
+
+
+class JobLshBand(SQLModel, table=True):  # LSH index: jobs sharing a (band, bucket) are near-duplicate candidates
+    __tablename__ = 'job_lsh_bands'
+    band: int = Field(sa_column=Column(pg.SMALLINT, primary_key=True))
+    bucket: int = Field(sa_column=Column(pg.BIGINT, primary_key=True))
+    job_uid: uuid.UUID = Field(foreign_key="jobs.uid", primary_key=True, index=True)
@@ -115,7 +115,47 @@ class InvalidApplicationStatus(JobFinderException):
 
 
 class InvalidPictureFormat(JobFinderException):
-    """Picture format should be .jpeg, .jpg or .png"""
+    """Picture should be a JPEG, PNG or WebP image"""
+    pass
+
+
+class InvalidCursor(JobFinderException):
+    """Pagination cursor is malformed or was not issued by this API"""
+    pass
+
+
+class SavedSearchNotFound(JobFinderException):
+    """Saved search Not found"""
+    pass
+
+
+class InvalidFields(JobFinderException):
+    """Requested a field that the endpoint does not return"""
+    pass
+
+
+class FileTooLarge(JobFinderException):
+    """Uploaded file exceeds the allowed size"""
+    pass
+
+
+class InvalidAttachment(JobFinderException):
+    """Attachment should be a PDF or DOCX document"""
+    pass
+
+
+class AttachmentNotFound(JobFinderException):
+    """Application attachment Not found"""
+    pass
+
+
+class QueryBudgetExceeded(JobFinderException):
+    """An endpoint executed more SQL statements than its query budget allows (QUERY_BUDGET_STRICT only)"""
+    pass
+
+
+class BlobNotFound(JobFinderException):
+    """Stored file Not found"""
     pass
 
 
@@ -144,7 +184,7 @@ def register_all_errors(app: FastAPI):
         create_exception_handler(
             status_code=status.HTTP_403_FORBIDDEN,
             initial_detail={
-                "message": "Picture format should be .jpeg, .jpg or .png",
+                "message": "Picture should be a JPEG, PNG or WebP image",
                 "error_code": "invalid_picture_format",
             },
         ),
@@ -350,6 +390,86 @@ def register_all_errors(app: FastAPI):
             },
         ),
     )
+    app.add_exception_handler(
+        InvalidCursor,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "Invalid pagination cursor",
+                "error_code": "invalid_cursor",
+            },
+        ),
+    )
+    app.add_exception_handler(
+        SavedSearchNotFound,
+        create_exception_handler(
+            status_code=status.HTTP_404_NOT_FOUND,
+            initial_detail={
+                "message": "Saved search not found",
+                "error_code": "saved_search_not_found",
+            },
+        ),
+    )
+    app.add_exception_handler(
+        InvalidFields,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "Unknown field requested",
+                "error_code": "invalid_fields",
+            },
+        ),
+    )
+    app.add_exception_handler(
+        FileTooLarge,
+        create_exception_handler(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            initial_detail={
+                "message": "File is too large",
+                "error_code": "file_too_large",
+            },
+        ),
+    )
+    app.add_exception_handler(
+        InvalidAttachment,
+        create_exception_handler(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            initial_detail={
+                "message": "Attachment should be a PDF or DOCX document",
+                "error_code": "invalid_attachment",
+            },
+        ),
+    )
+    app.add_exception_handler(
+        AttachmentNotFound,
+        create_exception_handler(
+            status_code=status.HTTP_404_NOT_FOUND,
+            initial_detail={
+                "message": "Attachment not found",
+                "error_code": "attachment_not_found",
+            },
+        ),
+    )
+    app.add_exception_handler(
+        BlobNotFound,
+        create_exception_handler(
+            status_code=status.HTTP_404_NOT_FOUND,
+            initial_detail={
+                "message": "File not found",
+                "error_code": "file_not_found",
+            },
+        ),
+    )
+    app.add_exception_handler(
+        QueryBudgetExceeded,
+        create_exception_handler(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            initial_detail={
+                "message": "Query budget exceeded",
+                "error_code": "query_budget_exceeded",
+            },
+        ),
+    )
 
     @app.exception_handler(500)
     async def internal_server_error(request, exc):
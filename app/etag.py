@@ -0,0 +1,21 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag derived from the values a response depends on (ids, counts, updated_at timestamps)."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """An empty 304 response when the client's If-None-Match matches the etag, else None."""
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return None
+    # weak comparison, the W/ prefix is ignored
+    client_tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    if '*' in client_tags or etag.removeprefix('W/') in client_tags:
+        return Response(status_code=304, headers={'ETag': etag})
+    return None
@@ -0,0 +1,212 @@
+"""
+Near-duplicate job detection with MinHash signatures and an LSH band index.
+
+    python -m app.jobs.dedup    # index jobs without a signature and cluster existing duplicates
+"""
+import asyncio
+import hashlib
+import zlib
+import numpy as np
+from sqlalchemy import tuple_, update
+from sqlmodel import select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.models import Jobs, JobMinHash, JobLshBand
+from app.text import tokenize
+
+NUM_PERM = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS  # candidates from ~70% Jaccard similarity
+SHINGLE_SIZE = 5  # words per shingle
+DUPLICATE_THRESHOLD = 0.8  # estimated Jaccard similarity from which a job is flagged as duplicate
+BATCH_SIZE = 1000
+MAX_BUCKET_REPRESENTATIVES = 64  # signatures a bucket member is compared with, keeps boilerplate buckets linear
+
+# multiply-add-shift hashing: ((a * x + b) mod 2^64) >> 32 with a random odd a, a universal family of hash functions.
+# The multiplication wraps around, so the order of the shingles differs from one permutation to the next
+_rng = np.random.default_rng(20250625)  # fixed seed, signatures must be comparable across processes and runs
+_A = _rng.integers(0, 1 << 64, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 1 << 64, size=NUM_PERM, dtype=np.uint64)
+_SHIFT = np.uint64(32)
+
+
+def minhash(title: str, description: str) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint32 values) over the word shingles of a job."""
+    tokens = tokenize(f"{title} {description or ''}")
+    shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(max(len(tokens) - SHINGLE_SIZE + 1, 1))}
+    hashes = np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64,
+                         count=len(shingles))
+    # all permutations at once, for every (permutation, shingle) pair. uint64 arrays wrap around on overflow
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) >> _SHIFT
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> list:
+    """(band, bucket) pairs of a signature. Jobs sharing any pair are duplicate candidates."""
+    return [
+        (band, int.from_bytes(hashlib.blake2b(rows.tobytes(), digest_size=8).digest(), 'big') >> 1)  # fits a BIGINT
+        for band, rows in enumerate(signature.reshape(BANDS, ROWS_PER_BAND))
+    ]
+
+
+def similarity(signature: np.ndarray, other: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(signature == other))
+
+
+class DedupService:
+
+    async def index_job(self, job: Jobs, session: AsyncSession):
+        """
+        Store the signature and LSH bands of a created/updated job and flag it when it nearly duplicates another job.
+        Runs in the caller's transaction, the caller has to commit.
+        """
+        signature = minhash(job.title, job.description)
+        buckets = band_buckets(signature)
+
+        await self.store_signature(job.uid, signature, buckets, session)
+        job.duplicate_of = await self.find_original(job.uid, signature, buckets, session)
+
+    async def find_original(self, job_uid, signature: np.ndarray, buckets: list, session: AsyncSession):
+        """
+        Return the uid of the job this one duplicates (oldest job of the cluster) or None. Never the job itself:
+        when an original is updated, its own duplicates are among the candidates and are skipped.
+        """
+        candidates = (
+            select(JobLshBand.job_uid)
+            .where(tuple_(JobLshBand.band, JobLshBand.bucket).in_(buckets), JobLshBand.job_uid != job_uid)
+            .distinct()
+        )
+        statement = (
+            select(JobMinHash.signature, Jobs.uid, Jobs.duplicate_of)
+            .join(Jobs, Jobs.uid == JobMinHash.job_uid)
+            .where(JobMinHash.job_uid.in_(candidates))
+            .order_by(Jobs.created_at)
+        )
+        result = await session.execute(statement)
+        for candidate_signature, candidate_uid, candidate_original in result.all():
+            if str(candidate_original) == str(job_uid):
+                continue
+            if similarity(signature, np.frombuffer(candidate_signature, dtype=np.uint32)) >= DUPLICATE_THRESHOLD:
+                return candidate_original or candidate_uid
+        return None
+
+    @staticmethod
+    async def store_signature(job_uid, signature: np.ndarray, buckets: list, session: AsyncSession):
+        await session.execute(delete(JobMinHash).where(JobMinHash.job_uid == job_uid))
+        await session.execute(delete(JobLshBand).where(JobLshBand.job_uid == job_uid))
+        session.add(JobMinHash(job_uid=job_uid, signature=signature.tobytes()))
+        session.add_all([JobLshBand(band=band, bucket=bucket, job_uid=job_uid) for band, bucket in buckets])
+
+    @staticmethod
+    def cascade_deletes(job_uids) -> list:
+        """
+        Statements removing the dedup rows of deleted jobs (a list of uids or a subquery selecting them)
+        and unflagging their duplicates.
+        """
+        return [
+            update(Jobs).where(Jobs.duplicate_of.in_(job_uids)).values(duplicate_of=None),
+            delete(JobLshBand).where(JobLshBand.job_uid.in_(job_uids)),
+            delete(JobMinHash).where(JobMinHash.job_uid.in_(job_uids))
+        ]
+
+
+async def index_missing(session: AsyncSession) -> int:
+    """Compute signatures for all jobs which don't have one yet, in batches."""
+    indexed = 0
+    while True:
+        statement = (
+            select(Jobs.uid, Jobs.title, Jobs.description)
+            .outerjoin(JobMinHash, JobMinHash.job_uid == Jobs.uid)
+            .where(JobMinHash.job_uid == None)
+            .limit(BATCH_SIZE)
+        )
+        result = await session.execute(statement)
+        jobs = result.all()
+        if not jobs:
+            return indexed
+
+        signatures = await asyncio.to_thread(lambda: [minhash(job.title, job.description) for job in jobs])
+        for job, signature in zip(jobs, signatures):
+            await DedupService.store_signature(job.uid, signature, band_buckets(signature), session)
+        await session.commit()
+        indexed += len(jobs)
+
+
+async def cluster_duplicates(session: AsyncSession) -> int:
+    """
+    Group existing jobs into near-duplicate clusters and point every job at the oldest job of its cluster.
+    Candidate pairs come from shared LSH buckets and are verified with the full signatures.
+    """
+    parent = {}
+
+    def find(job_uid):
+        parent.setdefault(job_uid, job_uid)
+        while parent[job_uid] != job_uid:
+            parent[job_uid] = parent[parent[job_uid]]  # path halving
+            job_uid = parent[job_uid]
+        return job_uid
+
+    statement = (
+        select(JobLshBand.band, JobLshBand.bucket, JobLshBand.job_uid, JobMinHash.signature)
+        .join(JobMinHash, JobMinHash.job_uid == JobLshBand.job_uid)
+        .order_by(JobLshBand.band, JobLshBand.bucket)
+    )
+    result = await session.stream(statement.execution_options(yield_per=BATCH_SIZE * 10))
+    bucket_key, members = None, []
+    async for band, bucket, job_uid, signature in result:
+        if (band, bucket) != bucket_key:
+            _union_bucket(members, find, parent)
+            bucket_key, members = (band, bucket), []
+        members.append((job_uid, np.frombuffer(signature, dtype=np.uint32)))
+    _union_bucket(members, find, parent)
+
+    clusters = {}
+    for job_uid in parent:
+        clusters.setdefault(find(job_uid), []).append(job_uid)
+    clusters = [cluster for cluster in clusters.values() if len(cluster) > 1]
+
+    flagged = uncommitted = 0
+    for cluster in clusters:
+        result = await session.execute(select(Jobs.uid).where(Jobs.uid.in_(cluster)).order_by(Jobs.created_at))
+        original, *duplicates = result.scalars().all()
+        await session.execute(update(Jobs).where(Jobs.uid == original).values(duplicate_of=None))
+        await session.execute(update(Jobs).where(Jobs.uid.in_(duplicates)).values(duplicate_of=original))
+        flagged += len(duplicates)
+        uncommitted += len(duplicates)
+        if uncommitted >= BATCH_SIZE:  # short transactions
+            await session.commit()
+            uncommitted = 0
+    await session.commit()
+    return flagged
+
+
+def _union_bucket(members: list, find, parent: dict):
+    """
+    Union the verified duplicates among the jobs sharing one LSH bucket. Every member is compared with the
+    bucket's representatives only (the first job of every group found so far, at most MAX_BUCKET_REPRESENTATIVES)
+    in one vectorized comparison, so a bucket of thousands of boilerplate postings costs O(n), not O(n²).
+    """
+    representatives = []
+    signatures = np.empty((min(len(members), MAX_BUCKET_REPRESENTATIVES), NUM_PERM), dtype=np.uint32)
+    for job_uid, signature in members:
+        similar = np.flatnonzero(
+            (signatures[:len(representatives)] == signature).mean(axis=1) >= DUPLICATE_THRESHOLD
+        )
+        for i in similar:  # several representatives: the member links their groups
+            parent[find(job_uid)] = find(representatives[i])
+        if not len(similar) and len(representatives) < len(signatures):
+            signatures[len(representatives)] = signature
+            representatives.append(job_uid)
+
+
+async def main():
+    from app.db.main import async_session_maker
+
+    async with async_session_maker() as session:
+        indexed = await index_missing(session)
+        flagged = await cluster_duplicates(session)
+    print(f"Indexed {indexed} jobs, flagged {flagged} near-duplicates")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
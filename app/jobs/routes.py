@@ -1,6 +1,9 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.instrumentation import QueryBudget
 from app.db.main import get_session
-from app.jobs.service import JobService
+from app.jobs.service import JobService, FEED_FIELDS, AUTHOR_JOB_FIELDS
+from app.jobs.utils import parse_fields
+from app.recommendations.service import RecommendationService
 from app.db.models import User
 from app.auth.dependencies import (
     RoleChecker,
@@ -15,16 +18,27 @@ from app.errors import (
     AlreadyLiked,
     LikeNotGiven
 )
+from app.etag import make_etag, not_modified
 from app.jobs.schemas import (
     JobCreateModel,
-    JobUpdateModel
+    JobUpdateModel,
+    JobResponseModel,
+    JobDetailResponseModel,
+    AuthorJobResponseModel,
+    JobBatchRequestModel
 )
 from fastapi import (
     APIRouter,
-    Depends
+    BackgroundTasks,
+    Depends,
+    Query,
+    Request,
+    Response
 )
+from typing import Dict, List, Optional
 
 job_service = JobService()
+recommendation_service = RecommendationService()
 job_router = APIRouter()
 user_role_checker = RoleChecker(['USER'])  # user role for RBAC
 organization_role_checker = RoleChecker(['ORGANIZATION'])  # org role for RBAC
@@ -43,54 +57,176 @@ async def create_job(
     return await job_service.create_job(job_data, str(current_user.uid), session)
 
 
-@job_router.get('/job')
+@job_router.get('/job', response_model_exclude_unset=True)  # keys not requested with ?fields= stay out
 async def get_all_jobs(
+        request: Request,
+        response: Response,
+        fields: Optional[str] = Query(default=None, max_length=500),
+        session: AsyncSession = Depends(get_session),
+        token_details: dict = Depends(access_token_bearer),
+        query_budget: None = Depends(QueryBudget(3))  # feed version, jobs, liked jobs
+) -> List[JobResponseModel]:
+    """
+    Endpoint to fetch all ACTIVE jobs. Answers 304 when the client's If-None-Match is still current.
+    fields (e.g. title,category,authorName) limits the returned keys, _id is always included.
+    """
+    user_id = token_details['id']
+    requested_fields = parse_fields(fields, FEED_FIELDS)
+    # isLiked is per user. (Un)liking updates the job row, so it changes the version too
+    etag = make_etag('jobs', user_id, sorted(requested_fields or ()), *await job_service.active_jobs_version(session))
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers['ETag'] = etag
+    return await job_service.get_all_jobs(user_id, session, requested_fields)
+
+
+@job_router.get('/search')
+async def search_jobs(
+        q: str = Query(min_length=1, max_length=200),
+        category: Optional[str] = None,
+        job_type: Optional[str] = Query(default=None, alias='type'),
+        limit: int = Query(default=20, ge=1, le=100),
+        cursor: Optional[str] = None,
+        session: AsyncSession = Depends(get_session),
+        token_details: dict = Depends(access_token_bearer)
+) -> dict:
+    """
+    Endpoint to search ACTIVE jobs by title and description, ranked by relevance.
+    Pass the returned nextCursor as cursor to fetch the next page.
+    """
+    user_id = token_details['id']
+    return await job_service.search_jobs(user_id, q, session, category=category, job_type=job_type, limit=limit,
+                                         cursor=cursor)
+
+
+@job_router.get('/suggest')
+async def suggest(
+        prefix: str = Query(min_length=1, max_length=100),
+        limit: int = Query(default=8, ge=1, le=20),
+        session: AsyncSession = Depends(get_session),
+        token_details: dict = Depends(access_token_bearer)
+) -> dict:
+    """
+    Endpoint for search-as-you-type. Returns the top matching titles and categories of ACTIVE jobs.
+    """
+    return await job_service.suggest(prefix, session, limit=limit)
+
+
+@job_router.get('/facets')
+async def get_facets(
+        q: Optional[str] = Query(default=None, max_length=200),
+        session: AsyncSession = Depends(get_session),
+        token_details: dict = Depends(access_token_bearer)
+) -> dict:
+    """
+    Endpoint to fetch the number of ACTIVE jobs per category and type (optionally scoped by a search query).
+    """
+    return await job_service.get_facets(session, q)
+
+
+@job_router.get('/recommended')
+async def get_recommended_jobs(
+        limit: int = Query(default=20, ge=1, le=100),
+        session: AsyncSession = Depends(get_session),
+        token_details: dict = Depends(access_token_bearer)
+) -> list:
+    """
+    Endpoint to fetch ACTIVE jobs recommended to the current user based on his likes and applications.
+    """
+    user_id = token_details['id']
+    return await recommendation_service.recommended_jobs(user_id, session, limit=limit)
+
+
+@job_router.get('/trending')
+async def get_trending_jobs(
+        limit: int = Query(default=20, ge=1, le=100),
         session: AsyncSession = Depends(get_session),
         token_details: dict = Depends(access_token_bearer)
 ) -> list:
     """
-    Endpoint to fetch all ACTIVE jobs.
+    Endpoint to fetch the currently trending ACTIVE jobs (recent likes and applications).
     """
     user_id = token_details['id']
-    return await job_service.get_all_jobs(user_id, session)
+    return await job_service.get_trending_jobs(user_id, session, limit=limit)
 
 
-@job_router.get('/job/organization')
+@job_router.get('/job/organization', response_model_exclude_unset=True)  # keys not requested with ?fields= stay out
 async def get_organization_jobs(
+        fields: Optional[str] = Query(default=None, max_length=500),
         session: AsyncSession = Depends(get_session),
         current_user: User = Depends(organization_role_checker)
-) -> list:
+) -> List[AuthorJobResponseModel]:
     """
-    Endpoint to fetch all jobs created by organization
+    Endpoint to fetch all jobs created by organization.
+    fields (e.g. title,category,likes) limits the returned keys, _id is always included.
     """
-    return await job_service.get_authors_jobs(str(current_user.uid), session)
+    return await job_service.get_authors_jobs(str(current_user.uid), session, parse_fields(fields, AUTHOR_JOB_FIELDS))
 
 
 @job_router.get('/job/{job_uid}')
 async def get_job_by_its_id(job_uid: str,
+                            request: Request,
+                            response: Response,
                             session: AsyncSession = Depends(get_session),
-                            token_details: dict = Depends(access_token_bearer)) -> dict:
+                            token_details: dict = Depends(access_token_bearer)) -> JobDetailResponseModel:
     """
     Fetch a specific job by its UID including author's username and isLiked.
+    Answers 304 when the client's If-None-Match is still current.
     """
     user_uid = token_details['id']
-    job_data = await job_service.get_job_by_its_id(job_uid, user_uid, session)
+    job_data, version = await job_service.get_job_detail(job_uid, user_uid, session)
+    # the version comes with the (briefly shared) body, so an ETag never points at a newer body than it was sent with
+    etag = make_etag('job', job_uid, user_uid, version, job_data['isLiked'])
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers['ETag'] = etag
     return job_data
 
 
+@job_router.post('/batch')
+async def get_jobs_batch(batch: JobBatchRequestModel,
+                         session: AsyncSession = Depends(get_session),
+                         token_details: dict = Depends(access_token_bearer)
+                         ) -> Dict[str, Optional[JobDetailResponseModel]]:
+    """
+    Fetch up to 100 ACTIVE jobs by their UIDs in one request, keyed by the requested ids.
+    Ids which cannot be found map to null.
+    """
+    user_uid = token_details['id']
+    return await job_service.get_jobs_batch(batch.ids, user_uid, session)
+
+
+@job_router.get('/job/{job_uid}/similar')
+async def get_similar_jobs(job_uid: str,
+                           k: int = Query(default=10, ge=1, le=50),
+                           session: AsyncSession = Depends(get_session),
+                           token_details: dict = Depends(access_token_bearer)) -> list:
+    """
+    Fetch the k ACTIVE jobs most similar to a specific job by title, description and category.
+    """
+    user_uid = token_details['id']
+    return await job_service.get_similar_jobs(job_uid, user_uid, session, k=k)
+
+
 @job_router.delete("/job/{job_uid}")
 async def delete_job(
         job_uid: str,
+        background_tasks: BackgroundTasks,
+        chunked: bool = False,
         session: AsyncSession = Depends(get_session),
         current_user: User = Depends(get_current_user)
 ):
     """
     Endpoint to delete a job by it's uid.
+    Use chunked=true for jobs with a lot of likes/applications. The job is hidden immediately and removed in the background.
     """
     return await job_service.delete_job(
         job_uid=job_uid,
         current_user_uid=current_user.uid,
-        session=session
+        session=session,
+        background_tasks=background_tasks if chunked else None
     )
 
 
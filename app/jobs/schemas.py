@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
 
 
 class JobCreateModel(BaseModel):
@@ -14,3 +14,34 @@ class JobUpdateModel(BaseModel):
     description: Optional[str] = ""
     category: str
     type: str
+
+
+JOB_BATCH_MAX = 100  # ids accepted by POST /jobs/batch
+
+
+class JobBatchRequestModel(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=JOB_BATCH_MAX)
+
+
+class JobResponseModel(BaseModel):  # every field but _id may be left out with ?fields=
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: str = Field(alias='_id')  # pydantic treats underscore prefixed attributes as private, hence the alias
+    title: Optional[str] = None
+    description: Optional[str] = None
+    type: Optional[str] = None
+    likes: Optional[int] = None
+    category: Optional[str] = None
+    isActive: Optional[bool] = None
+    authorName: Optional[str] = None
+    isLiked: Optional[bool] = None
+
+
+class JobDetailResponseModel(JobResponseModel):
+    author_uid: Optional[str] = None
+
+
+class AuthorJobResponseModel(JobResponseModel):
+    author: Optional[str] = None
+    applicants: Optional[List[dict]] = None  # [{"_id": application uid}]
+    likedBy: Optional[List[str]] = None
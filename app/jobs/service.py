@@ -1,50 +1,240 @@
 import uuid
+from datetime import datetime
+from typing import Optional
+from fastapi import BackgroundTasks
+from sqlalchemy import func, literal, tuple_
+import sqlalchemy.dialects.postgresql as pg
 from sqlmodel.ext.asyncio.session import AsyncSession
 from .schemas import JobCreateModel, JobUpdateModel
-from sqlmodel import select, delete
+from .utils import encode_cursor, decode_cursor, wants
+from sqlmodel import select, delete, update, or_
+from app.db.main import async_session_maker
+from app.db.bulk import delete_in_batches
 from app.db.models import (
     Jobs,
     JobLikes,
     User,
-    Notification
+    Notification,
+    Applications,
+    JobNeighbours,
+    JobTrending
 )
 from app.errors import (
     JobNotFound,
     AuthorNotFound,
-    InsufficientPermission
+    InsufficientPermission,
+    AlreadyLiked,
+    LikeNotGiven
 )
 from app.notifications.service import NotificationService
+from app.alerts.service import AlertService
+from app.jobs.similarity import similarity_index
+from app.recommendations.service import recommendation_cache
+from app.jobs.trending import TrendingService, leaderboard, LIKE_WEIGHT
+from app.jobs.dedup import DedupService
+from app.cache import LRUCache, SingleFlight, shared_cache, notify_invalidation
 
 notification_service = NotificationService()
+alert_service = AlertService()
+trending_service = TrendingService()
+dedup_service = DedupService()
+
+SEARCH_LIKES_BOOST = 0.1  # weight of ln(1 + likes) in the search rank
+SEARCH_RECENCY_DAYS = 30  # the rank of a job is halved after this many days
+SEARCH_HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10'
+
+suggestion_cache = LRUCache(maxsize=2048, ttl=60)  # (prefix, limit) -> suggestions for the hottest prefixes
+# search query -> facet counts, cleared in every worker whenever a job changes
+facet_cache = shared_cache('facets', maxsize=256, ttl=300)
+# author uid -> username. Invalidated on username change/user deletion in every worker, the ttl is only a backstop
+author_name_cache = shared_cache('author_names', maxsize=10000, ttl=3600)
+liked_jobs_cache = shared_cache('liked_jobs', maxsize=10000, ttl=600)  # user uid -> set of liked job uids
+# job uid -> (job detail without isLiked, updated_at) shared by all viewers of a hot job for a short time
+JOB_DETAIL_TTL = 1  # seconds
+job_detail_cache = LRUCache(maxsize=1024, ttl=JOB_DETAIL_TTL)
+job_detail_flight = SingleFlight()  # concurrent cache misses for the same job share one fetch
+
+# response field -> column of the job listings, projected according to ?fields=
+JOB_COLUMNS = {
+    "title": Jobs.title,
+    "description": Jobs.description,
+    "type": Jobs.type,
+    "likes": Jobs.likes,
+    "category": Jobs.category,
+    "isActive": Jobs.is_active
+}
+FEED_FIELDS = (*JOB_COLUMNS, "authorName", "isLiked")
+AUTHOR_JOB_FIELDS = (*FEED_FIELDS, "author", "applicants", "likedBy")
+
+
+def job_columns(fields: Optional[frozenset]) -> list:
+    """Job columns labelled with their response field names, only the requested ones."""
+    return [column.label(name) for name, column in JOB_COLUMNS.items() if wants(fields, name)]
 
 
 class JobService:
-    async def get_all_jobs(self, user_uid: str, session: AsyncSession):
-        """Fetch all active jobs."""
-        statement = select(Jobs).where(Jobs.is_active == True)
+    async def get_all_jobs(self, user_uid: str, session: AsyncSession, fields: Optional[frozenset] = None):
+        """Fetch all active jobs. fields limits the columns, joins and keys to the requested ones."""
+        # plain columns instead of ORM entities: no identity map and no selectin loading of likes/applicants
+        statement = select(Jobs.uid, *job_columns(fields)).where(Jobs.is_active == True)
+        if wants(fields, "authorName"):
+            statement = statement.add_columns(User.username.label("authorName")).join(User, User.uid == Jobs.author_uid)
+        result = await session.execute(statement)
+        liked = await self.liked_job_uids(user_uid, session) if wants(fields, "isLiked") else None
+
+        jobs = []
+        for row in result.all():
+            job = {"_id": str(row.uid), **row._mapping}
+            del job["uid"]
+            if liked is not None:
+                job["isLiked"] = str(row.uid) in liked
+            jobs.append(job)
+        return jobs
+
+    async def active_jobs_version(self, session: AsyncSession) -> tuple:
+        """Version of the active job feed: changes whenever an active job is added, removed or updated."""
+        statement = select(func.count(), func.max(Jobs.updated_at)).where(Jobs.is_active == True)
+        result = await session.execute(statement)
+        return tuple(result.one())
+
+    async def search_jobs(self, user_uid: str, q: str, session: AsyncSession, category: Optional[str] = None,
+                          job_type: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None) -> dict:
+        """
+        Full-text search over active jobs ranked by ts_rank with a boost for recent and liked jobs.
+        Uses keyset pagination: pass the returned nextCursor to fetch the next page.
+        """
+        search_vector = Jobs.__table__.c.search_vector
+        query = func.websearch_to_tsquery('english', q)
+
+        if cursor:
+            last_rank, last_uid, as_of = decode_cursor(cursor)
+        else:
+            last_rank, last_uid, as_of = None, None, datetime.utcnow()
+
+        # the age is measured from as_of (fixed for all pages) so the ranks of a result set never change between pages
+        age_in_days = func.extract('epoch', literal(as_of, pg.TIMESTAMP) - Jobs.created_at) / 86400
+        rank = (
+                func.ts_rank(search_vector, query)
+                * (1 + SEARCH_LIKES_BOOST * func.ln(1 + func.greatest(Jobs.likes, 0)))
+                / (1 + func.greatest(age_in_days, 0) / SEARCH_RECENCY_DAYS)
+        ).label('rank')
+
+        statement = (
+            select(Jobs.uid, Jobs.title, Jobs.description, Jobs.type, Jobs.likes, Jobs.category, Jobs.author_uid, rank)
+            .where(Jobs.is_active == True, search_vector.op('@@')(query))
+        )
+        if category:
+            statement = statement.where(Jobs.category == category)
+        if job_type:
+            statement = statement.where(Jobs.type == job_type)
+        if last_uid is not None:
+            statement = statement.where(tuple_(rank, Jobs.uid) < tuple_(literal(last_rank), literal(last_uid)))
+        page = statement.order_by(rank.desc(), Jobs.uid.desc()).limit(limit + 1).subquery()
+
+        # snippets, author names and likes are only computed for the rows of the page
+        is_liked = select(JobLikes.job_id).where(JobLikes.job_id == page.c.uid, JobLikes.user_id == user_uid).exists()
+        statement = (
+            select(
+                page,
+                User.username,
+                func.ts_headline('english', page.c.title, query, SEARCH_HEADLINE_OPTIONS).label('title_highlight'),
+                func.ts_headline('english', func.coalesce(page.c.description, ''), query,
+                                 SEARCH_HEADLINE_OPTIONS).label('snippet'),
+                is_liked.label('is_liked')
+            )
+            .join(User, User.uid == page.c.author_uid)
+            .order_by(page.c.rank.desc(), page.c.uid.desc())
+        )
+        result = await session.execute(statement)
+        rows = result.all()
+
+        next_cursor = None
+        if len(rows) > limit:  # there is at least one more page
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].rank, rows[-1].uid, as_of)
+
+        jobs = [
+            {
+                "_id": str(row.uid),
+                "title": row.title,
+                "description": row.description,
+                "type": row.type,
+                "likes": row.likes,
+                "category": row.category,
+                "isActive": True,
+                "authorName": row.username,
+                "isLiked": row.is_liked,
+                "titleHighlight": row.title_highlight,
+                "snippet": row.snippet
+            }
+            for row in rows
+        ]
+        return {"jobs": jobs, "nextCursor": next_cursor}
+
+    async def suggest(self, prefix: str, session: AsyncSession, limit: int = 8) -> dict:
+        """
+        Autocomplete for job titles and categories of active jobs.
+        Exact prefix matches come first, followed by typo tolerant trigram matches.
+        """
+        prefix = " ".join(prefix.lower().split())  # normalize, so "Dev " and "dev" share a cache entry
+        cache_key = (prefix, limit)
+        suggestions = suggestion_cache.get(cache_key)
+        if suggestions is None:
+            suggestions = {
+                "titles": await self._suggest_values(Jobs.title, prefix, limit, session),
+                "categories": await self._suggest_values(Jobs.category, prefix, limit, session)
+            }
+            suggestion_cache.set(cache_key, suggestions)
+        return suggestions
+
+    @staticmethod
+    async def _suggest_values(column, prefix: str, limit: int, session: AsyncSession) -> list:
+        """Top distinct values of column matching prefix."""
+        result = await session.execute(JobService.suggest_statement(column, prefix, limit))
+        return result.scalars().all()
+
+    @staticmethod
+    def suggest_statement(column, prefix: str, limit: int):
+        """Query of the suggestions for one column. Both conditions are served by the trigram GIN index."""
+        like_pattern = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        is_prefix_match = column.ilike(like_pattern)
+        return (
+            select(column)
+            .where(Jobs.is_active == True, or_(is_prefix_match, column.op('%>')(prefix)))
+            .group_by(column)
+            .order_by(
+                func.bool_or(is_prefix_match).desc(),
+                func.max(func.word_similarity(prefix, column)).desc(),
+                column
+            )
+            .limit(limit)
+        )
 
-        result = await session.exec(statement)
+    async def get_facets(self, session: AsyncSession, q: Optional[str] = None) -> dict:
+        """Count active jobs per category and per type (optionally only jobs matching the search query q)."""
+        q = " ".join(q.split()) if q else None
+        facets = facet_cache.get(q)
+        if facets is not None:
+            return facets
+
+        statement = (
+            select(Jobs.category, Jobs.type, func.grouping(Jobs.category).label('by_type'), func.count().label('job_count'))
+            .where(Jobs.is_active == True)
+            .group_by(func.grouping_sets(Jobs.category, Jobs.type))  # both facets in a single scan
+        )
+        if q:
+            statement = statement.where(Jobs.__table__.c.search_vector.op('@@')(func.websearch_to_tsquery('english', q)))
+        result = await session.execute(statement)
 
-        all_jobs = result.all()
-
-        list_storing_all_jobs = []
-        for job in all_jobs:  # for each job we get its authorName and check if current user has liked the job
-            authorName = await self.get_author_name(job.author_uid, session)
-            isLiked = await self.like_checker(user_uid, str(job.uid), session)
-            job_response_dict = {
-                "_id": str(job.uid),
-                "title": job.title,
-                "description": job.description,
-                "type": job.type,
-                "likes": job.likes,
-                "category": job.category,
-                "isActive": job.is_active,
-                "authorName": authorName,  # Add the author's username
-                "isLiked": isLiked
-            }
-            list_storing_all_jobs.append(job_response_dict)
+        facets = {"category": {}, "type": {}}
+        for row in result.all():
+            if row.by_type:  # row of the (type) grouping set
+                facets["type"][row.type] = row.job_count
+            else:
+                facets["category"][row.category] = row.job_count
 
-        return list_storing_all_jobs
+        facet_cache.set(q, facets)
+        return facets
 
     async def get_job_data(self, job_uid: str, session: AsyncSession):
         """Fetch a specific ACTIVE job by its UID. RESPONSE INCLUDE ALL DATA ABOUT THE ACTIVE JOB"""
@@ -68,15 +258,20 @@ class JobService:
 
     async def get_job_by_its_id(self, job_uid: str, user_uid: str, session: AsyncSession):
         """Fetch a specific job by its UID including author's username and isLiked."""
-        # Query the job
-        statement = select(Jobs).where(Jobs.uid == job_uid, Jobs.is_active == True)
-        result = await session.exec(statement)
+        # Query the job together with its author's username
+        statement = (
+            select(Jobs.title, Jobs.description, Jobs.type, Jobs.likes, Jobs.category, Jobs.author_uid, Jobs.is_active,
+                   User.username)
+            .join(User, User.uid == Jobs.author_uid)
+            .where(Jobs.uid == job_uid, Jobs.is_active == True)
+        )
+        result = await session.execute(statement)
         job = result.first()
 
         if job is None:
             raise JobNotFound()
 
-        job_dict = {
+        return {
             "_id": str(job_uid),
             "title": job.title,
             "description": job.description,
@@ -85,19 +280,126 @@ class JobService:
             "category": job.category,
             "author_uid": str(job.author_uid),
             "isActive": job.is_active,
-            "isLiked": False  # default value
+            "isLiked": await self.like_checker(user_uid, job_uid, session),
+            "authorName": job.username  # Add the author's username to the response
+        }
+
+    async def get_job_detail(self, job_uid: str, user_uid: str, session: AsyncSession) -> tuple:
+        """
+        get_job_by_its_id for the hot read path: returns (job dict, updated_at of the job).
+        The viewer independent part is fetched once for all concurrent requests and shared for JOB_DETAIL_TTL,
+        isLiked is overlaid per viewer afterwards. Write paths keep using get_job_by_its_id.
+        """
+        entry = job_detail_cache.get(str(job_uid))
+        if entry is None:
+            entry = await job_detail_flight.do(str(job_uid), lambda: self._fetch_job_detail(str(job_uid)))
+            if entry is None:
+                raise JobNotFound()
+
+        job_dict, version = entry
+        return {**job_dict, "isLiked": await self.like_checker(user_uid, job_uid, session)}, version
+
+    async def _fetch_job_detail(self, job_uid: str):
+        """Shared fetch of get_job_detail. Uses its own session, it must not depend on any single request."""
+        statement = (
+            select(Jobs.title, Jobs.description, Jobs.type, Jobs.likes, Jobs.category, Jobs.author_uid, Jobs.is_active,
+                   Jobs.updated_at, User.username)
+            .join(User, User.uid == Jobs.author_uid)
+            .where(Jobs.uid == job_uid, Jobs.is_active == True)
+        )
+        async with async_session_maker() as session:
+            result = await session.execute(statement)
+            job = result.first()
+        if job is None:
+            return None
+
+        job_dict = {
+            "_id": job_uid,
+            "title": job.title,
+            "description": job.description,
+            "type": job.type,
+            "likes": job.likes,
+            "category": job.category,
+            "author_uid": str(job.author_uid),
+            "isActive": job.is_active,
+            "authorName": job.username
+        }
+        entry = (job_dict, job.updated_at)
+        job_detail_cache.set(job_uid, entry)
+        return entry
+
+    async def get_jobs_by_uids(self, job_uids: list, user_uid: str, session: AsyncSession) -> dict:
+        """Fetch ACTIVE jobs by their UIDs including author's username and isLiked with one query. Keyed by job uid."""
+        if not job_uids:
+            return {}
+
+        is_liked = select(JobLikes.job_id).where(JobLikes.job_id == Jobs.uid, JobLikes.user_id == user_uid).exists()
+        statement = (
+            select(Jobs.uid, Jobs.title, Jobs.description, Jobs.type, Jobs.likes, Jobs.category, Jobs.author_uid,
+                   Jobs.is_active, User.username, is_liked.label('is_liked'))
+            .join(User, User.uid == Jobs.author_uid)
+            .where(Jobs.uid.in_(job_uids), Jobs.is_active == True)
+        )
+        result = await session.execute(statement)
+
+        return {
+            str(row.uid): {
+                "_id": str(row.uid),
+                "title": row.title,
+                "description": row.description,
+                "type": row.type,
+                "likes": row.likes,
+                "category": row.category,
+                "author_uid": str(row.author_uid),
+                "isActive": row.is_active,
+                "isLiked": row.is_liked,
+                "authorName": row.username
+            }
+            for row in result.all()
         }
 
-        if await self.like_checker(user_uid, job_uid, session):
-            job_dict["isLiked"] = True
-        author_uid = job.author_uid
-        author_username = await self.get_author_name(author_uid, session)
-        job_dict['authorName'] = author_username  # Add the author's username to the response
+    async def get_jobs_batch(self, job_ids: list, user_uid: str, session: AsyncSession) -> dict:
+        """
+        Resolve many job ids with one query. Every requested id is a key of the result,
+        the value is None for ids that are malformed, unknown or not active.
+        """
+        job_uids = {}  # requested id -> parsed uuid (None when malformed), duplicates collapse
+        for job_id in job_ids:
+            try:
+                job_uids[job_id] = uuid.UUID(job_id)
+            except ValueError:
+                job_uids[job_id] = None
+
+        jobs = await self.get_jobs_by_uids({uid for uid in job_uids.values() if uid}, user_uid, session)
+        return {job_id: jobs.get(str(uid)) for job_id, uid in job_uids.items()}
+
+    async def get_similar_jobs(self, job_uid: str, user_uid: str, session: AsyncSession, k: int = 10) -> list:
+        """Fetch the k active jobs most similar to the given job (TF-IDF cosine similarity of title, description and category)."""
+        job = await self.get_job_data(job_uid, session)
+        if job is None:
+            raise JobNotFound()
+
+        similar = await similarity_index.similar(job, k, session)
+        jobs = await self.get_jobs_by_uids([uid for uid, _ in similar], user_uid, session)
+
+        similar_jobs = []
+        for uid, score in similar:
+            if uid in jobs:  # the index may still contain a job deactivated in another worker
+                similar_jobs.append({**jobs[uid], "similarity": round(score, 4)})
+        return similar_jobs
 
-        return job_dict
+    async def get_trending_jobs(self, user_uid: str, session: AsyncSession, limit: int = 20) -> list:
+        """Fetch the trending active jobs (likes and applications with exponential time decay)."""
+        trending = await trending_service.trending_jobs(session, limit)
+        jobs = await self.get_jobs_by_uids([uid for uid, _ in trending], user_uid, session)
+        return [{**jobs[uid], "trendingScore": round(score, 4)} for uid, score in trending if uid in jobs]
 
     async def get_author_name(self, author_uid: str, session: AsyncSession) -> str:
         """Fetch the author's username based on author_uid."""
+        author = author_name_cache.get(str(author_uid))
+        if author is not None:
+            return author
+
         statement = select(User.username).where(User.uid == author_uid)
         result = await session.execute(statement)
         author = result.scalars().first()  # Get the first matching author
@@ -105,46 +407,54 @@ class JobService:
         if author is None:
             raise AuthorNotFound()
 
+        author_name_cache.set(str(author_uid), author)
         return author  # Return the author's username
 
-    async def get_authors_jobs(self, author_uid: str, session: AsyncSession):
-        """Fetch all jobs associated with a specific author_uid."""
-        statement = select(Jobs).where(Jobs.author_uid == author_uid)
-        result = await session.exec(statement)
-        jobs = result.all()
-
-        enriched_jobs = []
-        for job in jobs:
-            # Enrich the job with author name
-            author_username = await self.get_author_name(job.author_uid, session)
-            isLiked = await self.like_checker(author_uid, str(job.uid), session)
-            liked_job_user_ids = [str(like.user_id) for like in job.liked_by]
-            applicants_list = [{"_id": str(applicant.uid)} for applicant in job.applicants]
-            job_dict = {
-                "_id": str(job.uid),
-                "title": job.title,
-                "description": job.description,
-                "type": job.type,
-                "likes": job.likes,
-                "category": job.category,
-                "author": str(job.author_uid),
-                "isActive": job.is_active,
-                "authorName": author_username,  # Add the author's username
-                "isLiked": isLiked,
-                "applicants": applicants_list,
-                "likedBy": liked_job_user_ids  # to show only the users id
-            }
-            enriched_jobs.append(job_dict)
-
-        return enriched_jobs
+    async def get_authors_jobs(self, author_uid: str, session: AsyncSession, fields: Optional[frozenset] = None):
+        """Fetch all jobs associated with a specific author_uid. fields limits the columns and keys returned."""
+        statement = select(Jobs.uid, *job_columns(fields)).where(Jobs.author_uid == author_uid)
+        # applicants and likers are aggregated per job in the same query (NULL when there are none)
+        if wants(fields, "applicants"):
+            applicant_uids = select(func.array_agg(Applications.uid)).where(Applications.job_uid == Jobs.uid)
+            statement = statement.add_columns(applicant_uids.scalar_subquery().label("applicants"))
+        if wants(fields, "likedBy"):
+            liker_uids = select(func.array_agg(JobLikes.user_id)).where(JobLikes.job_id == Jobs.uid)
+            statement = statement.add_columns(liker_uids.scalar_subquery().label("likedBy"))
+        result = await session.execute(statement)
+        rows = result.all()
+        if not rows:
+            return []
+
+        author_username = await self.get_author_name(author_uid, session) if wants(fields, "authorName") else None
+        liked = await self.liked_job_uids(author_uid, session) if wants(fields, "isLiked") else None
+        jobs = []
+        for row in rows:
+            job = {"_id": str(row.uid), **row._mapping}
+            del job["uid"]
+            if wants(fields, "author"):
+                job["author"] = str(author_uid)
+            if author_username is not None:
+                job["authorName"] = author_username  # Add the author's username
+            if liked is not None:
+                job["isLiked"] = str(row.uid) in liked
+            if "applicants" in job:
+                job["applicants"] = [{"_id": str(uid)} for uid in job["applicants"] or []]
+            if "likedBy" in job:
+                job["likedBy"] = [str(uid) for uid in job["likedBy"] or []]  # to show only the users id
+            jobs.append(job)
+        return jobs
 
     async def create_job(self, job_data: JobCreateModel, author_uid: str, session: AsyncSession) -> dict:
         """Create a new job and return the created job instance."""
         new_job = Jobs(**job_data.dict(), author_uid=author_uid)
         session.add(new_job)
-        await session.commit()
+        await session.flush()
         await session.refresh(new_job)
-        return {"message": "Job offer has been created successfully."}
+        await dedup_service.index_job(new_job, session)  # flag reposts of an existing job
+        await self.jobs_changed(session, upserted=[new_job])
+        await alert_service.match_jobs([new_job], session)  # notify users with matching saved searches
+        return {"message": "Job offer has been created successfully.",
+                "duplicateOf": str(new_job.duplicate_of) if new_job.duplicate_of else None}
 
     async def update_job(self, job_uid: str, update_data: JobUpdateModel, session: AsyncSession):
         job_to_update = await self.get_job_data(job_uid, session)  # taking all job data
@@ -154,8 +464,8 @@ class JobService:
 
             for k, v in update_data_dict.items():
                 setattr(job_to_update, k, v)
-
-            await session.commit()
+            await dedup_service.index_job(job_to_update, session)
+            await self.jobs_changed(session, upserted=[job_to_update])
 
             return job_to_update
         else:
@@ -163,12 +473,17 @@ class JobService:
 
     async def like_checker(self, user_uid: str, job_uid: str, session: AsyncSession):
         """Function to check whether current user has liked the job"""
-        existing_like = await session.exec(  # checks if the user has liked the job
-            select(JobLikes).where(JobLikes.job_id == job_uid, JobLikes.user_id == user_uid)
-        )
-        if existing_like.first() is not None:
-            return True  # if job is already liked by the user
-        return False  # else: return False
+        return str(job_uid) in await self.liked_job_uids(user_uid, session)
+
+    async def liked_job_uids(self, user_uid: str, session: AsyncSession) -> set:
+        """Uids of all jobs liked by the user, loaded with one query and cached per user."""
+        liked = liked_jobs_cache.get(str(user_uid))
+        if liked is None:
+            generation = liked_jobs_cache.generation  # not cached when a like commits while the set is loaded
+            result = await session.execute(select(JobLikes.job_id).where(JobLikes.user_id == user_uid))
+            liked = {str(job_uid) for job_uid in result.scalars().all()}
+            liked_jobs_cache.set(str(user_uid), liked, generation)
+        return liked
 
     async def like_job(self, job_uid: str, user_uid: str, session: AsyncSession):
         """Allow a user to like a job."""
@@ -176,11 +491,15 @@ class JobService:
         if not job:  # if job is not found
             raise JobNotFound()
 
-        # Add the like
-        new_like = JobLikes(user_id=user_uid, job_id=job_uid)
-        session.add(new_like)
+        # Add the like. The liked set checked by the route may be stale (another worker, double tap),
+        # so the counters are only touched when the row was actually inserted
+        liked_at = datetime.utcnow()  # the trending weight of the like, an unlike takes back the weight at this time
+        statement = pg.insert(JobLikes).values(user_id=user_uid, job_id=job_uid, created_at=liked_at)
+        result = await session.execute(statement.on_conflict_do_nothing())
+        if result.rowcount != 1:
+            (await self.liked_job_uids(user_uid, session)).add(str(job_uid))  # correct the stale liked set
+            raise AlreadyLiked()
 
-        # Increment the likes count in the Jobs table
         job = await session.exec(select(Jobs).where(Jobs.uid == job_uid))
         job_instance = job.first()
         # trigger the notification
@@ -189,14 +508,20 @@ class JobService:
         await notification_service.trigger_notification(job_instance.author_uid, uuid.UUID(user_uid), message, session,
                                                         job_id=job_instance.uid)  # add the job_uid, so we can later fetch the job
 
-        if job_instance:
-            job_instance.likes += 1
+        # Increment the likes count in the Jobs table, atomically: concurrent likes of other users don't get lost
+        result = await session.execute(update(Jobs).where(Jobs.uid == job_uid).values(likes=Jobs.likes + 1)
+                                       .returning(Jobs.likes))
+        likes = result.scalar_one()
+        await trending_service.record_event(job_instance.uid, LIKE_WEIGHT, session, at=liked_at)
+        await notify_invalidation(session, 'liked_jobs', str(user_uid))  # other workers reload the liked set
 
         await session.commit()
+        recommendation_cache.invalidate(user_uid)  # the user's interests have changed
+        (await self.liked_job_uids(user_uid, session)).add(str(job_uid))
 
         return {
             "message": "Job liked",
-            "likes": job_instance.likes,
+            "likes": likes,
             "isLiked": True
         }
 
@@ -206,22 +531,33 @@ class JobService:
         if not job:
             raise JobNotFound()
 
-        # Proceed to delete the like
-        await session.exec(delete(JobLikes).where(JobLikes.job_id == job_uid, JobLikes.user_id == user_uid))
-        # Decrement the likes count in the Jobs table
+        # Proceed to delete the like, the counters are only touched when the row was actually deleted
+        result = await session.execute(delete(JobLikes).where(JobLikes.job_id == job_uid, JobLikes.user_id == user_uid)
+                                       .returning(JobLikes.created_at))
+        liked_at = result.scalar_one_or_none()
+        if liked_at is None:
+            (await self.liked_job_uids(user_uid, session)).discard(str(job_uid))  # correct the stale liked set
+            raise LikeNotGiven()
         job_instance = await session.get(Jobs, job_uid)
         # delete the notification based on sender_id, recipient_id and job_id
         await session.exec(delete(Notification).where(Notification.sender_uid == user_uid,
                                                       Notification.recipient_uid == job_instance.author_uid,
                                                       Notification.job_id == job_uid))
-        if job_instance:
-            job_instance.likes -= 1  # Decrement the likes count
+        # Decrement the likes count in the Jobs table
+        result = await session.execute(update(Jobs).where(Jobs.uid == job_uid).values(likes=Jobs.likes - 1)
+                                       .returning(Jobs.likes))
+        likes = result.scalar_one()
+        # forward decay: the like was added with the growth factor of its time, subtract exactly that
+        await trending_service.record_event(job_instance.uid, -LIKE_WEIGHT, session, at=liked_at)
+        await notify_invalidation(session, 'liked_jobs', str(user_uid))  # other workers reload the liked set
 
         await session.commit()
+        recommendation_cache.invalidate(user_uid)  # the user's interests have changed
+        (await self.liked_job_uids(user_uid, session)).discard(str(job_uid))
 
         return {
             "message": "Job unliked",
-            "likes": job_instance.likes,
+            "likes": likes,
             "isLiked": False
         }
 
@@ -247,7 +583,7 @@ class JobService:
         job = await self.get_job_data(job_uid, session)
         job.is_active = False
         session.add(job)
-        await session.commit()
+        await self.jobs_changed(session, removed=[job_uid])
         return {"message": "Job deactivated successfully"}
 
     async def activate_job(self, job_uid: str, session: AsyncSession):
@@ -255,11 +591,16 @@ class JobService:
         job = await self.get_inactive_job_data(job_uid, session)
         job.is_active = True
         session.add(job)
-        await session.commit()
+        await self.jobs_changed(session, upserted=[job])
+        await alert_service.match_jobs([job], session)  # notify users with matching saved searches
         return {"message": "Job activated successfully"}
 
-    async def delete_job(self, job_uid: str, current_user_uid: str, session: AsyncSession):
-        """Fetch and delete a job if the current user is the author."""
+    async def delete_job(self, job_uid: str, current_user_uid: str, session: AsyncSession,
+                         background_tasks: Optional[BackgroundTasks] = None):
+        """
+        Fetch and delete a job if the current user is the author.
+        When background_tasks is given, the job is only deactivated here and its rows are purged in chunks afterwards.
+        """
         # Query the job by its UID
         query = select(Jobs).where(Jobs.uid == job_uid)
         result = await session.execute(query)
@@ -272,18 +613,79 @@ class JobService:
         if job.author_uid != current_user_uid:
             raise InsufficientPermission()
 
-        job_likes_query = select(JobLikes).where(
-            JobLikes.job_id == job_uid
-        )
-        result = await session.exec(job_likes_query)
-        job_likes = result.all()  # Get all related JobLikes
-
-        for job_like in job_likes:  # iterate through each like and delete it
-            await session.delete(job_like)
+        if background_tasks is not None:  # chunked mode for very large jobs
+            job.is_active = False  # hide the job right away
+            await self.jobs_changed(session, removed=[job_uid])
+            background_tasks.add_task(self.purge_job, job_uid)
+            return {"detail": "Job scheduled for deletion"}
 
-        # Delete the job and commit the transaction
-        await session.delete(job)
+        # Remove everything that references the job with set-based statements in one transaction
+        for statement in self.job_cascade_deletes([job_uid]):
+            await session.execute(statement)
 
-        await session.commit()
+        await session.execute(delete(Jobs).where(Jobs.uid == job_uid))
+        await self.jobs_changed(session, removed=[job_uid])
 
         return {"detail": "Job deleted successfully"}
+
+    @staticmethod
+    async def jobs_changed(session: AsyncSession, upserted: list = (), removed: list = ()):
+        """
+        Commit the caller's changes to jobs and propagate them. upserted are created, updated or activated jobs,
+        removed the uids of deactivated or deleted ones. Other workers clear their facet counts (the NOTIFY is
+        delivered with the commit), this worker also its cached details, similarity index and trending leaderboard.
+        """
+        if not upserted and not removed:
+            await session.commit()
+            return
+        await notify_invalidation(session, 'facets')
+        await session.commit()
+        facet_cache.clear()
+        for job in upserted:
+            job_detail_cache.invalidate(str(job.uid))
+            similarity_index.record_upsert(job.uid, job.title, job.description, job.category)
+        for job_uid in removed:
+            job_detail_cache.invalidate(str(job_uid))
+            similarity_index.record_removal(job_uid)
+            leaderboard.remove(job_uid)
+
+    @staticmethod
+    def job_cascade_deletes(job_uids) -> list:
+        """
+        Statements (in execution order) removing all rows referencing jobs, given as a list of uids or a subquery
+        selecting them (e.g. all jobs of an organization). The jobs themselves are left to the caller.
+        """
+        job_applications = select(Applications.uid).where(Applications.job_uid.in_(job_uids))
+        return DedupService.cascade_deletes(job_uids) + [
+            delete(Notification).where(
+                or_(Notification.job_id.in_(job_uids), Notification.application_id.in_(job_applications))
+            ),
+            delete(Applications).where(Applications.job_uid.in_(job_uids)),
+            delete(JobLikes).where(JobLikes.job_id.in_(job_uids)),
+            delete(JobNeighbours).where(JobNeighbours.job_uid.in_(job_uids)),
+            delete(JobTrending).where(JobTrending.job_uid.in_(job_uids))
+        ]
+
+    async def purge_job(self, job_uid: str):
+        """Delete a job and all rows referencing it in small chunks. Runs as a background task with its own session."""
+        async with async_session_maker() as session:
+            await self.purge_jobs([job_uid], session)
+
+    @staticmethod
+    async def purge_jobs(job_uids, session: AsyncSession):
+        """
+        Delete jobs (a list of uids or a subquery selecting them) and all rows referencing them, the large
+        tables in committed chunks.
+        """
+        job_applications = select(Applications.uid).where(Applications.job_uid.in_(job_uids))
+        await delete_in_batches(session, Notification, [Notification.uid],
+                                or_(Notification.job_id.in_(job_uids),
+                                    Notification.application_id.in_(job_applications)))
+        await delete_in_batches(session, Applications, [Applications.uid], Applications.job_uid.in_(job_uids))
+        await delete_in_batches(session, JobLikes, [JobLikes.user_id, JobLikes.job_id], JobLikes.job_id.in_(job_uids))
+        await session.execute(delete(JobNeighbours).where(JobNeighbours.job_uid.in_(job_uids)))
+        await session.execute(delete(JobTrending).where(JobTrending.job_uid.in_(job_uids)))
+        for statement in DedupService.cascade_deletes(job_uids):
+            await session.execute(statement)
+        await session.execute(delete(Jobs).where(Jobs.uid.in_(job_uids)))
+        await session.commit()
@@ -0,0 +1,459 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+import zlib
+import numpy as np
+import scipy.sparse as sp
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import Config
+from app.db.models import Jobs
+from app.text import tokenize
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 2 ** 20  # size of the hashed vocabulary, so new terms never require a rebuild
+TITLE_WEIGHT = 2  # title terms are counted twice
+RELOAD_CHECK_INTERVAL = 5  # seconds between checks for a newer snapshot written by another worker
+BUILD_BATCH_SIZE = 10000  # jobs fetched per query while building the index
+UID_DTYPE = 'S16'  # job uids are stored as raw 16 byte values, sorted, so they can be searched without a dict
+LOCK_POLL_INTERVAL = 0.05  # seconds between attempts to take the snapshot lock on the event loop
+
+
+def job_features(title: str, description: str, category: str) -> tuple:
+    """Hashed term ids (sorted) and sublinear term frequencies of a job."""
+    tokens = tokenize(title) * TITLE_WEIGHT + tokenize(description) + [f"category:{category.lower()}"]
+    # crc32 instead of hash(), because it has to be the same in every worker process
+    term_ids = np.fromiter((zlib.crc32(token.encode()) % N_FEATURES for token in tokens), dtype=np.int32,
+                           count=len(tokens))
+    term_ids, counts = np.unique(term_ids, return_counts=True)
+    return term_ids, (1 + np.log(counts)).astype(np.float32)
+
+
+def build_arrays(rows: list) -> dict:
+    """
+    Build the TF-IDF matrix from (uid_bytes, term_ids, tf) rows with vectorized operations.
+    Rows are L2 normalized, so the dot product of two rows is their cosine similarity.
+    """
+    rows.sort(key=lambda row: row[0])
+    lengths = np.fromiter((len(row[1]) for row in rows), dtype=np.int64, count=len(rows))
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.concatenate([row[1] for row in rows]) if rows else np.zeros(0, dtype=np.int32)
+    tf = np.concatenate([row[2] for row in rows]) if rows else np.zeros(0, dtype=np.float32)
+
+    df = np.bincount(indices, minlength=N_FEATURES).astype(np.int32)
+    idf = (np.log((1 + len(rows)) / (1 + df)) + 1).astype(np.float32)
+    data = tf * idf[indices]
+    if rows:
+        norms = np.sqrt(np.add.reduceat(data * data, indptr[:-1]))  # every job has at least its category term
+        data /= np.repeat(norms, lengths)
+
+    return {
+        "uids": np.array([row[0] for row in rows], dtype=UID_DTYPE),
+        "data": data,
+        "indices": indices,
+        "indptr": indptr,
+        "df": df,
+        "n_docs": len(rows)
+    }
+
+
+class SnapshotLock:
+    """
+    Exclusive lock of a snapshot directory across worker processes (flock on its LOCK file). Held from reading
+    CURRENT until CURRENT points at the new snapshot, so concurrent writers never drop each other's changes.
+    `with` blocks, `async with` polls without blocking the event loop (and can be cancelled while waiting).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._file = None
+
+    def _acquire(self, blocking: bool) -> bool:
+        os.makedirs(self.directory, exist_ok=True)
+        lock_file = open(os.path.join(self.directory, "LOCK"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        self._file.close()  # closing the file releases the lock
+        self._file = None
+
+    def __enter__(self):
+        self._acquire(blocking=True)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    async def __aenter__(self):
+        while not self._acquire(blocking=False):
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+def version_time(version: str) -> int:
+    """Creation time of a snapshot version (its name is "<time_ns>-<pid>"), -1 for other directory entries."""
+    try:
+        return int(version.split("-", 1)[0])
+    except ValueError:
+        return -1
+
+
+def write_snapshot(directory: str, arrays: dict) -> str:
+    """
+    Write the arrays as .npy files into a new version directory and atomically switch CURRENT to it.
+    Call with the SnapshotLock of the directory held.
+    """
+    previous = read_current_version(directory)
+    version = f"{time.time_ns()}-{os.getpid()}"
+    version_dir = os.path.join(directory, version)
+    os.makedirs(version_dir)
+    for name in ("uids", "data", "indices", "indptr", "df"):
+        np.save(os.path.join(version_dir, f"{name}.npy"), arrays[name])
+    with open(os.path.join(version_dir, "meta.json"), "w") as meta_file:
+        json.dump({"n_docs": int(arrays["n_docs"])}, meta_file)
+
+    current_tmp = os.path.join(directory, f"CURRENT.{os.getpid()}.tmp")
+    with open(current_tmp, "w") as current_file:
+        current_file.write(version)
+    os.replace(current_tmp, os.path.join(directory, "CURRENT"))
+
+    # remove the versions older than the previous one. The previous one is kept as a spare: a worker may have read
+    # CURRENT just before the switch and be loading it. Workers that still map removed files keep them until reload
+    if previous is not None:
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isdir(path) and 0 <= version_time(name) < version_time(previous):
+                shutil.rmtree(path, ignore_errors=True)
+    return version
+
+
+def read_current_version(directory: str):
+    try:
+        with open(os.path.join(directory, "CURRENT")) as current_file:
+            return current_file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+class SimilarityIndex:
+    """
+    TF-IDF index over the text of all active jobs.
+
+    The bulk of the matrix is a snapshot on disk which every worker memory-maps (shared page cache, fast start).
+    Changes made by this worker are kept in a small in-memory delta and merged into a new snapshot once
+    SIMILARITY_PERSIST_EVERY changes have been collected, at the latest after SIMILARITY_PERSIST_SECONDS.
+    Workers pick up newer snapshots automatically.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.loaded = False
+        self._lock = asyncio.Lock()
+        self._persist_task = None
+        self._flush_task = None
+        self._changes = {}  # job uid -> (title, description, category), None for removed jobs. Not persisted yet
+        self._version = None
+        self._last_reload_check = 0.0
+
+    # ---- loading ----
+
+    async def ensure_loaded(self, session: AsyncSession):
+        """Load the latest snapshot (or build one from the jobs table) on first use and reload newer snapshots."""
+        if self.loaded and time.monotonic() - self._last_reload_check < RELOAD_CHECK_INTERVAL:
+            return
+
+        async with self._lock:
+            self._last_reload_check = time.monotonic()
+            version = read_current_version(self.directory)
+            if version is None:  # no snapshot yet, built by the first worker getting the lock
+                async with SnapshotLock(self.directory):
+                    version = read_current_version(self.directory)
+                    if version is None:
+                        arrays = await self.build_from_db(session)
+                        version = await asyncio.to_thread(write_snapshot, self.directory, arrays)
+            if version != self._version:
+                self._load(version)
+
+    async def _load_without_request(self):
+        """Load the latest snapshot (or build the first one) with a session of its own."""
+        from app.db.main import async_session_maker
+
+        async with async_session_maker() as session:
+            await self.ensure_loaded(session)
+
+    async def build_from_db(self, session: AsyncSession) -> dict:
+        """Read all active jobs in batches and build fresh TF-IDF arrays."""
+        os.makedirs(self.directory, exist_ok=True)
+        rows = []
+        last_uid = None
+        while True:
+            statement = (
+                select(Jobs.uid, Jobs.title, Jobs.description, Jobs.category)
+                .where(Jobs.is_active == True)
+                .order_by(Jobs.uid)
+                .limit(BUILD_BATCH_SIZE)
+            )
+            if last_uid is not None:
+                statement = statement.where(Jobs.uid > last_uid)
+            result = await session.execute(statement)
+            batch = result.all()
+            if not batch:
+                break
+            rows.extend(await asyncio.to_thread(
+                lambda jobs: [(job.uid.bytes, *job_features(job.title, job.description, job.category)) for job in jobs],
+                batch
+            ))
+            last_uid = batch[-1].uid
+
+        return await asyncio.to_thread(build_arrays, rows)
+
+    def _load(self, version: str):
+        version_dir = os.path.join(self.directory, version)
+        load = lambda name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r')
+        with open(os.path.join(version_dir, "meta.json")) as meta_file:
+            meta = json.load(meta_file)
+
+        self.base_uids = load("uids")
+        self.base = sp.csr_matrix((load("data"), load("indices"), load("indptr")),
+                                  shape=(len(self.base_uids), N_FEATURES), copy=False)
+        self.base_active = np.ones(len(self.base_uids), dtype=bool)
+        self.df = np.array(load("df"))  # writable copy
+        self.n_docs = meta["n_docs"]
+        self.delta_uids = []
+        self.delta_rows = []  # (term_ids, weights) of jobs added after the snapshot
+        self.delta_active = []
+        self.delta_row_of = {}
+        self._delta_matrix = None
+        self._version = version
+        self.loaded = True
+
+        for job_uid, job in list(self._changes.items()):  # changes of this worker which aren't in the snapshot
+            self._apply(job_uid, job)
+
+    # ---- updates ----
+
+    def record_upsert(self, job_uid, title: str, description: str, category: str):
+        """Add or replace a job (created, updated or activated)."""
+        self._record(str(job_uid), (title, description or '', category))
+
+    def record_removal(self, job_uid):
+        """Remove a job (deactivated or deleted)."""
+        self._record(str(job_uid), None)
+
+    def _record(self, job_uid: str, job):
+        self._changes[job_uid] = job
+        if self.loaded:  # else applied once the index is loaded
+            self._apply(job_uid, job)
+        if len(self._changes) >= Config.SIMILARITY_PERSIST_EVERY and self._persist_task is None:
+            self._persist_task = asyncio.get_running_loop().create_task(self.persist())
+            self._persist_task.add_done_callback(self._log_persist_failure)
+
+    @staticmethod
+    def _log_persist_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:  # the changes are kept and retried later
+            logger.error("Persisting the similarity index failed", exc_info=task.exception())
+
+    def _apply(self, job_uid: str, job):
+        self._remove(job_uid)
+        if job is None:
+            return
+        term_ids, tf = job_features(*job)
+        self.df[term_ids] += 1
+        self.n_docs += 1
+        self.delta_row_of[job_uid] = len(self.delta_uids)
+        self.delta_uids.append(job_uid)
+        self.delta_rows.append((term_ids, self._weigh(term_ids, tf)))
+        self.delta_active.append(True)
+        self._delta_matrix = None
+
+    def _remove(self, job_uid: str):
+        row = self.delta_row_of.pop(job_uid, None)
+        if row is not None and self.delta_active[row]:
+            self.delta_active[row] = False
+            term_ids = self.delta_rows[row][0]
+        else:
+            row = self._base_row(job_uid)
+            if row is None:
+                return
+            self.base_active[row] = False
+            term_ids = self.base.indices[self.base.indptr[row]:self.base.indptr[row + 1]]
+        self.df[term_ids] -= 1
+        self.n_docs -= 1
+
+    def _base_row(self, job_uid: str):
+        """Row of an active job in the snapshot (binary search over the sorted uids)."""
+        key = np.array([uuid.UUID(job_uid).bytes], dtype=UID_DTYPE)
+        row = int(np.searchsorted(self.base_uids, key[0]))
+        if row < len(self.base_uids) and self.base_uids[row:row + 1] == key and self.base_active[row]:
+            return row
+        return None
+
+    def _weigh(self, term_ids: np.ndarray, tf: np.ndarray) -> np.ndarray:
+        idf = np.log((1 + self.n_docs) / (1 + self.df[term_ids])) + 1
+        weights = (tf * idf).astype(np.float32)
+        return weights / np.linalg.norm(weights)
+
+    # ---- queries ----
+
+    async def similar(self, job: Jobs, k: int, session: AsyncSession) -> list:
+        """Return up to k (job uid, cosine similarity) pairs of the active jobs most similar to job."""
+        await self.ensure_loaded(session)
+        job_uid = str(job.uid)
+
+        own_row = None  # position of the job itself in the scores, so it can be excluded
+        row = self.delta_row_of.get(job_uid)
+        base_row = self._base_row(job_uid) if row is None else None
+        if row is not None:
+            term_ids, weights = self.delta_rows[row]
+            own_row = len(self.base_uids) + row
+        elif base_row is not None:
+            start, end = self.base.indptr[base_row], self.base.indptr[base_row + 1]
+            term_ids, weights = self.base.indices[start:end], self.base.data[start:end]
+            own_row = base_row
+        else:  # e.g. created in another worker and not persisted yet
+            term_ids, tf = job_features(job.title, job.description, job.category)
+            weights = self._weigh(term_ids, tf)
+
+        query = np.zeros(N_FEATURES, dtype=np.float32)
+        query[term_ids] = weights
+        scores = np.concatenate([self.base @ query, self._delta() @ query])  # one sparse mat-vec per part
+        scores[~np.concatenate([self.base_active, np.array(self.delta_active, dtype=bool)])] = 0
+        if own_row is not None:
+            scores[own_row] = 0
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._uid_of(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    def _delta(self) -> sp.csr_matrix:
+        if self._delta_matrix is None:
+            indptr = np.zeros(len(self.delta_rows) + 1, dtype=np.int64)
+            np.cumsum([len(term_ids) for term_ids, _ in self.delta_rows], out=indptr[1:])
+            indices = np.concatenate([r[0] for r in self.delta_rows]) if self.delta_rows else np.zeros(0, np.int32)
+            data = np.concatenate([r[1] for r in self.delta_rows]) if self.delta_rows else np.zeros(0, np.float32)
+            self._delta_matrix = sp.csr_matrix((data, indices, indptr), shape=(len(self.delta_rows), N_FEATURES))
+        return self._delta_matrix
+
+    def _uid_of(self, row: int) -> str:
+        if row < len(self.base_uids):
+            return str(uuid.UUID(bytes=self.base_uids[row].ljust(16, b'\x00')))
+        return self.delta_uids[row - len(self.base_uids)]
+
+    # ---- persistence ----
+
+    def start(self):
+        """Start flushing the changes of this worker periodically, so other workers see them without much delay."""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        """Stop the periodic flush and persist the changes which haven't been written yet."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self._persist_task is not None:
+            await self._persist_task
+        if self._changes:
+            await self.persist()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(Config.SIMILARITY_PERSIST_SECONDS)
+            if self._changes and self._persist_task is None:
+                self._persist_task = asyncio.create_task(self.persist())
+                try:
+                    await asyncio.shield(self._persist_task)  # a cancelled loop leaves the write to close()
+                except Exception:
+                    logger.exception("Persisting the similarity index failed")
+
+    async def persist(self):
+        """
+        Merge the delta into a new snapshot (in a thread) and switch to it. The snapshot lock is held from reading
+        CURRENT to switching it, so the snapshot of a concurrent writer is merged instead of overwritten.
+        """
+        try:
+            if not self.loaded:  # a worker which never served a query still shares its changes
+                await self._load_without_request()
+            async with self._lock, SnapshotLock(self.directory):
+                version = read_current_version(self.directory)
+                if version is not None and version != self._version:  # pick up the changes of other workers first
+                    self._load(version)
+
+                base_rows = np.flatnonzero(self.base_active)
+                delta_rows = [i for i, active in enumerate(self.delta_active) if active]
+                arrays = {
+                    "base": self.base, "base_uids": self.base_uids, "base_rows": base_rows,
+                    "delta": self._delta()[delta_rows] if delta_rows else None,
+                    "delta_uids": [uuid.UUID(self.delta_uids[i]).bytes for i in delta_rows],
+                    "df": self.df.copy(), "n_docs": self.n_docs
+                }
+                persisted_changes = dict(self._changes)
+                version = await asyncio.to_thread(self._write_merged, arrays)
+
+                # changes recorded while writing are kept and re-applied on top of the new snapshot
+                self._changes = {job_uid: job for job_uid, job in self._changes.items()
+                                 if persisted_changes.get(job_uid, ...) != job}
+                self._load(version)
+        finally:
+            self._persist_task = None
+
+    def _write_merged(self, arrays: dict) -> str:
+        parts = [arrays["base"][arrays["base_rows"]]]
+        uids = [np.asarray(arrays["base_uids"][arrays["base_rows"]])]
+        if arrays["delta"] is not None:
+            parts.append(arrays["delta"])
+            uids.append(np.array(arrays["delta_uids"], dtype=UID_DTYPE))
+        matrix = sp.vstack(parts, format='csr')
+        uids = np.concatenate(uids)
+
+        order = np.argsort(uids, kind='stable')  # snapshots are sorted by uid for binary search
+        matrix = matrix[order]
+        return write_snapshot(self.directory, {
+            "uids": uids[order],
+            "data": matrix.data.astype(np.float32),
+            "indices": matrix.indices.astype(np.int32),
+            "indptr": matrix.indptr.astype(np.int64),
+            "df": arrays["df"],
+            "n_docs": arrays["n_docs"]
+        })
+
+
+similarity_index = SimilarityIndex(Config.SIMILARITY_INDEX_DIR)
+
+
+async def rebuild():
+    """Rebuild the snapshot from the jobs table. Run periodically to refresh IDF weights: python -m app.jobs.similarity"""
+    from app.db.main import async_session_maker
+
+    async with async_session_maker() as session:
+        arrays = await similarity_index.build_from_db(session)
+    with SnapshotLock(similarity_index.directory):
+        version = write_snapshot(similarity_index.directory, arrays)
+    print(f"Similarity index {version} built with {arrays['n_docs']} jobs")
+
+
+if __name__ == '__main__':
+    asyncio.run(rebuild())
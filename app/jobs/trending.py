@@ -0,0 +1,194 @@
+"""
+Trending jobs: likes and applications with exponential time decay.
+
+    python -m app.jobs.trending    # recompute every score from the likes and applications
+"""
+import asyncio
+import heapq
+import math
+import time
+from datetime import datetime
+from operator import itemgetter
+from typing import Optional
+from sqlalchemy import case, func, literal, union_all
+from sqlalchemy.dialects.postgresql import insert, TIMESTAMP
+from sqlmodel import select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import Config
+from app.db.models import Jobs, JobLikes, Applications, JobTrending, TrendingSettings
+
+# Forward decay: instead of decaying every stored score over time, new events get a weight that grows over time,
+# weight * 2 ^ ((t - epoch) / half-life). Stored scores never have to be rewritten and ORDER BY score gives the
+# decayed ranking at any moment. The weights grow without bound, so scores are stored as log2 of the sum: the
+# exponent only grows linearly and sums are computed relative to the larger term (log-sum-exp)
+TRENDING_EPOCH = datetime(2025, 1, 1)
+
+LIKE_WEIGHT = 1.0
+APPLICATION_WEIGHT = 3.0
+
+NO_SCORE = float('-inf')  # log_score of a job whose events cancelled out
+MIN_EXPONENT = -1000  # smaller powers of two underflow float64 (PostgreSQL raises an error instead of returning 0)
+ZERO_FRACTION = 1e-9  # what's left after taking back a weight is rounding error below this fraction of the score
+LN2 = math.log(2)
+REBUILD_LOCK_ID = 330033  # transaction level advisory lock, serializes rebuilds (e.g. of workers starting together)
+
+
+def log_weight(weight: float, at: datetime, half_life_hours: Optional[float] = None) -> float:
+    """log2 of the forward decayed weight of an event at `at`."""
+    half_life_hours = half_life_hours or Config.TRENDING_HALF_LIFE_HOURS
+    return (at - TRENDING_EPOCH).total_seconds() / (half_life_hours * 3600) + math.log2(abs(weight))
+
+
+def decayed_score(log_score: float, now: datetime) -> float:
+    """The score as of now, i.e. with every event decayed to now."""
+    return 2 ** (log_score - log_weight(1, now))
+
+
+def _power_of_two(exponent):
+    return func.power(2, func.greatest(exponent, MIN_EXPONENT))
+
+
+def log_add(log_score, log_weight_):
+    """SQL expression: log2(2 ^ log_score + 2 ^ log_weight_)."""
+    larger = func.greatest(log_score, log_weight_)
+    return larger + func.ln(_power_of_two(log_score - larger) + _power_of_two(log_weight_ - larger)) / LN2
+
+
+def log_subtract(log_score, log_weight_):
+    """SQL expression: log2(2 ^ log_score - 2 ^ log_weight_), NO_SCORE when nothing (but rounding error) is left."""
+    remaining = 1 - func.power(2, func.least(log_weight_ - log_score, 0))
+    return case((remaining > ZERO_FRACTION, log_score + func.ln(remaining) / LN2), else_=NO_SCORE)
+
+
+class TrendingLeaderboard:
+    """In-process top-K of the rollup table. Reads never touch the database and cost O(K)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._scores = {}  # job uid -> log score of the current top jobs
+        self._ranking = []  # [(job uid, log score)] best first, rebuilt lazily after updates
+        self._refreshed_at = 0.0
+
+    async def top(self, session: AsyncSession, limit: int) -> list:
+        if time.monotonic() - self._refreshed_at > Config.TRENDING_REFRESH_SECONDS:
+            await self.refresh(session)
+        if self._ranking is None:
+            self._ranking = heapq.nlargest(self.size, self._scores.items(), key=itemgetter(1))
+        return self._ranking[:limit]
+
+    async def refresh(self, session: AsyncSession):
+        """Reload the top-K active jobs from the rollup table (served by the index on log_score)."""
+        statement = (
+            select(JobTrending.job_uid, JobTrending.log_score)
+            .join(Jobs, Jobs.uid == JobTrending.job_uid)
+            .where(Jobs.is_active == True, JobTrending.log_score > NO_SCORE)
+            .order_by(JobTrending.log_score.desc())
+            .limit(self.size)
+        )
+        result = await session.execute(statement)
+        self._scores = {str(job_uid): log_score for job_uid, log_score in result.all()}
+        self._ranking = None
+        self._refreshed_at = time.monotonic()
+
+    def invalidate(self):
+        """Reload on the next read."""
+        self._refreshed_at = 0.0
+
+    def update(self, job_uid: str, log_score: float):
+        """Apply the new total score of a job after an event in this worker."""
+        if log_score == NO_SCORE:  # the job's likes were all taken back
+            self.remove(job_uid)
+            return
+        if job_uid not in self._scores and len(self._scores) >= self.size:
+            lowest = min(self._scores, key=self._scores.get)
+            if log_score <= self._scores[lowest]:  # doesn't make it into the top
+                return
+            del self._scores[lowest]
+        self._scores[job_uid] = log_score
+        self._ranking = None
+
+    def remove(self, job_uid: str):
+        if self._scores.pop(str(job_uid), None) is not None:
+            self._ranking = None
+
+
+leaderboard = TrendingLeaderboard(Config.TRENDING_SIZE)
+
+
+class TrendingService:
+
+    async def record_event(self, job_uid, weight: float, session: AsyncSession, at: Optional[datetime] = None):
+        """
+        Add a like (+), unlike (-) or application to the trending score of a job. `at` is the time the event is
+        weighted at (now by default): an unlike passes the time of the like, so exactly its weight is taken back.
+        Runs in the caller's transaction, the caller has to commit.
+        """
+        event = log_weight(weight, at or datetime.utcnow())
+        if weight > 0:
+            statement = insert(JobTrending).values(job_uid=job_uid, log_score=event).on_conflict_do_update(
+                index_elements=[JobTrending.job_uid], set_={"log_score": log_add(JobTrending.log_score, event)})
+        else:
+            statement = insert(JobTrending).values(job_uid=job_uid, log_score=NO_SCORE).on_conflict_do_update(
+                index_elements=[JobTrending.job_uid], set_={"log_score": log_subtract(JobTrending.log_score, event)})
+        result = await session.execute(statement.returning(JobTrending.log_score))
+        leaderboard.update(str(job_uid), result.scalar_one())
+
+    async def trending_jobs(self, session: AsyncSession, limit: int) -> list:
+        """Return [(job uid, current decayed score)] of the top trending jobs."""
+        now = datetime.utcnow()
+        top = await leaderboard.top(session, limit)
+        return [(job_uid, decayed_score(log_score, now)) for job_uid, log_score in top]
+
+    async def sync_half_life(self, session: AsyncSession) -> bool:
+        """
+        Rebuild the scores when TRENDING_HALF_LIFE_HOURS differs from the half-life they were computed with, scores
+        of different half-lives can't be compared. Called on startup, the first worker rebuilds, the others wait.
+        Returns whether the scores were rebuilt.
+        """
+        await session.execute(select(func.pg_advisory_xact_lock(REBUILD_LOCK_ID)))
+        result = await session.execute(select(TrendingSettings.half_life_hours))
+        if result.scalar_one_or_none() == Config.TRENDING_HALF_LIFE_HOURS:
+            await session.commit()
+            return False
+        await self.rebuild(session)
+        return True
+
+    async def rebuild(self, session: AsyncSession):
+        """Recompute the score of every job from its likes and applications with the configured half-life."""
+        await session.execute(select(func.pg_advisory_xact_lock(REBUILD_LOCK_ID)))  # re-entrant within a transaction
+        events = union_all(
+            select(JobLikes.job_id.label('job_uid'), JobLikes.created_at.label('at'),
+                   literal(math.log2(LIKE_WEIGHT)).label('log_weight')),
+            select(Applications.job_uid, Applications.appliedAt,
+                   literal(math.log2(APPLICATION_WEIGHT)))
+        ).subquery()
+        age = func.extract('epoch', events.c.at - literal(TRENDING_EPOCH, TIMESTAMP))
+        exponent = age / (Config.TRENDING_HALF_LIFE_HOURS * 3600) + events.c.log_weight
+        weighted = select(
+            events.c.job_uid, exponent.label('exponent'),
+            func.max(exponent).over(partition_by=events.c.job_uid).label('largest')
+        ).subquery()
+        # log-sum-exp per job, relative to its largest exponent
+        total = func.sum(_power_of_two(weighted.c.exponent - weighted.c.largest))
+        totals = (select(weighted.c.job_uid, func.max(weighted.c.largest) + func.ln(total) / LN2)
+                  .group_by(weighted.c.job_uid))
+
+        await session.execute(delete(JobTrending))
+        await session.execute(insert(JobTrending).from_select(['job_uid', 'log_score'], totals))
+        statement = insert(TrendingSettings).values(id=1, half_life_hours=Config.TRENDING_HALF_LIFE_HOURS)
+        await session.execute(statement.on_conflict_do_update(
+            index_elements=[TrendingSettings.id], set_={"half_life_hours": Config.TRENDING_HALF_LIFE_HOURS}))
+        await session.commit()
+        leaderboard.invalidate()
+
+
+async def main():
+    from app.db.main import async_session_maker
+
+    async with async_session_maker() as session:
+        await TrendingService().rebuild(session)
+    print(f"Trending scores rebuilt with a half-life of {Config.TRENDING_HALF_LIFE_HOURS} hours")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
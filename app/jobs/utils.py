@@ -0,0 +1,36 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Iterable, Optional
+from app.errors import InvalidCursor, InvalidFields
+
+
+def encode_cursor(rank: float, job_uid: uuid.UUID, as_of: datetime) -> str:
+    """Encode the position of the last returned search hit as an opaque string."""
+    payload = json.dumps([rank, str(job_uid), as_of.isoformat()])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor created by encode_cursor into (rank, job_uid, as_of)."""
+    try:
+        rank, job_uid, as_of = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), uuid.UUID(job_uid), datetime.fromisoformat(as_of)
+    except (ValueError, TypeError):  # covers bad base64, bad json and bad values
+        raise InvalidCursor()
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[frozenset]:
+    """Parse a comma separated ?fields= value into a set of field names. None means every field."""
+    if not fields:
+        return None
+    requested = frozenset(field.strip() for field in fields.split(',') if field.strip())
+    if not requested <= set(allowed) | {'_id'}:  # _id is always returned
+        raise InvalidFields()
+    return requested
+
+
+def wants(fields: Optional[frozenset], name: str) -> bool:
+    """Whether a field was requested (fields is None when every field is)."""
+    return fields is None or name in fields
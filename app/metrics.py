@@ -0,0 +1,167 @@
+"""
+Prometheus metrics, exposed at /metrics. With several worker processes, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory shared by the workers: every worker then writes its metrics there and /metrics aggregates all of them.
+"""
+import logging
+import os
+import time
+from fastapi import APIRouter, Response
+from starlette.datastructures import MutableHeaders
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from app.config import Config
+from app.db.instrumentation import RequestQueries, current_queries
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = 'unmatched'  # requests no route matched (404s), one label value instead of one per url
+
+HTTP_REQUESTS = Counter('http_requests_total', 'HTTP requests', ['method', 'route', 'status'])
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ['method', 'route'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge('http_requests_in_progress', 'HTTP requests being served', ['method'],
+                                  multiprocess_mode='livesum')
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    'db_statements_per_request', 'SQL statements executed by one request', ['route'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    'db_seconds_per_request', 'Time one request spent executing SQL statements', ['route'],
+    buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+)
+DB_N_PLUS_ONE = Counter('db_n_plus_one_total', 'Requests repeating one statement shape N_PLUS_ONE_THRESHOLD times',
+                        ['route'])
+DB_QUERY_BUDGET_EXCEEDED = Counter('db_query_budget_exceeded_total', 'Requests exceeding the query budget of the route',
+                                   ['route'])
+WEBHOOK_DELIVERIES = Counter('webhook_deliveries_total', 'Webhook deliveries', ['outcome'])  # success/http_error/failed
+WEBHOOK_SECONDS = Histogram('webhook_delivery_duration_seconds', 'Webhook delivery latency',
+                            buckets=(.05, .1, .25, .5, 1, 2.5, 5, 10))
+
+
+def route_template(scope: dict) -> str:
+    """Path template of the matched route (e.g. /jobs/job/{job_uid}), FastAPI puts the route into the scope."""
+    route = scope.get('route')
+    return getattr(route, 'path_format', None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request and counts its SQL statements, reported in a Server-Timing header (visible in the
+    browser dev tools) and checked for N+1 loops and query budgets. A plain ASGI middleware: unlike
+    BaseHTTPMiddleware it adds no task or stream per request, the cost is a few counter updates.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # unless a response is started
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if Config.SERVER_TIMING:
+                    MutableHeaders(scope=message).append('Server-Timing', (
+                        f'db;dur={queries.seconds * 1000:.1f};desc="{queries.count} statements", '
+                        f'app;dur={(time.perf_counter() - started) * 1000:.1f}'
+                    ))
+            await send(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                queries.finished = True  # background tasks run next, with the same context
+
+        method = scope['method']
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        queries = RequestQueries()
+        token = current_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_queries.reset(token)
+            in_progress.dec()
+            route = route_template(scope)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+            HTTP_REQUEST_SECONDS.labels(method, route).observe(elapsed)
+            DB_STATEMENTS_PER_REQUEST.labels(route).observe(queries.count)
+            DB_SECONDS_PER_REQUEST.labels(route).observe(queries.seconds)
+            self.check_queries(method, route, queries)
+
+    @staticmethod
+    def check_queries(method: str, route: str, queries: RequestQueries):
+        if queries.over_budget:
+            DB_QUERY_BUDGET_EXCEEDED.labels(route).inc()
+            logger.warning("%s %s executed %d statements, its query budget is %d", method, route,
+                           queries.count - queries.budget_start, queries.budget)
+        repeated = queries.repeated(Config.N_PLUS_ONE_THRESHOLD) if queries.count >= Config.N_PLUS_ONE_THRESHOLD else []
+        if repeated:
+            DB_N_PLUS_ONE.labels(route).inc()
+            for shape, executions in repeated:
+                logger.warning("Possible N+1 in %s %s, statement executed %d times: %s", method, route, executions,
+                               shape[:300])
+
+
+class CacheCollector:
+    """
+    Hit/miss counters of the in-process LRU caches and single-flight groups, read at scrape time.
+    In multiprocess mode these are the numbers of the worker serving the scrape.
+    """
+
+    def __init__(self, caches: dict, flights: dict):
+        self.caches = caches  # name -> LRUCache
+        self.flights = flights  # name -> SingleFlight
+
+    def collect(self):
+        hits = CounterMetricFamily('cache_hits', 'Cache hits', labels=['cache'])
+        misses = CounterMetricFamily('cache_misses', 'Cache misses', labels=['cache'])
+        entries = GaugeMetricFamily('cache_entries', 'Cached entries', labels=['cache'])
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            hits.add_metric([name], stats['hits'])
+            misses.add_metric([name], stats['misses'])
+            entries.add_metric([name], stats['size'])
+
+        executed = CounterMetricFamily('singleflight_executed', 'Calls actually executed', labels=['flight'])
+        coalesced = CounterMetricFamily('singleflight_coalesced', 'Calls served by a concurrent execution',
+                                        labels=['flight'])
+        in_flight = GaugeMetricFamily('singleflight_in_flight', 'Executions in progress', labels=['flight'])
+        for name, flight in self.flights.items():
+            stats = flight.stats()
+            executed.add_metric([name], stats['executed'])
+            coalesced.add_metric([name], stats['coalesced'])
+            in_flight.add_metric([name], stats['in_flight'])
+        return [hits, misses, entries, executed, coalesced, in_flight]
+
+
+def create_registry() -> CollectorRegistry:
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+metrics_registry = create_registry()
+metrics_router = APIRouter()
+
+
+@metrics_router.get('/metrics', include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(metrics_registry), media_type=CONTENT_TYPE_LATEST)
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.instrumentation import QueryBudget
 from app.db.main import get_session
 from .service import NotificationService
 from app.db.models import User
 from app.auth.dependencies import RoleChecker, CustomTokenBearer
 from app.errors import NotificationNotFound, NotificationInsufficientPermission
+from app.etag import make_etag, not_modified
+from .schemas import NotificationResponseModel
+from typing import List, Union
 
 notification_router = APIRouter()
 notification_service = NotificationService()
@@ -12,9 +16,19 @@ role_checker = RoleChecker(['USER', 'ORGANIZATION'])  # allowed roles
 
 
 @notification_router.get("/notification")
-async def get_all_notifications(current_user: User = Depends(role_checker),
-                                session: AsyncSession = Depends(get_session)):
-    """Get all notifications for a user. (including read ones)"""
+async def get_all_notifications(request: Request,
+                                response: Response,
+                                current_user: User = Depends(role_checker),
+                                session: AsyncSession = Depends(get_session),
+                                query_budget: None = Depends(QueryBudget(2))  # list version, notifications
+                                ) -> Union[List[NotificationResponseModel], dict]:
+    """Get all notifications for a user. (including read ones) Answers 304 when If-None-Match is still current."""
+    etag = make_etag('notifications', str(current_user.uid),
+                     *await notification_service.notifications_version(str(current_user.uid), session))
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    response.headers['ETag'] = etag
     return await notification_service.get_all_notifications(str(current_user.uid), session)
 
 
@@ -0,0 +1,13 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+
+class NotificationResponseModel(BaseModel):
+    notification_id: str
+    sender_name: str
+    message: str
+    is_read: bool
+    created_at: datetime
+    job_id: Optional[str] = None
+    application_id: Optional[str] = None
@@ -1,5 +1,6 @@
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
+from sqlalchemy import func
 from app.db.models import Notification
 from app.db.models import User, Applications
 from app.notifications.webhook import unread_notification_webhook as webhook
@@ -61,32 +62,39 @@ class NotificationService:
 
         await webhook(str(recipient_uid), session)  # trigger webhook to update unread count
 
+    async def notifications_version(self, user_uid: str, session: AsyncSession) -> tuple:
+        """Version of a user's notification list: changes whenever one is added, removed or updated."""
+        statement = select(func.count(), func.max(Notification.updated_at)).where(Notification.recipient_uid == user_uid)
+        result = await session.execute(statement)
+        return tuple(result.one())
+
     async def get_all_notifications(self, user_uid: str, session: AsyncSession):
         """Fetch all notification."""
 
-        statement = select(Notification).where(Notification.recipient_uid == user_uid)
-        result = await session.exec(statement)
-        all_notifications = result.all()
+        # notifications with their sender's current username in one query of plain columns
+        statement = (
+            select(Notification.uid, Notification.message, Notification.is_read, Notification.created_at,
+                   Notification.job_id, Notification.application_id, User.username.label('sender_name'))
+            .join(User, User.uid == Notification.sender_uid)
+            .where(Notification.recipient_uid == user_uid)
+        )
+        result = await session.execute(statement)
 
         notification_list = []
-        for notification in all_notifications:
-            # statement to fetch the notification sender username
-            statement = select(User.username).where(User.uid == str(notification.sender_uid))
-            result = await session.execute(statement)
-            sender_name = result.scalars().first()
-            if notification.job_id is not None and 'new applicant' not in notification.message:  # ensure that concatenation will be made for the right notification
-                notification.message += sender_name  # add the current username (in case user has changed it)
-
-            notification = {
+        for notification in result.all():
+            message = notification.message
+            if notification.job_id is not None and 'new applicant' not in message:  # ensure that concatenation will be made for the right notification
+                message += notification.sender_name  # add the current username (in case user has changed it)
+
+            notification_list.append({
                 "notification_id": str(notification.uid),
-                "sender_name": sender_name,
-                "message": notification.message,
+                "sender_name": notification.sender_name,
+                "message": message,
                 "is_read": notification.is_read,
                 "created_at": notification.created_at,
                 "job_id": str(notification.job_id) if notification.job_id else None,
                 "application_id": str(notification.application_id) if notification.application_id else None
-            }
-            notification_list.append(notification)
+            })
 
         if not notification_list:  # if notifications are empty
             return {"message": "You don't have notifications yet"}
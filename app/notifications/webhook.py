@@ -1,7 +1,9 @@
+import time
 import httpx
 from sqlmodel import select
 from app.db.models import Notification
 from sqlmodel.ext.asyncio.session import AsyncSession
+from app.metrics import WEBHOOK_DELIVERIES, WEBHOOK_SECONDS
 
 WEBHOOK_URL = "https://diman-job-ui.vercel.app/jobs"  # url to the main page where notifications will show
 
@@ -12,11 +14,16 @@ async def unread_notification_webhook(user_uid: str, session: AsyncSession):
     result = await session.execute(query)
     count = len(result.scalars().all())
 
+    started = time.perf_counter()
     async with httpx.AsyncClient() as client:
         try:
-            await client.post(WEBHOOK_URL, json={"user_uid": user_uid, "unread_count": count})
+            response = await client.post(WEBHOOK_URL, json={"user_uid": user_uid, "unread_count": count})
+            outcome = 'success' if response.is_success else 'http_error'
         except Exception as e:
+            outcome = 'failed'
             print(f"Failed to send webhook: {e}")
+    WEBHOOK_DELIVERIES.labels(outcome).inc()
+    WEBHOOK_SECONDS.observe(time.perf_counter() - started)
 
 """
 {
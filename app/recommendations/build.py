@@ -0,0 +1,190 @@
+"""
+Offline job that precomputes item-item neighbours from likes and applications.
+
+    python -m app.recommendations.build          # only jobs whose neighbours changed with the last interactions
+    python -m app.recommendations.build --full   # every job, also picks up removed likes and applications
+
+A new interaction of a user with job A changes the similarity of A with every other job of that user, so an
+incremental run recomputes the jobs of the users who interacted with the changed jobs. It only loads the
+interactions of the users of those jobs, which is all their rows of the co-occurrence matrix need.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import func, literal, union, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db.main import async_session_maker
+from app.db.models import JobLikes, Applications, JobNeighbours
+
+LIKE_WEIGHT = 1.0
+APPLICATION_WEIGHT = 2.0  # applying says more about a user's interests than a like
+NEIGHBOURS_PER_JOB = 50
+ITEM_CHUNK_SIZE = 2000  # jobs whose co-occurrence rows are computed at once
+READ_BATCH_SIZE = 50000
+WRITE_BATCH_SIZE = 1000
+
+
+def interactions():
+    """(user_uid, job_uid, weight) of every like and application."""
+    return union_all(
+        select(JobLikes.user_id.label('user_uid'), JobLikes.job_id.label('job_uid'),
+               literal(LIKE_WEIGHT).label('weight')),
+        select(Applications.user_uid, Applications.job_uid, literal(APPLICATION_WEIGHT))
+    ).subquery('interactions')
+
+
+async def load_interactions(session: AsyncSession, users=None) -> tuple:
+    """
+    Build the sparse user x job interaction matrix, of all users or of the users selected by the `users` subquery.
+    Returns (matrix, job uids by column).
+    """
+    user_index, job_index = {}, {}
+    rows, jobs, weights = [], [], []
+    interaction = interactions()
+    statement = select(interaction.c.user_uid, interaction.c.job_uid, interaction.c.weight)
+    if users is not None:
+        statement = statement.where(interaction.c.user_uid.in_(users))
+    result = await session.stream(statement.execution_options(yield_per=READ_BATCH_SIZE))
+    async for partition in result.partitions():
+        for user_uid, job_uid, weight in partition:
+            rows.append(user_index.setdefault(user_uid, len(user_index)))
+            jobs.append(job_index.setdefault(job_uid, len(job_index)))
+            weights.append(weight)
+
+    matrix = sp.csr_matrix(
+        (np.array(weights, dtype=np.float32), (np.array(rows, dtype=np.int64), np.array(jobs, dtype=np.int64))),
+        shape=(len(user_index), len(job_index))
+    )  # duplicates (liked and applied) are summed
+    return matrix, list(job_index)
+
+
+def changed_jobs(since: datetime):
+    """Select the jobs that got a like or an application after since."""
+    return union(
+        select(JobLikes.job_id).where(JobLikes.created_at > since),
+        select(Applications.job_uid).where(Applications.appliedAt > since)
+    )
+
+
+def affected_jobs(since: datetime):
+    """Select the jobs whose neighbours changed since: the jobs of every user who interacted with a changed job."""
+    interaction, of_changed = interactions(), interactions()
+    affected_users = select(of_changed.c.user_uid).where(of_changed.c.job_uid.in_(changed_jobs(since)))
+    return select(interaction.c.job_uid).where(interaction.c.user_uid.in_(affected_users)).distinct()
+
+
+def users_of(jobs):
+    """Select the users who interacted with the jobs of the `jobs` subquery."""
+    interaction = interactions()
+    return select(interaction.c.user_uid).where(interaction.c.job_uid.in_(jobs))
+
+
+async def load_norms(session: AsyncSession, job_uids: list, users) -> np.ndarray:
+    """
+    Norms of the columns of job_uids over all users. A matrix of only some users lacks the others' interactions
+    with the neighbours, whose norms have to be complete all the same.
+    """
+    interaction, of_users = interactions(), interactions()
+    jobs = select(of_users.c.job_uid).where(of_users.c.user_uid.in_(users))
+    per_user = (  # liked and applied by one user: the weights are summed, like in the matrix
+        select(interaction.c.job_uid, func.sum(interaction.c.weight).label('weight'))
+        .where(interaction.c.job_uid.in_(jobs))
+        .group_by(interaction.c.user_uid, interaction.c.job_uid)
+        .subquery()
+    )
+    statement = (select(per_user.c.job_uid, func.sqrt(func.sum(per_user.c.weight * per_user.c.weight)))
+                 .group_by(per_user.c.job_uid))
+    result = await session.execute(statement)
+    norm_of = dict(result.all())
+    return np.array([norm_of[job_uid] for job_uid in job_uids], dtype=np.float64)
+
+
+def column_norms(matrix: sp.csr_matrix) -> np.ndarray:
+    return np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+
+
+def top_neighbours(matrix: sp.csr_matrix, items: np.ndarray, norms: np.ndarray = None):
+    """
+    Yield (items chunk, row, col, score) arrays with the NEIGHBOURS_PER_JOB most similar jobs (cosine over the
+    co-occurrence counts) of every job in the chunk. row indexes the chunk, col the matrix columns.
+    The columns of the items have to be complete, norms (by default computed from the matrix) of all columns.
+    """
+    if norms is None:
+        norms = column_norms(matrix)
+    columns = matrix.tocsc()
+    for start in range(0, len(items), ITEM_CHUNK_SIZE):
+        chunk = items[start:start + ITEM_CHUNK_SIZE]
+        co_occurrence = (columns[:, chunk].T @ matrix).tocoo()  # chunk x jobs
+
+        row, col = co_occurrence.row, co_occurrence.col
+        scores = co_occurrence.data / (norms[chunk][row] * norms[col])
+        not_self = chunk[row] != col
+        row, col, scores = row[not_self], col[not_self], scores[not_self]
+
+        order = np.lexsort((-scores, row))  # by row, best score first
+        row, col, scores = row[order], col[order], scores[order]
+        rank = np.arange(len(row)) - np.searchsorted(row, row)  # position of every entry within its row
+        keep = rank < NEIGHBOURS_PER_JOB
+        yield chunk, row[keep], col[keep], scores[keep]
+
+
+async def write_neighbours(session: AsyncSession, records: list):
+    for start in range(0, len(records), WRITE_BATCH_SIZE):
+        statement = insert(JobNeighbours)
+        statement = statement.on_conflict_do_update(
+            index_elements=[JobNeighbours.job_uid],
+            set_={
+                "neighbour_uids": statement.excluded.neighbour_uids,
+                "scores": statement.excluded.scores,
+                "computed_at": statement.excluded.computed_at
+            }
+        )
+        await session.execute(statement, records[start:start + WRITE_BATCH_SIZE])
+        await session.commit()
+
+
+async def build(full: bool = False):
+    started_at = datetime.utcnow()  # interactions arriving while we compute are picked up by the next run
+    async with async_session_maker() as session:
+        if full:
+            matrix, job_uids = await load_interactions(session)
+            items, norms = np.arange(len(job_uids)), None
+        else:
+            result = await session.execute(select(func.max(JobNeighbours.computed_at)))
+            watermark = result.scalar() or datetime.min
+            affected = affected_jobs(watermark)
+            users = users_of(affected)  # the complete columns of the affected jobs
+            matrix, job_uids = await load_interactions(session, users)
+            norms = await load_norms(session, job_uids, users)
+            result = await session.execute(affected)
+            column_of = {job_uid: column for column, job_uid in enumerate(job_uids)}
+            items = np.array(sorted(column_of[job_uid] for job_uid in result.scalars().all() if job_uid in column_of),
+                             dtype=np.int64)
+
+        computed = 0
+        for chunk, row, col, scores in top_neighbours(matrix, items, norms):
+            bounds = np.searchsorted(row, np.arange(len(chunk) + 1))  # entries of chunk[i] are bounds[i]:bounds[i+1]
+            records = [
+                {
+                    "job_uid": job_uids[item],
+                    "neighbour_uids": [job_uids[c] for c in col[bounds[i]:bounds[i + 1]]],
+                    "scores": scores[bounds[i]:bounds[i + 1]].tolist(),
+                    "computed_at": started_at
+                }
+                for i, item in enumerate(chunk)
+            ]
+            await write_neighbours(session, records)
+            computed += len(records)
+
+    print(f"Computed neighbours for {computed} jobs ({'full' if full else 'incremental'} run)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute job neighbours for recommendations")
+    parser.add_argument('--full', action='store_true', help="recompute every job instead of only changed ones")
+    args = parser.parse_args()
+    asyncio.run(build(full=args.full))
@@ -0,0 +1,53 @@
+import heapq
+from collections import defaultdict
+from operator import itemgetter
+from sqlalchemy import union
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.cache import LRUCache
+from app.db.models import JobLikes, Applications, JobNeighbours
+
+MAX_CANDIDATES = 200  # ranked job uids kept per user
+
+recommendation_cache = LRUCache(maxsize=10000, ttl=60)  # user uid -> [(job uid, score)] best first
+
+
+class RecommendationService:
+
+    async def recommended_jobs(self, user_uid: str, session: AsyncSession, limit: int = 20) -> list:
+        """Fetch the active jobs recommended to a user based on the jobs he has liked or applied for."""
+        from app.jobs.service import JobService
+        job_service = JobService()
+
+        ranked = recommendation_cache.get(user_uid)
+        if ranked is None:
+            ranked = await self._rank(user_uid, session)
+            recommendation_cache.set(user_uid, ranked)
+
+        candidates = ranked[:limit * 2]  # some candidates may have been deactivated in the meantime
+        jobs = await job_service.get_jobs_by_uids([uid for uid, _ in candidates], user_uid, session)
+        recommended = [{**jobs[uid], "score": round(score, 4)} for uid, score in candidates if uid in jobs]
+        return recommended[:limit]
+
+    async def _rank(self, user_uid: str, session: AsyncSession) -> list:
+        """Blend the precomputed neighbour lists of all jobs the user interacted with."""
+        interacted = union(
+            select(JobLikes.job_id.label('job_uid')).where(JobLikes.user_id == user_uid),
+            select(Applications.job_uid).where(Applications.user_uid == user_uid)
+        ).subquery()
+        statement = (
+            select(interacted.c.job_uid, JobNeighbours.neighbour_uids, JobNeighbours.scores)
+            .select_from(interacted)
+            .outerjoin(JobNeighbours, JobNeighbours.job_uid == interacted.c.job_uid)
+        )
+        result = await session.execute(statement)
+
+        seen = set()
+        blended = defaultdict(float)
+        for job_uid, neighbour_uids, scores in result.all():
+            seen.add(str(job_uid))
+            for neighbour_uid, score in zip(neighbour_uids or [], scores or []):
+                blended[str(neighbour_uid)] += score
+
+        candidates = ((uid, score) for uid, score in blended.items() if uid not in seen)
+        return heapq.nlargest(MAX_CANDIDATES, candidates, key=itemgetter(1))
@@ -0,0 +1,16 @@
+from app.config import Config
+from app.storage.base import BlobStorage
+
+
+def create_storage() -> BlobStorage:
+    """Storage backend selected by STORAGE_BACKEND. Backends create their clients lazily on first use."""
+    if Config.STORAGE_BACKEND == 'local':
+        from app.storage.local import LocalBlobStorage
+        return LocalBlobStorage(Config.LOCAL_STORAGE_DIR, Config.LOCAL_STORAGE_URL)
+    if Config.STORAGE_BACKEND == 'azure':
+        from app.storage.azure import AzureBlobStorage
+        return AzureBlobStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {Config.STORAGE_BACKEND}")
+
+
+storage = create_storage()
@@ -0,0 +1,136 @@
+import asyncio
+import base64
+from typing import Optional
+from fastapi import UploadFile
+from app.config import Config
+from app.errors import FileTooLarge
+from app.storage.base import BlobStorage
+
+BATCH_MAX_SUBREQUESTS = 256  # limit of the blob batch api
+
+
+class AzureBlobStorage(BlobStorage):
+    """
+    Azure Blob Storage backend. The async client (and the SDK import) is created on first use and then shared
+    by the whole worker, so all requests use one connection pool. Closed with the application lifespan.
+    """
+
+    def __init__(self):
+        self._service = None
+        self._container = None
+
+    def container(self):
+        if self._container is None:
+            from azure.storage.blob.aio import BlobServiceClient  # the aio client needs aiohttp
+
+            if not (Config.AZURE_BLOB_ACCOUNT_URL and Config.AZURE_BLOB_CONTAINER_NAME):
+                raise RuntimeError("AZURE_BLOB_* settings are required for the azure storage backend")
+            # initialize blob service using account URL + SAS token
+            self._service = BlobServiceClient(
+                account_url=Config.AZURE_BLOB_ACCOUNT_URL,
+                credential=Config.AZURE_BLOB_SAS_TOKEN,
+                max_single_get_size=Config.BLOB_BLOCK_SIZE,  # downloads are streamed in blocks of this size
+                max_chunk_get_size=Config.BLOB_BLOCK_SIZE
+            )
+            self._container = self._service.get_container_client(Config.AZURE_BLOB_CONTAINER_NAME)
+        return self._container
+
+    async def close(self):
+        if self._service is not None:
+            await self._service.close()
+            self._service = self._container = None
+
+    def url(self, name: str) -> str:
+        return self.container().get_blob_client(name).url
+
+    async def delete(self, name: str) -> bool:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            await self.container().delete_blob(name)
+            return True
+        except ResourceNotFoundError:
+            return False
+
+    async def stream(self, name: str, offset: int = 0, length: Optional[int] = None):
+        # chunks of at most BLOB_BLOCK_SIZE, fetched one after the other
+        downloader = await self.container().get_blob_client(name).download_blob(
+            offset=offset, length=length, max_concurrency=1)
+        async for chunk in downloader.chunks():
+            yield chunk
+
+    async def delete_many(self, names: list) -> int:
+        """Delete blobs with blob batch requests, one round trip per 256 blobs."""
+        deleted = 0
+        for start in range(0, len(names), BATCH_MAX_SUBREQUESTS):
+            responses = await self.container().delete_blobs(*names[start:start + BATCH_MAX_SUBREQUESTS],
+                                                            raise_on_any_failure=False)  # missing blobs are fine
+            async for response in responses:
+                if response.status_code == 202:
+                    deleted += 1
+                elif response.status_code != 404:
+                    raise RuntimeError(f"Failed to delete blob: HTTP {response.status_code}")
+        return deleted
+
+    async def upload(self, name: str, data: bytes, content_type: Optional[str] = None,
+                     cache_control: Optional[str] = None) -> str:
+        from azure.storage.blob import ContentSettings
+
+        blob_client = self.container().get_blob_client(name)
+        await blob_client.upload_blob(data, overwrite=True, content_settings=ContentSettings(
+            content_type=content_type, cache_control=cache_control))
+        return blob_client.url
+
+    async def upload_stream(self, name: str, file: UploadFile, max_size: int,
+                            content_type: Optional[str] = None) -> str:
+        """
+        Stream an upload into a blob chunk by chunk. Larger files are staged as blocks,
+        up to BLOB_MAX_CONCURRENCY in parallel, so memory stays bounded by the block size times the concurrency.
+        Raises FileTooLarge as soon as more than max_size bytes were read. The blob is only committed at the end,
+        so a rejected upload never replaces the existing blob.
+        """
+        from azure.storage.blob import BlobBlock, ContentSettings
+
+        if file.size is not None and file.size > max_size:  # known up front for multipart uploads
+            raise FileTooLarge()
+
+        blob_client = self.container().get_blob_client(name)
+        content_settings = ContentSettings(content_type=content_type or file.content_type)
+        chunk = await file.read(Config.BLOB_BLOCK_SIZE)
+        if len(chunk) > max_size:
+            raise FileTooLarge()
+        next_chunk = await file.read(Config.BLOB_BLOCK_SIZE) if len(chunk) == Config.BLOB_BLOCK_SIZE else b''
+        if not next_chunk:  # fits in a single request
+            await blob_client.upload_blob(chunk, overwrite=True, content_settings=content_settings)
+            return blob_client.url
+
+        slots = asyncio.Semaphore(Config.BLOB_MAX_CONCURRENCY)
+        block_ids, uploads = [], []
+
+        async def stage(block_id: str, data: bytes):
+            try:
+                await blob_client.stage_block(block_id, data)
+            finally:
+                slots.release()
+
+        try:
+            size = 0
+            while chunk:
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLarge()
+                # fixed width ids, Azure requires all block ids of a blob to have the same length
+                block_id = base64.b64encode(f"{len(block_ids):08d}".encode()).decode()
+                block_ids.append(block_id)
+                await slots.acquire()  # wait for a free slot before reading more into memory
+                uploads.append(asyncio.create_task(stage(block_id, chunk)))
+                chunk, next_chunk = next_chunk, (await file.read(Config.BLOB_BLOCK_SIZE) if next_chunk else b'')
+            await asyncio.gather(*uploads)
+        except BaseException:
+            for upload in uploads:  # uncommitted blocks are discarded by Azure
+                upload.cancel()
+            raise
+
+        await blob_client.commit_block_list([BlobBlock(block_id=block_id) for block_id in block_ids],
+                                            content_settings=content_settings)
+        return blob_client.url
@@ -0,0 +1,36 @@
+import asyncio
+from typing import AsyncIterator, Optional
+from fastapi import UploadFile
+
+
+class BlobStorage:
+    """Interface of the blob storage backends. Blobs are addressed by a '/' separated name."""
+
+    async def upload_stream(self, name: str, file: UploadFile, max_size: int,
+                            content_type: Optional[str] = None) -> str:
+        """Stream an upload into the blob `name` (replacing it) and return its url. Raises FileTooLarge."""
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def upload(self, name: str, data: bytes, content_type: Optional[str] = None,
+                     cache_control: Optional[str] = None) -> str:
+        """Store small in-memory content as the blob `name` (replacing it) and return its url."""
+        raise NotImplementedError("Please Override this method in child classes")
+
+    def stream(self, name: str, offset: int = 0, length: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Download a blob (or `length` bytes of it from `offset`) chunk by chunk."""
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def delete(self, name: str) -> bool:
+        """Delete a blob. Returns False if it did not exist."""
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def delete_many(self, names: list) -> int:
+        """Delete several blobs at once, missing ones are skipped. Returns the number of deleted blobs."""
+        return sum(await asyncio.gather(*(self.delete(name) for name in names)))
+
+    def url(self, name: str) -> str:
+        raise NotImplementedError("Please Override this method in child classes")
+
+    async def close(self):
+        """Release connections, called on application shutdown."""
+        pass
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import uuid
+from typing import Optional
+from fastapi import UploadFile
+from app.config import Config
+from app.errors import FileTooLarge
+from app.storage.base import BlobStorage
+
+
+class LocalBlobStorage(BlobStorage):
+    """
+    Filesystem backend for development, tests and benchmarks (single host).
+
+    Contents are stored once per SHA-256 under objects/, every blob name under names/ is a hard link to its object,
+    so identical uploads share their bytes. Files are written to tmp/ and renamed into place, readers never see
+    partial files. Blobs are served by app.storage.routes with FileResponse.
+    """
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.realpath(root)
+        self.base_url = base_url.rstrip('/')
+        self._objects = os.path.join(self.root, 'objects')
+        self._names = os.path.join(self.root, 'names')
+        self._tmp = os.path.join(self.root, 'tmp')
+
+    def path(self, name: str) -> Optional[str]:
+        """Filesystem path of a blob name, None when the name points outside of the storage directory."""
+        path = os.path.realpath(os.path.join(self._names, name))
+        return path if path.startswith(self._names + os.sep) else None
+
+    def url(self, name: str) -> str:
+        return f"{self.base_url}/{name}"
+
+    async def upload(self, name: str, data: bytes, content_type: Optional[str] = None,
+                     cache_control: Optional[str] = None) -> str:
+        target = self.path(name)
+        if target is None:
+            raise ValueError(f"Invalid blob name: {name}")
+        await asyncio.to_thread(self._write, data, target)
+        return self.url(name)
+
+    async def upload_stream(self, name: str, file: UploadFile, max_size: int,
+                            content_type: Optional[str] = None) -> str:
+        if file.size is not None and file.size > max_size:
+            raise FileTooLarge()
+        target = self.path(name)
+        if target is None:
+            raise ValueError(f"Invalid blob name: {name}")
+
+        os.makedirs(self._tmp, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                while True:
+                    chunk = await file.read(Config.BLOB_BLOCK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_size:
+                        raise FileTooLarge()
+                    digest.update(chunk)
+                    await asyncio.to_thread(tmp_file.write, chunk)  # disk io off the event loop
+                await asyncio.to_thread(self._sync, tmp_file)
+            await asyncio.to_thread(self._commit, tmp_path, digest.hexdigest(), target)
+        finally:
+            if os.path.exists(tmp_path):  # rejected upload or deduplicated content
+                os.unlink(tmp_path)
+        return self.url(name)
+
+    async def stream(self, name: str, offset: int = 0, length: Optional[int] = None):
+        path = self.path(name)
+        if path is None:
+            raise FileNotFoundError(name)
+        blob_file = await asyncio.to_thread(open, path, 'rb')
+        try:
+            await asyncio.to_thread(blob_file.seek, offset)
+            remaining = length
+            while remaining is None or remaining > 0:
+                chunk_size = Config.BLOB_BLOCK_SIZE if remaining is None else min(remaining, Config.BLOB_BLOCK_SIZE)
+                chunk = await asyncio.to_thread(blob_file.read, chunk_size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            blob_file.close()
+
+    async def delete(self, name: str) -> bool:
+        path = self.path(name)
+        if path is None:
+            return False
+        return await asyncio.to_thread(self._release, path)
+
+    def _write(self, data: bytes, target: str):
+        os.makedirs(self._tmp, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(data)
+                self._sync(tmp_file)
+            self._commit(tmp_path, hashlib.sha256(data).hexdigest(), target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    async def delete_many(self, names: list) -> int:
+        paths = [path for path in map(self.path, names) if path is not None]
+        return await asyncio.to_thread(lambda: sum(self._release(path) for path in paths))  # one thread hop
+
+    @staticmethod
+    def _sync(file):
+        file.flush()
+        os.fsync(file.fileno())
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self._objects, sha256[:2], sha256)
+
+    def _commit(self, tmp_path: str, sha256: str, target: str):
+        object_path = self._object_path(sha256)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        if not os.path.exists(object_path):  # otherwise identical content is stored already
+            os.replace(tmp_path, object_path)
+
+        previous_object = self._orphaned_object(target)
+        # link under a temporary name, then atomically swap it in place of the old blob
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        link_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        os.link(object_path, link_path)
+        os.replace(link_path, target)
+        if previous_object and previous_object != object_path:
+            self._remove_if_unreferenced(previous_object)
+
+    def _release(self, path: str) -> bool:
+        """Unlink a blob name and remove its object when no other name shares it."""
+        if not os.path.isfile(path):
+            return False
+        object_path = self._orphaned_object(path)
+        os.unlink(path)
+        if object_path:
+            self._remove_if_unreferenced(object_path)
+        return True
+
+    def _orphaned_object(self, path: str) -> Optional[str]:
+        """The object of a blob name if that name is its only reference (the object itself is the other link)."""
+        try:
+            if os.stat(path).st_nlink > 2:
+                return None
+        except FileNotFoundError:
+            return None
+        digest = hashlib.sha256()
+        with open(path, 'rb') as blob_file:
+            for chunk in iter(lambda: blob_file.read(Config.BLOB_BLOCK_SIZE), b''):
+                digest.update(chunk)
+        return self._object_path(digest.hexdigest())
+
+    @staticmethod
+    def _remove_if_unreferenced(object_path: str):
+        try:
+            if os.stat(object_path).st_nlink == 1:
+                os.unlink(object_path)
+        except FileNotFoundError:
+            pass
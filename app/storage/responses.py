@@ -0,0 +1,54 @@
+import re
+from typing import Optional
+from urllib.parse import quote
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from app.storage import storage
+
+RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """
+    (start, end) of a single byte range, end inclusive. None when the whole content is sent: no header, a malformed
+    one or several ranges (which a server may ignore). Raises ValueError if the range can't be satisfied.
+    """
+    match = RANGE_PATTERN.fullmatch(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':  # suffix range, the last N bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def blob_response(request: Request, name: str, size: int, content_type: str, etag: str,
+                  filename: Optional[str] = None) -> Response:
+    """
+    Stream a stored blob, or a single byte range of it for Range requests (resumed downloads, pdf viewers).
+    Chunks are passed through as they arrive from the storage, memory use doesn't depend on the file size.
+    """
+    headers = {'Accept-Ranges': 'bytes', 'ETag': etag}
+    if filename:
+        headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+
+    if_range = request.headers.get('if-range')
+    try:  # a range of an older version of the file is useless, If-Range mismatches get the whole file
+        byte_range = parse_range(request.headers.get('range'), size) if if_range in (None, etag) else None
+    except ValueError:
+        return Response(status_code=416, headers={'Content-Range': f"bytes */{size}", **headers})
+
+    if byte_range is None:
+        return StreamingResponse(storage.stream(name), media_type=content_type,
+                                 headers={'Content-Length': str(size), **headers})
+    start, end = byte_range
+    headers.update({'Content-Range': f"bytes {start}-{end}/{size}", 'Content-Length': str(end - start + 1)})
+    return StreamingResponse(storage.stream(name, start, end - start + 1), status_code=206, media_type=content_type,
+                             headers=headers)
@@ -0,0 +1,27 @@
+import os
+from fastapi import APIRouter
+from fastapi.responses import FileResponse
+from app.storage import storage
+from app.errors import BlobNotFound
+
+storage_router = APIRouter()
+
+# top level directories served without authentication: the avatars. Attachments (CVs) are only served by the
+# permission checked download endpoint of their application
+PUBLIC_PREFIXES = ('profile_pictures',)
+
+
+def is_public(name: str) -> bool:
+    return os.path.normpath(name).split(os.sep)[0] in PUBLIC_PREFIXES  # normalized: no way out with ../
+
+
+@storage_router.get('/{name:path}')
+async def get_blob(name: str):
+    """
+    Serve a public blob of the local storage backend (only mounted when STORAGE_BACKEND=local).
+    FileResponse streams from disk, or hands the path to the server when it supports pathsend.
+    """
+    path = storage.path(name) if is_public(name) else None
+    if path is None or not os.path.isfile(path):
+        raise BlobNotFound()
+    return FileResponse(path)
@@ -0,0 +1,15 @@
+import re
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*")  # keeps terms like c++ and c#
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'is', 'it', 'its', 'of',
+    'on', 'or', 'that', 'the', 'this', 'to', 'was', 'we', 'will', 'with', 'you', 'your', 'our', 'us', 'who', 'all'
+})
+
+
+def tokenize(text: str) -> list:
+    """Split text into lowercase word tokens without stop words."""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
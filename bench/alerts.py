@@ -0,0 +1,137 @@
+"""
+Benchmark of the job alert matching (AlertService._find_matches) against the database of DATABASE_URL, migrated
+to head.
+
+    python -m bench.alerts                              # 1000 jobs against 100k saved searches
+    python -m bench.alerts --jobs 5000 --searches 1000000
+
+Seeds the saved searches of scratch users (removed afterwards) and matches synthetic jobs against them in
+batches, like match_jobs. Reports the time per batch and per job through the inverted index, and the time of
+checking every saved search in Python, which is what matching without the index would cost.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime
+import numpy as np
+from sqlalchemy import insert, text
+from app.alerts.service import ALERT_MATCH_BATCH_SIZE, AlertService, job_terms, search_terms
+from app.db.main import async_session_maker
+from app.db.models import Jobs, SavedSearch, SavedSearchTerm
+
+WORDS = ["python", "java", "backend", "frontend", "developer", "engineer", "data", "scientist", "account", "manager",
+         "marketing", "sales", "product", "designer", "nurse", "devops", "support", "analyst", "teacher", "driver",
+         "remote", "cloud", "security", "senior", "junior", "fastapi", "django", "react", "kubernetes", "sql"]
+CATEGORIES = ["Development", "Design", "Sales", "Marketing", "Finance", "Healthcare", "Office Administration"]
+TYPES = ["Full-time", "Part-time", "Remote"]
+INSERT_BATCH_SIZE = 10_000
+
+
+def synthetic_searches(count: int, rng: np.random.Generator) -> list:
+    """(keywords, category, type) of saved searches: one to three keywords, half of them with a category or type."""
+    return [(" ".join(rng.choice(WORDS, size=rng.integers(1, 4), replace=False)),
+             CATEGORIES[rng.integers(len(CATEGORIES))] if rng.random() < 0.5 else None,
+             TYPES[rng.integers(len(TYPES))] if rng.random() < 0.5 else None)
+            for _ in range(count)]
+
+
+def synthetic_jobs(count: int, author_uid: uuid.UUID, rng: np.random.Generator) -> list:
+    return [Jobs(uid=uuid.uuid4(), title=" ".join(rng.choice(WORDS, size=3, replace=False)),
+                 description=" ".join(rng.choice(WORDS, size=40)), category=CATEGORIES[rng.integers(len(CATEGORIES))],
+                 type=TYPES[rng.integers(len(TYPES))], author_uid=author_uid)
+            for _ in range(count)]
+
+
+async def seed(session, searches: list, users: int) -> str:
+    """
+    Insert scratch users with the saved searches (assigned round robin) and their index terms.
+    Returns the username prefix of the users.
+    """
+    prefix, now = f"bench-{uuid.uuid4().hex[:8]}-", datetime.utcnow()
+    result = await session.execute(text(
+        "INSERT INTO users (uid, username, email, password_hash, role, is_active) "
+        "SELECT gen_random_uuid(), :prefix || i, :prefix || i || '@example.com', '', 'USER', true "
+        "FROM generate_series(1, :users) AS i RETURNING uid"
+    ), {"prefix": prefix, "users": users})
+    user_uids = result.scalars().all()
+    for start in range(0, len(searches), INSERT_BATCH_SIZE):
+        rows, term_rows = [], []
+        for i, (keywords, category, job_type) in enumerate(searches[start:start + INSERT_BATCH_SIZE], start):
+            terms = search_terms(keywords, category, job_type)
+            search_uid = uuid.uuid4()
+            rows.append({"uid": search_uid, "user_uid": user_uids[i % users], "keywords": keywords, "category": category,
+                         "type": job_type, "term_count": len(terms), "created_at": now})
+            term_rows.extend({"term": term, "saved_search_uid": search_uid} for term in terms)
+        await session.execute(insert(SavedSearch), rows)
+        await session.execute(insert(SavedSearchTerm), term_rows)
+    await session.commit()
+    await session.execute(text("ANALYZE saved_searches"))
+    await session.execute(text("ANALYZE saved_search_terms"))
+    return prefix
+
+
+async def unseed(session, prefix: str):
+    users = "SELECT uid FROM users WHERE username LIKE :pattern"
+    await session.execute(text(
+        f"DELETE FROM saved_search_terms WHERE saved_search_uid IN "
+        f"(SELECT uid FROM saved_searches WHERE user_uid IN ({users}))"
+    ), {"pattern": f"{prefix}%"})
+    await session.execute(text(f"DELETE FROM saved_searches WHERE user_uid IN ({users})"), {"pattern": f"{prefix}%"})
+    await session.execute(text("DELETE FROM users WHERE username LIKE :pattern"), {"pattern": f"{prefix}%"})
+    await session.commit()
+
+
+def scan_matches(jobs: list, searches: list, users: int) -> int:
+    """(job, user) matches found by checking every saved search against every job."""
+    search_term_sets = [search_terms(*search) for search in searches]
+    matches = set()
+    for job in jobs:
+        terms = job_terms(job)
+        matches.update((job.uid, i % users) for i, search_term_set in enumerate(search_term_sets)
+                       if search_term_set <= terms)
+    return len(matches)
+
+
+async def run(args):
+    rng = np.random.default_rng(30)
+    searches = synthetic_searches(args.searches, rng)
+    service = AlertService()
+    async with async_session_maker() as session:
+        prefix = await seed(session, searches, args.users)
+        try:
+            jobs = synthetic_jobs(args.jobs, uuid.uuid4(), rng)
+            await service._find_matches(jobs[:ALERT_MATCH_BATCH_SIZE], session)  # warm up
+            latencies, matches = [], 0
+            for start in range(0, len(jobs), ALERT_MATCH_BATCH_SIZE):
+                started = time.perf_counter()
+                matches += len(await service._find_matches(jobs[start:start + ALERT_MATCH_BATCH_SIZE], session))
+                latencies.append(time.perf_counter() - started)
+            latencies = np.array(latencies) * 1000
+            print(f"index: {len(jobs)} jobs x {len(searches)} saved searches, {matches} (job, user) matches, "
+                  f"p50 {np.percentile(latencies, 50):.1f} ms per batch of {ALERT_MATCH_BATCH_SIZE}, "
+                  f"{latencies.sum() / len(jobs):.2f} ms per job")
+        finally:
+            if not args.keep:
+                await unseed(session, prefix)
+
+    scanned = jobs[:args.scan_jobs]
+    started = time.perf_counter()
+    scan = scan_matches(scanned, searches, args.users)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"full scan: {len(scanned)} jobs, {scan} (job, user) matches, {elapsed / len(scanned):.2f} ms per job")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=1000)
+    parser.add_argument('--searches', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=10_000, help="users the saved searches belong to")
+    parser.add_argument('--scan-jobs', type=int, default=50, help="jobs checked against every saved search")
+    parser.add_argument('--keep', action='store_true', help="keep the seeded saved searches")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark of the near-duplicate detection (app.jobs.dedup) on synthetic postings with reposts.
+
+    python -m bench.dedup                         # 5000 postings, up to 5 reposts each
+    python -m bench.dedup --postings 50000 --boilerplate 20000
+
+Reports the cost of a signature, the clustering time over in-memory LSH buckets (the same grouping
+cluster_duplicates streams from Postgres) and how many reposts were found, plus the time of one bucket of
+boilerplate postings sharing a band.
+"""
+import argparse
+import time
+import numpy as np
+from app.jobs.dedup import _union_bucket, band_buckets, minhash
+
+VOCABULARY_SIZE = 20_000
+
+
+def synthetic_postings(count: int, words: int, max_reposts: int, rng: np.random.Generator) -> list:
+    """(job id, id of the original, description) of postings and their reposts, which change ~1% of the words."""
+    postings = []
+    for _ in range(count):
+        tokens = rng.integers(0, VOCABULARY_SIZE, size=words)
+        original = len(postings)
+        postings.append((original, original, tokens))
+        for _ in range(rng.integers(0, max_reposts + 1)):
+            repost = tokens.copy()
+            changed = rng.integers(0, words, size=max(words // 100, 1))
+            repost[changed] = rng.integers(0, VOCABULARY_SIZE, size=len(changed))
+            postings.append((len(postings), original, repost))
+    return [(job_id, original, " ".join(f"w{token}" for token in tokens)) for job_id, original, tokens in postings]
+
+
+def cluster(signatures: list) -> dict:
+    parent = {}
+
+    def find(job_id):
+        parent.setdefault(job_id, job_id)
+        while parent[job_id] != job_id:
+            parent[job_id] = parent[parent[job_id]]
+            job_id = parent[job_id]
+        return job_id
+
+    buckets = {}
+    for job_id, signature in signatures:
+        for bucket in band_buckets(signature):
+            buckets.setdefault(bucket, []).append((job_id, signature))
+    for members in buckets.values():
+        _union_bucket(members, find, parent)
+    return {job_id: find(job_id) for job_id, _ in signatures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--postings', type=int, default=5000)
+    parser.add_argument('--words', type=int, default=200)
+    parser.add_argument('--reposts', type=int, default=5, help="maximum reposts of one posting")
+    parser.add_argument('--boilerplate', type=int, default=10_000, help="postings in the boilerplate bucket")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(34)
+    postings = synthetic_postings(args.postings, args.words, args.reposts, rng)
+
+    started = time.perf_counter()
+    signatures = [(job_id, minhash("Job title", description)) for job_id, _, description in postings]
+    elapsed = time.perf_counter() - started
+    print(f"minhash of {len(postings)} postings: {elapsed * 1000:.0f} ms ({elapsed / len(postings) * 1e6:.0f} us each)")
+
+    started = time.perf_counter()
+    roots = cluster(signatures)
+    print(f"clustering: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    reposts = [(job_id, original) for job_id, original, _ in postings if job_id != original]
+    found = sum(roots[job_id] == roots[original] for job_id, original in reposts)
+    originals = [job_id for job_id, original, _ in postings if job_id == original]
+    merged = len(originals) - len({roots[job_id] for job_id in originals})  # different postings in one cluster
+    print(f"reposts found: {found} of {len(reposts)}, different postings merged: {merged}")
+
+    description = synthetic_postings(1, args.words, 0, rng)[0][2]
+    boilerplate = [(i, minhash("Job title", f"{description} w{i}")) for i in range(args.boilerplate)]
+    parent = {}
+    started = time.perf_counter()
+    _union_bucket(boilerplate, lambda job_id: parent.setdefault(job_id, job_id), parent)
+    print(f"one bucket of {len(boilerplate)} boilerplate postings: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark of the response encoding of large lists, run through FastAPI's own serialization.
+
+    python -m bench.serialization                  # feeds of 10k items
+    python -m bench.serialization --items 50000
+
+"before" is a route without a response model: jsonable_encoder and the standard JSONResponse.
+"after" is a route declaring a response model (validated and dumped by pydantic-core) with ORJSONResponse.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from app.jobs.schemas import JobResponseModel
+from app.notifications.schemas import NotificationResponseModel
+
+
+def job_feed(count: int) -> list:
+    return [
+        {
+            "_id": str(uuid.uuid4()),
+            "title": f"Senior Python developer {i}",
+            "description": "Build and run the APIs of our job platform. " * 8,
+            "type": "Full-time",
+            "likes": i % 50,
+            "category": "Development",
+            "isActive": True,
+            "authorName": f"organization{i % 100}",
+            "isLiked": i % 3 == 0
+        }
+        for i in range(count)
+    ]
+
+
+def notification_feed(count: int) -> list:
+    started = datetime(2025, 7, 1)
+    return [
+        {
+            "notification_id": str(uuid.uuid4()),
+            "sender_name": f"user{i % 1000}",
+            "message": f"user{i % 1000} applied for Senior Python developer {i}",
+            "is_read": i % 2 == 0,
+            "created_at": started + timedelta(minutes=i),
+            "job_id": str(uuid.uuid4()),
+            "application_id": str(uuid.uuid4())
+        }
+        for i in range(count)
+    ]
+
+
+async def encode_before(content: list) -> bytes:
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+async def encode_after(field, content: list) -> bytes:
+    serialized = await serialize_response(field=field, response_content=content, exclude_unset=True,
+                                          is_coroutine=True)
+    return ORJSONResponse(serialized).body
+
+
+async def best_time(encode, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = await encode()
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(body)
+
+
+async def run(args):
+    feeds = [
+        ("job feed", job_feed(args.items), List[JobResponseModel]),
+        ("notifications", notification_feed(args.items), List[NotificationResponseModel]),
+    ]
+    for label, content, response_model in feeds:
+        field = create_model_field(name="response", type_=response_model, mode="serialization")
+        before, before_size = await best_time(lambda: encode_before(content), args.repeat)
+        after, after_size = await best_time(lambda: encode_after(field, content), args.repeat)
+        print(f"{label} of {args.items} items: before {before * 1000:.0f} ms ({before_size} bytes), "
+              f"after {after * 1000:.0f} ms ({after_size} bytes), {before / after:.1f}x faster")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark of the similar jobs index (app.jobs.similarity) on a large synthetic job set.
+
+    python -m bench.similarity                   # 200k jobs
+    python -m bench.similarity --jobs 1000000
+
+Reports the time to build and write a snapshot, to load (memory-map) it, to answer a query and to merge a
+delta of changed jobs into a new snapshot.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+import numpy as np
+from app.jobs.similarity import SimilarityIndex, SnapshotLock, build_arrays, job_features, write_snapshot
+
+VOCABULARY_SIZE = 50_000
+CATEGORIES = ["engineering", "design", "sales", "marketing", "finance", "support", "operations", "legal"]
+
+
+def synthetic_jobs(count: int, words: int, rng: np.random.Generator) -> list:
+    vocabulary = np.array([f"term{i}" for i in range(VOCABULARY_SIZE)])
+    ranks = np.minimum(rng.zipf(1.3, size=(count, words)), VOCABULARY_SIZE) - 1
+    return [
+        SimpleNamespace(uid=uuid.UUID(bytes=rng.bytes(16)), title=" ".join(vocabulary[row[:4]]),
+                        description=" ".join(vocabulary[row[4:]]), category=CATEGORIES[i % len(CATEGORIES)])
+        for i, row in enumerate(ranks)
+    ]
+
+
+class Timer:
+    def __init__(self, label: str):
+        self.label = label
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        print(f"{self.label:<40}{(time.perf_counter() - self.started) * 1000:10.1f} ms")
+
+
+async def run(args):
+    rng = np.random.default_rng(31)
+    jobs = synthetic_jobs(args.jobs, args.words, rng)
+    directory = tempfile.mkdtemp(prefix="similarity-bench-")
+    index = SimilarityIndex(directory)
+
+    with Timer(f"features of {len(jobs)} jobs"):
+        rows = [(job.uid.bytes, *job_features(job.title, job.description, job.category)) for job in jobs]
+    with Timer("build and write the snapshot"):
+        arrays = build_arrays(rows)
+        with SnapshotLock(directory):
+            version = write_snapshot(directory, arrays)
+    with Timer("load (memory-map) the snapshot"):
+        index._load(version)
+
+    samples = [jobs[i] for i in rng.integers(0, len(jobs), size=args.queries)]
+    latencies = []
+    for job in samples:
+        started = time.perf_counter()
+        await index.similar(job, 10, session=None)
+        latencies.append(time.perf_counter() - started)
+    print(f"{'query p50 / p95':<40}{np.percentile(latencies, 50) * 1000:10.1f} ms"
+          f"{np.percentile(latencies, 95) * 1000:10.1f} ms")
+
+    with Timer(f"record {args.changes} changed jobs"):
+        for job in synthetic_jobs(args.changes, args.words, rng):
+            index.record_upsert(job.uid, job.title, job.description, job.category)
+    with Timer("merge them into a new snapshot"):
+        await index.persist()
+    assert index.n_docs == len(jobs) + args.changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=200_000)
+    parser.add_argument('--words', type=int, default=150)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--changes', type=int, default=400)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark of the title autocomplete (GET /jobs/suggest) against the database of DATABASE_URL, migrated to head.
+
+    python -m bench.suggest                      # the jobs already in the database
+    python -m bench.suggest --seed 1000000       # add 1M synthetic active jobs first (removed afterwards)
+
+Reports the latency of uncached and cached suggestions and checks with EXPLAIN ANALYZE that the suggestion
+queries are served by the trigram indexes, not by a sequential scan of the jobs table.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+import numpy as np
+from sqlalchemy import text
+from app.db.main import async_session_maker
+from app.db.models import Jobs
+from app.jobs.service import JobService, suggestion_cache
+
+PREFIXES = ["dev", "develo", "devloper", "senior pyth", "backnd", "data sci", "acount", "mark", "sales",
+            "product desig", "nurse", "qa eng", "devops", "ux", "recep"]
+SEED_WORDS = ["senior", "junior", "lead", "python", "java", "backend", "frontend", "developer", "engineer", "data",
+              "scientist", "account", "manager", "marketing", "sales", "product", "designer", "nurse", "devops",
+              "qa", "support", "analyst", "receptionist", "teacher", "driver", "remote", "cloud", "security"]
+SEED_CATEGORIES = ["Development", "Design", "Sales", "Marketing", "Finance", "Healthcare", "Office Administration"]
+
+
+async def seed(session, jobs: int) -> uuid.UUID:
+    """Insert a scratch organization and its synthetic jobs with one INSERT ... SELECT, then analyze the table."""
+    author_uid = uuid.uuid4()
+    await session.execute(text(
+        "INSERT INTO users (uid, username, email, password_hash, role, is_active) "
+        "VALUES (:uid, :name, :email, '', 'ORGANIZATION', true)"
+    ), {"uid": author_uid, "name": f"bench-{author_uid.hex}", "email": f"bench-{author_uid.hex}@example.com"})
+    await session.execute(text(
+        "WITH seed AS (SELECT CAST(:words AS text[]) AS words, CAST(:categories AS text[]) AS categories) "
+        "INSERT INTO jobs (uid, title, description, type, likes, category, author_uid, is_active) "
+        "SELECT gen_random_uuid(), "
+        "       initcap(words[1 + i % 3] || ' ' || words[1 + (i / 3) % cardinality(words)] || ' ' "
+        "               || words[1 + (i / 7) % cardinality(words)] || ' ' || i % 997), "
+        "       '', 'full-time', 0, categories[1 + i % cardinality(categories)], :author_uid, true "
+        "FROM seed, generate_series(1, :jobs) AS i"
+    ), {"words": SEED_WORDS, "categories": SEED_CATEGORIES, "author_uid": author_uid, "jobs": jobs})
+    await session.commit()
+    await session.execute(text("ANALYZE jobs"))
+    return author_uid
+
+
+async def unseed(session, author_uid: uuid.UUID):
+    await session.execute(text("DELETE FROM jobs WHERE author_uid = :uid"), {"uid": author_uid})
+    await session.execute(text("DELETE FROM users WHERE uid = :uid"), {"uid": author_uid})
+    await session.commit()
+
+
+async def sequential_scans(session, prefix: str) -> list:
+    """Relations read by a sequential scan in the plans of the suggestion queries of prefix."""
+    connection = await session.connection()
+    raw = (await connection.get_raw_connection()).driver_connection  # EXPLAIN of the exact (asyncpg) statement
+    scans = []
+    for column in (Jobs.title, Jobs.category):
+        compiled = JobService.suggest_statement(column, prefix, 8).compile(dialect=connection.dialect)
+        parameters = [compiled.params[name] for name in compiled.positiontup]
+        plan = json.loads(await raw.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled.string}", *parameters))
+        nodes = [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node["Node Type"] == "Seq Scan":
+                scans.append(node["Relation Name"])
+            nodes.extend(node.get("Plans", []))
+    return scans
+
+
+async def timed_suggestions(session, prefixes: list, cached: bool) -> np.ndarray:
+    service = JobService()
+    latencies = []
+    for prefix in prefixes:
+        if not cached:
+            suggestion_cache.clear()
+        started = time.perf_counter()
+        await service.suggest(prefix, session)
+        latencies.append(time.perf_counter() - started)
+    return np.array(latencies) * 1000
+
+
+async def run(args):
+    async with async_session_maker() as session:
+        author_uid = await seed(session, args.seed) if args.seed else None
+        try:
+            count = (await session.execute(text("SELECT count(*) FROM jobs WHERE is_active"))).scalar()
+            prefixes = PREFIXES * args.rounds
+            await timed_suggestions(session, PREFIXES, cached=False)  # warm up the connection and the indexes
+            for label, cached in (("uncached", False), ("cached", True)):
+                latencies = await timed_suggestions(session, prefixes, cached)
+                print(f"{label} suggest over {count} active jobs: p50 {np.percentile(latencies, 50):.2f} ms, "
+                      f"p95 {np.percentile(latencies, 95):.2f} ms, max {latencies.max():.2f} ms")
+
+            for prefix in PREFIXES:
+                scans = await sequential_scans(session, prefix)
+                if scans:
+                    print(f"sequential scan for {prefix!r}: {', '.join(scans)}")
+        finally:
+            if author_uid is not None and not args.keep:
+                await unseed(session, author_uid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seed', type=int, default=0, help="synthetic active jobs to insert first")
+    parser.add_argument('--rounds', type=int, default=20, help="times every prefix is suggested")
+    parser.add_argument('--keep', action='store_true', help="keep the seeded jobs")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
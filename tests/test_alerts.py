@@ -0,0 +1,101 @@
+import asyncio
+import uuid
+from datetime import datetime
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine, insert, literal, select, union_all
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+from app.alerts.schemas import SavedSearchCreateModel
+from app.alerts.service import AlertService, search_terms, job_terms
+from app.db.models import Jobs, SavedSearch, SavedSearchTerm
+
+
+@pytest.fixture
+def database():
+    """SQLite with the saved search index, to run the matching query of _find_matches."""
+    engine = create_engine('sqlite://')
+    SavedSearch.metadata.create_all(engine, tables=[SavedSearch.__table__, SavedSearchTerm.__table__])
+    with engine.connect() as connection:
+        yield connection
+
+
+def save_search(database, keywords: str = '', category: str = None, job_type: str = None) -> uuid.UUID:
+    """Index a search like create_saved_search, return its user."""
+    search = SavedSearchCreateModel(keywords=keywords, category=category, type=job_type)
+    terms = search_terms(search.keywords, search.category, search.type)
+    user_uid, search_uid = uuid.uuid4(), uuid.uuid4()
+    database.execute(insert(SavedSearch).values(uid=search_uid, user_uid=user_uid, keywords=search.keywords,
+                                                category=search.category, type=search.type, term_count=len(terms),
+                                                created_at=datetime(2025, 7, 1)))
+    database.execute(insert(SavedSearchTerm), [{'term': term, 'saved_search_uid': search_uid} for term in terms])
+    return user_uid
+
+
+def find_matches(database, jobs: list) -> set:
+    """The (job_uid, user_uid) matches of the jobs, with the (job, term) pairs as a union instead of unnest."""
+    job_term_pairs = union_all(*(select(literal(job.uid).label('job_uid'), literal(term).label('term'))
+                                 for job in jobs for term in job_terms(job))).subquery('job_terms')
+    return {(row.job_uid, row.user_uid) for row in database.execute(AlertService.match_statement(job_term_pairs))}
+
+
+@pytest.fixture
+def job():
+    return Jobs(uid=uuid.uuid4(), title='Senior C++ Developer', description='Build the trading engine of our team.',
+                category='Development', type='Full-time')
+
+
+def test_keywords_match_title_and_description(database, job):
+    matching = {save_search(database, 'c++ developer'),
+                save_search(database, 'Trading, ENGINE!'),  # case and punctuation don't matter
+                save_search(database, 'the engine of the team')}  # stop words are not terms
+    save_search(database, 'c++ designer')  # every term has to be in the job
+    save_search(database, 'c++ developer engine python')  # a job with more than the search's terms isn't enough
+
+    assert find_matches(database, [job]) == {(job.uid, user_uid) for user_uid in matching}
+
+
+def test_category_and_type_are_exact_terms(database, job):
+    matching = {save_search(database, 'developer', category=' development ', job_type='full-time'),
+                save_search(database, category='Development'),
+                save_search(database, 'engine', category='development', job_type='   ')}  # blank type: no term
+    save_search(database, 'developer', job_type='Part-time')
+    save_search(database, 'development')  # keywords don't match the category
+
+    assert find_matches(database, [job]) == {(job.uid, user_uid) for user_uid in matching}
+
+
+def test_matches_of_several_jobs(database, job):
+    designer = Jobs(uid=uuid.uuid4(), title='Graphic designer', description='Logos', category='Design',
+                    type='Part-time')
+    developers, designers = save_search(database, 'developer'), save_search(database, category='design')
+
+    assert find_matches(database, [job, designer]) == {(job.uid, developers), (designer.uid, designers)}
+
+
+def test_find_matches_sends_the_job_terms_as_two_arrays(job):
+    class Session:
+        async def execute(self, statement):
+            self.parameters = statement.compile(dialect=postgresql.dialect()).params
+            return IteratorResult(SimpleResultMetaData(['job_uid', 'user_uid']), iter([]))
+
+    session = Session()
+    assert asyncio.run(AlertService()._find_matches([job], session)) == set()
+    assert sorted(session.parameters['terms']) == sorted(job_terms(job))
+    assert session.parameters['job_uids'] == [job.uid] * len(session.parameters['terms'])
+
+
+@pytest.mark.parametrize('search', [{}, {'keywords': 'the and of'}, {'keywords': '!!!', 'category': '  '}])
+def test_searches_without_terms_are_rejected(search):
+    with pytest.raises(ValidationError):
+        SavedSearchCreateModel(**search)
+
+
+def test_blank_category_and_type_are_stored_as_none():
+    search = SavedSearchCreateModel(keywords='python', category='  ', type='\t')
+    assert search.category is None and search.type is None
+    assert search_terms(search.keywords, ' ', ' ') == {'python'}
+
+    search = SavedSearchCreateModel(category=' Design ')
+    assert search.category == 'Design'
+    assert search_terms(search.keywords, search.category, search.type) == {'category:design'}
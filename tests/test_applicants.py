@@ -0,0 +1,61 @@
+import asyncio
+import uuid
+from datetime import datetime
+import pytest
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+from app.applications.service import ApplicationService
+from app.errors import InsufficientPermission, JobNotFound
+
+JOB_UID = uuid.uuid4()
+AUTHOR_UID = uuid.uuid4()
+APPLICANT_COLUMNS = ['uid', 'job_uid', 'status', 'coverLetter', 'appliedAt', 'user_uid', 'username', 'email',
+                     'firstName', 'lastName', 'attachment_name', 'attachment_size', 'attachment_type']
+
+
+def rows(keys: list, *values) -> IteratorResult:
+    return IteratorResult(SimpleResultMetaData(keys), iter(values))
+
+
+class FakeSession:
+    """Answers the statements in order with the given results and keeps the statements."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return self.results.pop(0)
+
+
+def job_row(author_uid: uuid.UUID) -> IteratorResult:
+    return rows(['uid', 'author_uid', 'title', 'description', 'count', 'latest'],
+                (JOB_UID, author_uid, 'Python developer', 'FastAPI', 1, datetime(2025, 7, 1)))
+
+
+def applicants(session: FakeSession, user_id: uuid.UUID, q: str = None) -> list:
+    return asyncio.run(ApplicationService().get_job_applicants(str(JOB_UID), str(user_id), session, q=q))
+
+
+def test_applicants_are_only_shown_to_the_author_of_the_job():
+    session = FakeSession(job_row(AUTHOR_UID))
+
+    with pytest.raises(InsufficientPermission):
+        applicants(session, uuid.uuid4(), q="python")
+    assert len(session.statements) == 1  # the applicants and their CVs are never searched
+
+
+def test_applicants_of_a_missing_job():
+    with pytest.raises(JobNotFound):
+        applicants(FakeSession(rows(['uid'])), AUTHOR_UID)
+
+
+def test_author_searches_the_applicants_cvs():
+    applicant = (uuid.uuid4(), JOB_UID, 'PENDING', 'Hire me', datetime(2025, 7, 1), uuid.uuid4(), 'jane',
+                 'jane@example.com', 'Jane', None, 'cv.pdf', 2048, 'application/pdf')
+    session = FakeSession(job_row(AUTHOR_UID), rows(APPLICANT_COLUMNS, applicant))
+
+    result = applicants(session, AUTHOR_UID, q="python")
+    assert [application['_id'] for application in result] == [str(applicant[0])]
+    assert result[0]['attachment'] == {'name': 'cv.pdf', 'size': 2048, 'contentType': 'application/pdf'}
+    assert 'websearch_to_tsquery' in str(session.statements[1])
@@ -0,0 +1,103 @@
+import asyncio
+import io
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+from app.auth import avatars
+from app.auth.avatars import AVATAR_FORMATS, AVATAR_SIZES, AvatarProcessor, render_variants, variant_size
+
+
+def image_bytes(image_format: str, size: tuple = (300, 200), mode: str = 'RGB', color=(200, 30, 30), **options):
+    output = io.BytesIO()
+    Image.new(mode, size, color).save(output, image_format, **options)
+    return output.getvalue()
+
+
+def with_metadata() -> bytes:
+    """A JPEG with a camera description and a GPS position in its EXIF data."""
+    exif = Image.Exif()
+    exif[0x010E] = 'secret description'  # ImageDescription
+    exif[0x8825] = {1: 'N', 2: (52.0, 31.0, 12.0), 3: 'E', 4: (13.0, 24.0, 36.0)}  # GPS IFD
+    return image_bytes('JPEG', exif=exif.tobytes())
+
+
+def decoded(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def test_all_variants_are_rendered():
+    variants = render_variants(image_bytes('PNG'))
+
+    assert set(variants) == {(size, extension) for size in AVATAR_SIZES for extension in AVATAR_FORMATS}
+    for (size, extension), data in variants.items():
+        image = decoded(data)
+        assert image.size == (size, size)
+        assert image.format == AVATAR_FORMATS[extension][0]
+
+
+def test_metadata_is_stripped():
+    data = with_metadata()
+    assert decoded(data).getexif().get_ifd(0x8825)  # the upload has a position
+
+    for data in render_variants(data).values():
+        image = decoded(data)
+        assert not image.getexif() and 'exif' not in image.info
+        assert b'secret description' not in data
+
+
+def test_transparency_is_flattened_on_white():
+    variants = render_variants(image_bytes('PNG', mode='RGBA', color=(0, 0, 0, 0)))
+
+    assert decoded(variants[(64, 'jpg')]).getpixel((32, 32)) == pytest.approx((255, 255, 255), abs=2)
+
+
+@pytest.mark.parametrize('data', [b'just some text', image_bytes('GIF'), image_bytes('BMP'), image_bytes('PNG')[:50]])
+def test_unsupported_content_is_rejected(data):
+    with pytest.raises(ValueError):
+        render_variants(data)
+
+
+@pytest.mark.filterwarnings('ignore::PIL.Image.DecompressionBombWarning')  # the 40 x 40 one, below 2 x the limit
+@pytest.mark.parametrize('size', [(100, 100), (40, 40)])  # far above the limit (Pillow's bomb check) and just above
+def test_too_many_pixels_are_rejected(monkeypatch, size):
+    monkeypatch.setattr(avatars, 'MAX_PIXELS', 1000)
+    with pytest.raises(ValueError):
+        render_variants(image_bytes('PNG', size=size))
+    monkeypatch.undo()
+    assert render_variants(image_bytes('PNG', size=size))
+
+
+@pytest.mark.parametrize('requested, size', [(1, 64), (64, 64), (65, 128), (128, 128), (200, 512), (512, 512),
+                                             (4000, 512)])
+def test_variant_size(requested, size):
+    assert variant_size(requested) == size
+
+
+@pytest.fixture
+def processor():
+    """An AvatarProcessor with a thread instead of a worker process."""
+    processor = AvatarProcessor()
+    processor._pool = ThreadPoolExecutor(max_workers=1)
+    processor._slots = asyncio.Semaphore(2)
+    yield processor
+    processor._pool.shutdown()
+
+
+def upload(processor: AvatarProcessor, data: bytes, filename: str, max_bytes: int = 1_000_000):
+    return asyncio.run(processor.render_upload(UploadFile(io.BytesIO(data), filename=filename), max_bytes))
+
+
+def test_uploads_are_checked_by_content_not_by_name(processor):
+    png = image_bytes('PNG')
+    data, variants = upload(processor, png, 'avatar.jpg')  # a PNG renamed .jpg is still an image
+    assert data == png and len(variants) == len(AVATAR_SIZES) * len(AVATAR_FORMATS)
+
+    with pytest.raises(ValueError):
+        upload(processor, b'<?php echo "not an image"; ?>', 'avatar.png')  # text renamed .png
+
+
+def test_uploads_over_the_size_limit_are_not_decoded(processor):
+    assert upload(processor, image_bytes('PNG'), 'avatar.png', max_bytes=100) is None
@@ -0,0 +1,82 @@
+import asyncio
+import io
+import pytest
+from fastapi import UploadFile
+from app.config import Config
+from app.errors import FileTooLarge
+from app.storage.azure import AzureBlobStorage
+
+pytest.importorskip('azure.storage.blob')
+
+
+class FakeBlobClient:
+    def __init__(self, container: 'FakeContainer', name: str):
+        self.container = container
+        self.name = name
+        self.url = f"https://account.blob.core.windows.net/container/{name}"
+
+    async def upload_blob(self, data: bytes, overwrite: bool = False, content_settings=None):
+        self.container.blobs[self.name] = (data, content_settings.content_type)
+
+    async def stage_block(self, block_id: str, data: bytes):
+        self.container.staging += 1
+        self.container.max_staging = max(self.container.max_staging, self.container.staging)
+        await asyncio.sleep(0.001)  # a round trip, so blocks overlap
+        self.container.blocks[(self.name, block_id)] = data
+        self.container.staging -= 1
+
+    async def commit_block_list(self, blocks: list, content_settings=None):
+        data = b''.join(self.container.blocks.pop((self.name, block.id)) for block in blocks)
+        self.container.blobs[self.name] = (data, content_settings.content_type)
+
+
+class FakeContainer:
+    """In-memory stand-in for the aio ContainerClient: committed blobs plus uncommitted (staged) blocks."""
+
+    def __init__(self):
+        self.blobs = {}
+        self.blocks = {}
+        self.staging = self.max_staging = 0
+
+    def get_blob_client(self, name: str) -> FakeBlobClient:
+        return FakeBlobClient(self, name)
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setattr(Config, 'BLOB_BLOCK_SIZE', 1024)
+    monkeypatch.setattr(Config, 'BLOB_MAX_CONCURRENCY', 3)
+    storage = AzureBlobStorage()
+    storage._container = FakeContainer()
+    return storage
+
+
+def upload_file(data: bytes, size=None) -> UploadFile:
+    return UploadFile(io.BytesIO(data), size=size, headers={'content-type': 'image/png'})
+
+
+def test_small_upload_is_a_single_request(storage):
+    url = asyncio.run(storage.upload_stream('avatars/a.png', upload_file(b'x' * 1000), max_size=10_000))
+
+    assert url.endswith('/avatars/a.png')
+    assert storage._container.blobs['avatars/a.png'] == (b'x' * 1000, 'image/png')
+    assert storage._container.max_staging == 0
+
+
+def test_large_upload_is_staged_in_parallel_blocks(storage):
+    data = bytes(range(256)) * 40  # 10 blocks
+
+    asyncio.run(storage.upload_stream('avatars/a.png', upload_file(data), max_size=20_000))
+
+    assert storage._container.blobs['avatars/a.png'] == (data, 'image/png')  # blocks committed in order
+    assert 1 < storage._container.max_staging <= Config.BLOB_MAX_CONCURRENCY
+    assert not storage._container.blocks
+
+
+@pytest.mark.parametrize('size', [None, 10_240])  # streamed without a size, or announced by the multipart part
+def test_too_large_upload_keeps_the_existing_blob(storage, size):
+    storage._container.blobs['avatars/a.png'] = (b'old', 'image/png')
+
+    with pytest.raises(FileTooLarge):
+        asyncio.run(storage.upload_stream('avatars/a.png', upload_file(b'x' * 10_240, size), max_size=5000))
+    assert storage._container.blobs['avatars/a.png'] == (b'old', 'image/png')
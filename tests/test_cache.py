@@ -0,0 +1,34 @@
+import asyncio
+import json
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+from app.cache import LRUCache, apply_invalidation
+from app.jobs.service import JobService, liked_jobs_cache
+
+
+def test_values_loaded_before_an_invalidation_are_not_stored():
+    cache = LRUCache()
+    generation = cache.generation
+    cache.invalidate('other key')  # e.g. NOTIFY of another worker while the value was loaded
+    cache.set('key', 'stale', generation)
+    assert cache.get('key') is None
+
+    generation = cache.generation
+    cache.set('key', 'fresh', generation)
+    assert cache.get('key') == 'fresh'
+    cache.clear()
+    cache.set('key', 'stale', generation)
+    assert cache.get('key') is None
+    cache.set('key', 'unconditional')
+    assert cache.get('key') == 'unconditional'
+
+
+def test_liked_set_loaded_while_a_like_commits_is_not_cached():
+    class Session:
+        """Another worker's like commits and its invalidation arrives while the liked set is loaded."""
+        async def execute(self, statement):
+            apply_invalidation(json.dumps({"cache": "liked_jobs", "key": "user"}))
+            return IteratorResult(SimpleResultMetaData(['job_id']), iter([('job',)]))
+
+    liked_jobs_cache.clear()
+    assert asyncio.run(JobService().liked_job_uids('user', Session())) == {'job'}
+    assert liked_jobs_cache.get('user') is None  # the next request loads the set with the new like
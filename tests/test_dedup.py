@@ -0,0 +1,121 @@
+import asyncio
+import random
+import uuid
+import numpy as np
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+from app.jobs.dedup import (DUPLICATE_THRESHOLD, MAX_BUCKET_REPRESENTATIVES, DedupService, _union_bucket, band_buckets,
+                            minhash, similarity)
+
+
+def posting(seed: int, words: int = 200) -> str:
+    rng = random.Random(seed)
+    return " ".join(f"word{rng.randrange(5000)}" for _ in range(words))
+
+
+def edited(text: str, every: int) -> str:
+    """The text with every n-th word replaced."""
+    return " ".join("edited" if i % every == 0 else word for i, word in enumerate(text.split()))
+
+
+def test_near_duplicates_reach_the_threshold():
+    description = posting(1)
+    signature = minhash("Backend developer", description)
+
+    assert similarity(signature, minhash("Backend developer", description)) == 1.0
+    repost = minhash("Backend developer", edited(description, 100))  # two words changed
+    assert similarity(signature, repost) >= DUPLICATE_THRESHOLD
+    assert set(band_buckets(signature)) & set(band_buckets(repost))  # found as a candidate
+
+
+def test_different_postings_stay_below_the_threshold():
+    description = posting(1)
+    signature = minhash("Backend developer", description)
+
+    assert similarity(signature, minhash("Backend developer", edited(description, 8))) < DUPLICATE_THRESHOLD
+    unrelated = minhash("Graphic designer", posting(2))
+    assert similarity(signature, unrelated) < 0.1
+    assert not set(band_buckets(signature)) & set(band_buckets(unrelated))
+
+
+def clusters(members: list) -> list:
+    parent = {}
+
+    def find(job_uid):
+        parent.setdefault(job_uid, job_uid)
+        while parent[job_uid] != job_uid:
+            job_uid = parent[job_uid]
+        return job_uid
+
+    _union_bucket(members, find, parent)
+    groups = {}
+    for job_uid, _ in members:
+        groups.setdefault(find(job_uid), set()).add(job_uid)
+    return sorted(groups.values(), key=min)
+
+
+def test_bucket_members_are_grouped_by_verified_similarity():
+    first, second = posting(1), posting(2)
+    members = [
+        ("a1", minhash("Developer", first)),
+        ("b1", minhash("Designer", second)),
+        ("a2", minhash("Developer", edited(first, 100))),
+        ("c1", minhash("Developer", edited(first, 4))),  # shares the bucket, but isn't similar enough
+        ("b2", minhash("Designer", edited(second, 100))),
+    ]
+    assert clusters(members) == [{"a1", "a2"}, {"b1", "b2"}, {"c1"}]
+
+
+def test_large_buckets_compare_with_the_representatives():
+    members = [(f"job{i}", minhash("Developer", posting(i))) for i in range(MAX_BUCKET_REPRESENTATIVES * 2)]
+    members.append(("repost", minhash("Developer", edited(posting(0), 100))))
+
+    groups = clusters(members)
+    assert {"job0", "repost"} in groups  # the first jobs of a bucket are its representatives
+    assert len(groups) == len(members) - 1
+
+
+def shingle_jaccard(text: str, other: str) -> float:
+    shingles = [{" ".join(words[i:i + 5]) for i in range(len(words) - 4)} for words in (text.split(), other.split())]
+    return len(shingles[0] & shingles[1]) / len(shingles[0] | shingles[1])
+
+
+def test_signatures_estimate_the_jaccard_similarity():
+    errors = []
+    for seed in range(50):
+        description = posting(seed)
+        for every in (100, 20, 8):
+            repost = edited(description, every)
+            estimate = similarity(minhash("", description), minhash("", repost))
+            errors.append(estimate - shingle_jaccard(description, repost))
+    assert abs(np.mean(errors)) < 0.02  # unbiased
+    assert np.max(np.abs(errors)) < 0.2  # ~0.04 standard error with 128 permutations
+
+
+class CandidatesSession:
+    """Answers find_original's query with the given (signature, uid, duplicate_of) candidates."""
+
+    def __init__(self, candidates: list):
+        self.candidates = candidates
+
+    async def execute(self, statement):
+        return IteratorResult(SimpleResultMetaData(['signature', 'uid', 'duplicate_of']), iter(self.candidates))
+
+
+def find_original(job_uid, signature, candidates: list):
+    session = CandidatesSession(candidates)
+    return asyncio.run(DedupService().find_original(job_uid, signature, band_buckets(signature), session))
+
+
+def test_updated_original_is_not_flagged_as_duplicate_of_itself():
+    description = posting(1)
+    original, repost, other = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    signature = minhash("Backend developer", description)
+    repost_signature = minhash("Backend developer", edited(description, 100)).tobytes()
+
+    # the original is updated: its repost, flagged as its duplicate, is the only candidate
+    assert find_original(original, signature, [(repost_signature, repost, original)]) is None
+    # an older original of another cluster still counts
+    candidates = [(repost_signature, repost, original), (signature.tobytes(), other, None)]
+    assert find_original(original, signature, candidates) == other
+    # a new repost is flagged as duplicate of the cluster's original
+    assert find_original(uuid.uuid4(), signature, [(repost_signature, repost, original)]) == original
@@ -0,0 +1,65 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+from app import app
+from app.db.main import get_session
+from app.etag import make_etag, not_modified
+from app.jobs.routes import access_token_bearer, job_service
+
+
+def request_with(if_none_match: str = None) -> Request:
+    headers = [(b'if-none-match', if_none_match.encode())] if if_none_match else []
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': headers})
+
+
+def test_etag_depends_on_every_part():
+    etag = make_etag('jobs', 'user', 3, '2025-07-01')
+
+    assert etag.startswith('W/"') and etag == make_etag('jobs', 'user', 3, '2025-07-01')
+    assert etag != make_etag('jobs', 'user', 4, '2025-07-01')
+    assert etag != make_etag('jobs', 'other user', 3, '2025-07-01')
+
+
+@pytest.mark.parametrize('if_none_match', ['W/"abc"', '"abc"', 'W/"old", W/"abc"', '*'])
+def test_matching_etag_is_not_modified(if_none_match):
+    response = not_modified(request_with(if_none_match), 'W/"abc"')
+
+    assert response.status_code == 304 and response.headers['ETag'] == 'W/"abc"'
+    assert response.body == b''
+
+
+@pytest.mark.parametrize('if_none_match', [None, 'W/"old"', 'W/"abcd"'])
+def test_other_etags_are_answered(if_none_match):
+    assert not_modified(request_with(if_none_match), 'W/"abc"') is None
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The job feed route with a fixed version and feed instead of the database."""
+    feed = {'version': (2, '2025-07-01T10:00:00')}
+
+    async def active_jobs_version(session):
+        return feed['version']
+
+    async def get_all_jobs(user_id, session, fields=None):
+        return [{'_id': 'job', 'title': 'Developer'}]
+
+    monkeypatch.setattr(job_service, 'active_jobs_version', active_jobs_version)
+    monkeypatch.setattr(job_service, 'get_all_jobs', get_all_jobs)
+    app.dependency_overrides[access_token_bearer] = lambda: {'id': 'user'}
+    app.dependency_overrides[get_session] = lambda: None
+    yield TestClient(app), feed
+    app.dependency_overrides.clear()
+
+
+def test_job_feed_answers_304_until_it_changes(client):
+    client, feed = client
+    first = client.get('/jobs/job')
+    assert first.status_code == 200 and first.json()
+
+    unchanged = client.get('/jobs/job', headers={'If-None-Match': first.headers['ETag']})
+    assert unchanged.status_code == 304 and unchanged.content == b''
+
+    feed['version'] = (3, '2025-07-01T11:00:00')  # a job was added
+    changed = client.get('/jobs/job', headers={'If-None-Match': first.headers['ETag']})
+    assert changed.status_code == 200 and changed.headers['ETag'] != first.headers['ETag']
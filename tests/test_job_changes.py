@@ -0,0 +1,40 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+from app.jobs import service
+from app.jobs.service import JobService, facet_cache, job_detail_cache
+
+
+class Session:
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, statement, parameters=None):
+        self.calls.append(('execute', parameters))
+
+    async def commit(self):
+        self.calls.append(('commit', None))
+
+
+def test_jobs_changed_notifies_before_the_commit_and_clears_after(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(service.similarity_index, 'record_upsert', lambda *job: recorded.append(('upsert', job[0])))
+    monkeypatch.setattr(service.similarity_index, 'record_removal', lambda job_uid: recorded.append(('removal', job_uid)))
+    monkeypatch.setattr(service.leaderboard, 'remove', lambda job_uid: recorded.append(('leaderboard', job_uid)))
+    updated = SimpleNamespace(uid=uuid.uuid4(), title='Developer', description='', category='Development')
+    removed = uuid.uuid4()
+    facet_cache.set('python', {'category': {}})
+    job_detail_cache.set(str(updated.uid), 'detail')
+    session = Session()
+
+    asyncio.run(JobService.jobs_changed(session, upserted=[updated], removed=[removed]))
+    assert [call for call, _ in session.calls] == ['execute', 'commit']
+    assert '"facets"' in session.calls[0][1]['payload']  # pg_notify, delivered with the commit
+    assert facet_cache.get('python') is None and job_detail_cache.get(str(updated.uid)) is None
+    assert recorded == [('upsert', updated.uid), ('removal', removed), ('leaderboard', removed)]
+
+
+def test_nothing_to_propagate_only_commits():
+    session = Session()
+    asyncio.run(JobService.jobs_changed(session, removed=[]))
+    assert session.calls == [('commit', None)]
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import io
+import os
+import pytest
+from fastapi import FastAPI, Request, UploadFile
+from fastapi.testclient import TestClient
+from app.config import Config
+from app.errors import FileTooLarge, register_all_errors
+from app.storage import responses, routes
+from app.storage.local import LocalBlobStorage
+from app.storage.responses import blob_response, parse_range
+from app.storage.routes import is_public, storage_router
+
+CONTENT = bytes(range(256)) * 4  # 1024 bytes
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'BLOB_BLOCK_SIZE', 100)
+    return LocalBlobStorage(str(tmp_path), '/files')
+
+
+def objects(storage: LocalBlobStorage) -> list:
+    return [name for _, _, names in os.walk(storage._objects) for name in names]
+
+
+def upload(storage: LocalBlobStorage, name: str, data: bytes):
+    return asyncio.run(storage.upload(name, data))
+
+
+def read(storage: LocalBlobStorage, name: str, offset: int = 0, length: int = None) -> bytes:
+    async def chunks():
+        return b''.join([chunk async for chunk in storage.stream(name, offset, length)])
+    return asyncio.run(chunks())
+
+
+def test_identical_content_is_stored_once_until_its_last_name_is_deleted(storage):
+    assert upload(storage, 'attachments/a/1', CONTENT) == '/files/attachments/a/1'
+    upload(storage, 'attachments/a/2', CONTENT)
+
+    assert len(objects(storage)) == 1
+    assert os.stat(storage.path('attachments/a/1')).st_ino == os.stat(storage.path('attachments/a/2')).st_ino
+    assert storage._orphaned_object(storage.path('attachments/a/1')) is None  # shared by both names
+
+    assert asyncio.run(storage.delete('attachments/a/1'))
+    assert len(objects(storage)) == 1 and read(storage, 'attachments/a/2') == CONTENT
+    assert storage._orphaned_object(storage.path('attachments/a/2')) == storage._object_path(
+        hashlib.sha256(CONTENT).hexdigest())  # the only name left
+    assert asyncio.run(storage.delete('attachments/a/2'))
+    assert objects(storage) == []
+    assert not asyncio.run(storage.delete('attachments/a/2'))  # already gone
+
+
+def test_overwriting_a_name_releases_its_previous_content(storage):
+    upload(storage, 'profile_pictures/u/avatar', b'old')
+    upload(storage, 'profile_pictures/u/avatar', b'new')
+
+    assert read(storage, 'profile_pictures/u/avatar') == b'new'
+    assert len(objects(storage)) == 1
+    assert os.listdir(storage._tmp) == []  # written to tmp/ and renamed into place
+
+
+def test_rejected_upload_keeps_the_previous_blob(storage):
+    upload(storage, 'attachments/a/1', b'previous')
+    too_large = UploadFile(io.BytesIO(CONTENT), size=None)
+
+    with pytest.raises(FileTooLarge):
+        asyncio.run(storage.upload_stream('attachments/a/1', too_large, max_size=500))
+    assert read(storage, 'attachments/a/1') == b'previous'
+    assert os.listdir(storage._tmp) == []
+
+
+def test_streamed_upload_and_ranges(storage):
+    asyncio.run(storage.upload_stream('attachments/a/1', UploadFile(io.BytesIO(CONTENT)), max_size=len(CONTENT)))
+
+    assert read(storage, 'attachments/a/1') == CONTENT
+    assert read(storage, 'attachments/a/1', 250, 300) == CONTENT[250:550]  # across several blocks
+
+
+@pytest.mark.parametrize('name', ['../outside', 'attachments/../../outside', '/etc/passwd', ''])
+def test_names_outside_of_the_storage_directory_are_rejected(storage, name):
+    assert storage.path(name) is None
+    with pytest.raises(ValueError):
+        upload(storage, name, b'data')
+    with pytest.raises(FileNotFoundError):
+        read(storage, name)
+    assert not asyncio.run(storage.delete(name))
+    assert asyncio.run(storage.delete_many([name])) == 0
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('bytes=0-99', (0, 99)),
+    ('bytes=1000-', (1000, 1023)),  # open ended
+    ('bytes=1000-5000', (1000, 1023)),  # end beyond the size
+    ('bytes=-100', (924, 1023)),  # suffix: the last 100 bytes
+    ('bytes=-5000', (0, 1023)),  # suffix longer than the content
+    ('bytes=0-1,5-6', None),  # several ranges: the whole content
+    ('bytes=-', None),
+    ('bytes=99-0', None),  # last before first
+    ('items=0-99', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1024) == expected
+
+
+@pytest.mark.parametrize('header, size', [('bytes=1024-', 1024), ('bytes=2000-3000', 1024), ('bytes=-0', 1024),
+                                          ('bytes=-10', 0), ('bytes=0-', 0)])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+
+@pytest.fixture
+def client(storage, monkeypatch):
+    """A route serving attachments/a/1 with blob_response."""
+    monkeypatch.setattr(responses, 'storage', storage)
+    upload(storage, 'attachments/a/1', CONTENT)
+    app = FastAPI()
+
+    @app.get('/cv')
+    async def cv(request: Request):
+        return blob_response(request, 'attachments/a/1', len(CONTENT), 'application/pdf', '"v1"', 'cv 1.pdf')
+
+    return TestClient(app)
+
+
+def test_blob_response_serves_ranges(client):
+    whole = client.get('/cv')
+    assert whole.status_code == 200 and whole.content == CONTENT
+    assert whole.headers['Accept-Ranges'] == 'bytes'
+    assert whole.headers['Content-Disposition'] == "attachment; filename*=UTF-8''cv%201.pdf"
+
+    part = client.get('/cv', headers={'Range': 'bytes=-24'})
+    assert part.status_code == 206 and part.content == CONTENT[-24:]
+    assert part.headers['Content-Range'] == 'bytes 1000-1023/1024' and part.headers['Content-Length'] == '24'
+
+    unsatisfiable = client.get('/cv', headers={'Range': 'bytes=1024-'})
+    assert unsatisfiable.status_code == 416 and unsatisfiable.headers['Content-Range'] == 'bytes */1024'
+
+
+def test_blob_response_ignores_ranges_of_another_version(client):
+    current = client.get('/cv', headers={'Range': 'bytes=0-9', 'If-Range': '"v1"'})
+    assert current.status_code == 206 and current.content == CONTENT[:10]
+
+    changed = client.get('/cv', headers={'Range': 'bytes=0-9', 'If-Range': '"v0"'})
+    assert changed.status_code == 200 and changed.content == CONTENT
+
+
+def test_only_avatars_are_served_without_authentication(storage, monkeypatch):
+    monkeypatch.setattr(routes, 'storage', storage)
+    upload(storage, 'profile_pictures/u/1/64.webp', b'avatar')
+    upload(storage, 'attachments/a/1', b'cv')
+    app = FastAPI()
+    app.include_router(storage_router, prefix='/files')
+    register_all_errors(app)
+    client = TestClient(app)
+
+    assert client.get('/files/profile_pictures/u/1/64.webp').content == b'avatar'
+    assert client.get('/files/attachments/a/1').status_code == 404  # CVs only through their download endpoint
+    assert client.get('/files/profile_pictures/u/1/missing.webp').status_code == 404
+    assert not is_public('profile_pictures/../attachments/a/1')
+    assert not is_public('profile_pictures_copy/a')
@@ -0,0 +1,151 @@
+import re
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects.postgresql import asyncpg
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+from sqlmodel import select
+from app import app
+from app.applications.relevance import relevance_cache
+from app.auth.dependencies import get_current_user
+from app.db.instrumentation import RequestQueries, _after_cursor_execute, _before_cursor_execute, statement_shape
+from app.db.main import get_session
+from app.db.models import Notification
+from app.jobs.routes import access_token_bearer
+from app.jobs.service import liked_jobs_cache
+from app.notifications.routes import notification_service
+
+USER_UID = uuid.uuid4()
+JOB_UID = uuid.uuid4()
+UPDATED_AT = datetime(2025, 7, 1, 10)
+
+
+def rows(keys: list, *values) -> IteratorResult:
+    return IteratorResult(SimpleResultMetaData(keys), iter(values))
+
+
+class CountingSession:
+    """
+    Stands in for the database: every statement is compiled for asyncpg and passed through the engine hooks, which
+    count it against the route's query budget, then answered with the next of the given results.
+    """
+
+    def __init__(self, *results):
+        self.results = list(results)
+
+    async def execute(self, statement, *args, **kwargs):
+        sql = str(statement.compile(dialect=asyncpg.dialect(), compile_kwargs={'render_postcompile': True}))
+        context = SimpleNamespace()
+        _before_cursor_execute(None, None, sql, None, context, False)
+        _after_cursor_execute(None, None, sql, None, context, False)
+        return self.results.pop(0) if self.results else rows([])
+
+
+@pytest.fixture
+def client():
+    """Requests as a user whose session answers with the results put into `results`."""
+    results = []
+    app.dependency_overrides[get_session] = lambda: CountingSession(*results)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(uid=USER_UID, role='USER')
+    app.dependency_overrides[access_token_bearer] = lambda: {'id': str(USER_UID)}
+    liked_jobs_cache.clear()
+    relevance_cache.clear()
+    yield TestClient(app), results
+    app.dependency_overrides.clear()
+
+
+def statements(response) -> int:
+    """Statements of the request, from its Server-Timing header."""
+    return int(re.search(r'desc="(\d+) statements"', response.headers['Server-Timing']).group(1))
+
+
+def test_job_feed_budget(client):
+    client, results = client
+    results += [rows(['count', 'max'], (1, UPDATED_AT)),
+                rows(['uid', 'title'], (JOB_UID, 'Python developer')),
+                rows(['job_id'], (JOB_UID,))]
+
+    response = client.get('/jobs/job', params={'fields': 'title,isLiked'})
+    assert response.status_code == 200
+    assert response.json() == [{'_id': str(JOB_UID), 'title': 'Python developer', 'isLiked': True}]
+    assert statements(response) == 3
+    assert re.fullmatch(r'db;dur=\d+\.\d;desc="3 statements", app;dur=\d+\.\d', response.headers['Server-Timing'])
+
+
+def test_notifications_budget(client):
+    client, results = client
+    results += [rows(['count', 'max'], (1, UPDATED_AT)),
+                rows(['uid', 'message', 'is_read', 'created_at', 'job_id', 'application_id', 'sender_name'],
+                     (uuid.uuid4(), 'Your job offer was liked by ', False, UPDATED_AT, JOB_UID, None, 'jane'))]
+
+    response = client.get('/notification/notification')
+    assert response.status_code == 200 and response.json()[0]['message'] == 'Your job offer was liked by jane'
+    assert statements(response) == 2
+
+
+def test_my_applications_budget(client):
+    client, results = client
+    results += [rows(['uid', 'status', 'job_uid', 'title'], (uuid.uuid4(), 'PENDING', JOB_UID, 'Python developer')),
+                rows(['job_id'])]
+
+    response = client.get('/application/my-applications', params={'fields': 'status,job.title,job.isLiked'})
+    assert response.status_code == 200
+    assert response.json()[0]['job'] == {'_id': str(JOB_UID), 'title': 'Python developer', 'isLiked': False}
+    assert statements(response) == 2
+
+
+def test_applicants_budget(client):
+    client, results = client
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(uid=USER_UID, role='ORGANIZATION')
+    application_uid = uuid.uuid4()
+    results += [rows(['uid', 'author_uid', 'title', 'description', 'count', 'latest'],
+                     (JOB_UID, USER_UID, 'Python developer', 'FastAPI and PostgreSQL', 1, UPDATED_AT)),
+                rows(['uid', 'job_uid', 'status', 'coverLetter', 'appliedAt', 'user_uid', 'username', 'email',
+                      'firstName', 'lastName', 'attachment_name', 'attachment_size', 'attachment_type'],
+                     (application_uid, JOB_UID, 'PENDING', 'Python and FastAPI', UPDATED_AT, uuid.uuid4(), 'jane',
+                      'jane@example.com', 'Jane', None, None, None, None)),
+                rows(['uid', 'cover_letter_terms', 'cover_letter_length', 'letter'],
+                     (application_uid, None, None, 'Python and FastAPI'))]
+
+    response = client.get(f'/application/applicants/{JOB_UID}', params={'sort': 'relevance'})
+    assert response.status_code == 200 and response.json()[0]['relevance'] > 0
+    assert statements(response) == 3
+
+
+def test_exceeding_the_budget_fails_the_request(client, monkeypatch):
+    client, results = client
+
+    async def get_all_notifications(user_uid, session):  # an N+1 loop
+        for _ in range(3):
+            await session.execute(select(Notification.uid).where(Notification.recipient_uid == user_uid))
+        return []
+
+    monkeypatch.setattr(notification_service, 'get_all_notifications', get_all_notifications)
+    results.append(rows(['count', 'max'], (0, None)))
+
+    response = client.get('/notification/notification')
+    assert response.status_code == 500 and response.json()['error_code'] == 'query_budget_exceeded'
+
+
+def test_statement_shape_collapses_bind_parameters_and_in_lists():
+    two = "SELECT jobs.uid FROM jobs WHERE jobs.uid IN ($2::UUID, $3::UUID) AND jobs.title = $1::VARCHAR"
+    five = """SELECT jobs.uid
+              FROM jobs WHERE jobs.uid IN ($2::UUID, $3::UUID, $4::UUID, $5::UUID, $6::UUID) AND jobs.title = $1"""
+
+    assert statement_shape(two) == "SELECT jobs.uid FROM jobs WHERE jobs.uid IN (?) AND jobs.title = ?"
+    assert statement_shape(five) == statement_shape(two)
+    assert statement_shape("SELECT * FROM jobs WHERE uid = ANY($1::UUID[])") == "SELECT * FROM jobs WHERE uid = ANY(?)"
+
+
+def test_repeated_sums_the_executions_of_a_shape():
+    queries = RequestQueries()
+    queries.statements = {
+        "SELECT * FROM users WHERE users.uid = $1::UUID": 3,
+        "SELECT *\n  FROM users WHERE users.uid = $1": 2,
+        "SELECT * FROM jobs": 4,
+    }
+
+    assert queries.repeated(5) == [("SELECT * FROM users WHERE users.uid = ?", 5)]
+    assert queries.repeated(6) == []
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from app.recommendations import build
+from app.recommendations.build import column_norms, top_neighbours
+
+
+def interaction_matrix(seed: int, users: int = 60, jobs: int = 40, density: float = 0.1) -> sp.csr_matrix:
+    """Random likes (1) and applications (2) of users, liked and applied sum to 3 like in load_interactions."""
+    rng = np.random.default_rng(seed)
+    weights = rng.choice([0, 1, 2, 3], size=(users, jobs), p=[1 - density, density / 2, density / 3, density / 6])
+    return sp.csr_matrix(weights.astype(np.float32))
+
+
+def neighbours(matrix: sp.csr_matrix, items, norms=None) -> dict:
+    """{item: [(neighbour, score)] best first} of top_neighbours."""
+    result = {}
+    for chunk, row, col, scores in top_neighbours(matrix, np.asarray(items, dtype=np.int64), norms):
+        for i, item in enumerate(chunk):
+            result[int(item)] = [(int(c), float(s)) for c, s in zip(col[row == i], scores[row == i])]
+    return result
+
+
+def cosine(matrix: sp.csr_matrix) -> np.ndarray:
+    dense = matrix.toarray().astype(np.float64)
+    norms = np.linalg.norm(dense, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return dense.T @ dense / np.outer(norms, norms)
+
+
+def test_scores_are_the_cosine_of_the_job_columns():
+    matrix = interaction_matrix(1)
+    similarity = cosine(matrix)
+
+    for item, ranked in neighbours(matrix, range(matrix.shape[1])).items():
+        assert item not in [neighbour for neighbour, _ in ranked]  # never the job itself
+        for neighbour, score in ranked:
+            assert score == pytest.approx(similarity[item, neighbour], rel=1e-5)
+        scores = [score for _, score in ranked]
+        assert scores == sorted(scores, reverse=True)
+        co_occurring = np.count_nonzero(np.nan_to_num(similarity[item]) > 0) - (similarity[item, item] > 0)
+        assert len(ranked) == co_occurring  # fewer co-occurring jobs than NEIGHBOURS_PER_JOB
+
+
+def test_only_the_best_neighbours_are_kept(monkeypatch):
+    monkeypatch.setattr(build, 'NEIGHBOURS_PER_JOB', 3)
+    monkeypatch.setattr(build, 'ITEM_CHUNK_SIZE', 7)  # rows of several chunks
+    matrix = interaction_matrix(2, density=0.4)
+    similarity = np.nan_to_num(cosine(matrix))
+    np.fill_diagonal(similarity, 0)
+
+    for item, ranked in neighbours(matrix, range(matrix.shape[1])).items():
+        assert len(ranked) == 3
+        best = np.sort(similarity[item])[::-1][:3]
+        assert [score for _, score in ranked] == pytest.approx(best, rel=1e-5)
+
+
+def test_users_of_the_items_with_complete_norms_give_the_same_neighbours():
+    """What an incremental run loads: only the users of the recomputed jobs, the norms of every job."""
+    matrix = interaction_matrix(3, users=200, jobs=80, density=0.03)
+    items = [0, 5, 17]
+    users = np.unique(matrix[:, items].nonzero()[0])
+
+    restricted = neighbours(matrix[users], items, norms=column_norms(matrix))
+    for item, ranked in neighbours(matrix, items).items():
+        assert dict(restricted[item]) == pytest.approx(dict(ranked))
+    without_norms = neighbours(matrix[users], items)  # the restricted matrix lacks interactions with the neighbours
+    assert any(dict(without_norms[item]) != pytest.approx(dict(ranked)) for item, ranked in restricted.items())
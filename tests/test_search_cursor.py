@@ -0,0 +1,47 @@
+import uuid
+from datetime import datetime
+import pytest
+from app.errors import InvalidCursor
+from app.jobs.utils import encode_cursor, decode_cursor
+
+
+def keyset_pages(rows: list, limit: int) -> list:
+    """Page through (rank, uid) rows the way search_jobs does: ORDER BY rank DESC, uid DESC, (rank, uid) < cursor."""
+    ordered = sorted(rows, reverse=True)
+    pages, cursor = [], None
+    while True:
+        if cursor is None:
+            candidates = ordered
+        else:
+            last_rank, last_uid, _ = decode_cursor(cursor)
+            candidates = [row for row in ordered if row < (last_rank, last_uid)]
+        page = candidates[:limit + 1]
+        if len(page) <= limit:
+            pages.append(page)
+            return pages
+        page = page[:limit]
+        pages.append(page)
+        cursor = encode_cursor(page[-1][0], page[-1][1], datetime(2025, 1, 1))
+
+
+def test_cursor_round_trip():
+    job_uid, as_of = uuid.uuid4(), datetime(2025, 6, 1, 12, 30, 15, 123456)
+    rank = 0.1 + 0.2  # not representable in a few digits, must survive exactly
+
+    assert decode_cursor(encode_cursor(rank, job_uid, as_of)) == (rank, job_uid, as_of)
+
+
+def test_pages_are_stable_with_tied_ranks():
+    ranks = [0.5, 0.25, 1 / 3, 0.1 + 0.2] * 13  # many ties, the uid breaks them
+    rows = [(rank, uuid.uuid4()) for rank in ranks]
+
+    for limit in (1, 5, 7, len(rows)):
+        pages = keyset_pages(rows, limit)
+        assert [row for page in pages for row in page] == sorted(rows, reverse=True)  # no row skipped or repeated
+        assert all(len(page) == limit for page in pages[:-1])
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', 'bm90IGpzb24=', encode_cursor(1.0, uuid.uuid4(), datetime.utcnow())[:-4]])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
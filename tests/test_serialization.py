@@ -0,0 +1,34 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from app.jobs.schemas import JobResponseModel
+from app.notifications.schemas import NotificationResponseModel
+
+
+async def encode(response_model, content: list) -> list:
+    """The body of a route declaring response_model and response_model_exclude_unset, as the client gets it."""
+    field = create_model_field(name="response", type_=response_model, mode="serialization")
+    serialized = await serialize_response(field=field, response_content=content, exclude_unset=True, is_coroutine=True)
+    return json.loads(ORJSONResponse(serialized).body)
+
+
+def test_response_models_keep_the_dict_keys():
+    jobs = [
+        {"_id": str(uuid.uuid4()), "title": "Developer", "description": None, "type": "Full-time", "likes": 2,
+         "category": "Development", "isActive": True, "authorName": "org", "isLiked": False},
+        {"_id": str(uuid.uuid4()), "title": "Designer"},  # ?fields=title
+    ]
+    notifications = [
+        {"notification_id": str(uuid.uuid4()), "sender_name": "user", "message": "user liked your job",
+         "is_read": False, "created_at": datetime(2025, 7, 1, 9, 30), "job_id": str(uuid.uuid4()),
+         "application_id": None},
+    ]
+
+    assert asyncio.run(encode(List[JobResponseModel], jobs)) == jsonable_encoder(jobs)
+    assert asyncio.run(encode(List[NotificationResponseModel], notifications)) == jsonable_encoder(notifications)
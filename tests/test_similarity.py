@@ -0,0 +1,79 @@
+import asyncio
+import os
+import uuid
+from types import SimpleNamespace
+from app.jobs.similarity import SimilarityIndex, SnapshotLock, build_arrays, job_features, write_snapshot
+
+JOBS = [
+    ("Python backend developer", "Build REST APIs with FastAPI and PostgreSQL", "Development"),
+    ("Senior Python developer", "FastAPI services, PostgreSQL and async Python", "Development"),
+    ("Graphic designer", "Design logos, brochures and social media visuals", "Design"),
+    ("Accountant", "Monthly closing, invoices and payroll", "Finance"),
+]
+
+
+def job(title: str, description: str, category: str) -> SimpleNamespace:
+    return SimpleNamespace(uid=uuid.uuid4(), title=title, description=description, category=category)
+
+
+def snapshot(directory: str, jobs: list) -> str:
+    arrays = build_arrays([(job.uid.bytes, *job_features(job.title, job.description, job.category)) for job in jobs])
+    with SnapshotLock(directory):
+        return write_snapshot(directory, arrays)
+
+
+def similar(directory: str, job: SimpleNamespace, k: int = 3) -> list:
+    """Query a fresh index, like a worker starting on the directory."""
+    return asyncio.run(SimilarityIndex(directory).similar(job, k, session=None))
+
+
+def test_snapshot_round_trip(tmp_path):
+    directory = str(tmp_path)
+    jobs = [job(*fields) for fields in JOBS]
+    snapshot(directory, jobs)
+
+    results = similar(directory, jobs[0])
+    assert [job_uid for job_uid, _ in results][:1] == [str(jobs[1].uid)]  # the other Python job first
+    assert str(jobs[0].uid) not in [job_uid for job_uid, _ in results]  # never the job itself
+    assert all(0 < score <= 1 for _, score in results)
+    assert similar(directory, jobs[0]) == results  # every load of the snapshot answers the same
+
+
+def test_persisted_changes_are_seen_by_other_workers(tmp_path):
+    directory = str(tmp_path)
+    jobs = [job(*fields) for fields in JOBS]
+    first = snapshot(directory, jobs)
+    new_job = job("Python developer", "FastAPI and PostgreSQL backend services", "Development")
+
+    async def change():
+        index = SimilarityIndex(directory)
+        await index.ensure_loaded(session=None)
+        index.record_upsert(new_job.uid, new_job.title, new_job.description, new_job.category)
+        index.record_removal(jobs[1].uid)
+        await index.persist()
+        assert not index._changes  # everything recorded before the persist is in the snapshot
+
+    asyncio.run(change())
+    results = [job_uid for job_uid, _ in similar(directory, jobs[0])]
+    assert results[0] == str(new_job.uid)
+    assert str(jobs[1].uid) not in results
+
+    asyncio.run(change())  # a third version: the first one is removed, the previous one kept as a spare
+    versions = sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+    assert len(versions) == 2 and first not in versions
+
+
+def test_changes_of_a_worker_which_never_loaded_the_index_are_persisted(tmp_path):
+    directory = str(tmp_path)
+    jobs = [job(*fields) for fields in JOBS]
+    snapshot(directory, jobs)
+    new_job = job("Python developer", "FastAPI and PostgreSQL backend services", "Development")
+
+    async def change_and_close():
+        index = SimilarityIndex(directory)  # never served /similar, so never loaded
+        index.record_upsert(new_job.uid, new_job.title, new_job.description, new_job.category)
+        await index.close()
+        assert index.loaded and not index._changes
+
+    asyncio.run(change_and_close())
+    assert [job_uid for job_uid, _ in similar(directory, jobs[0])][0] == str(new_job.uid)
@@ -0,0 +1,16 @@
+import sqlalchemy.dialects.postgresql as pg
+from app.db.models import Jobs
+from app.jobs.service import JobService
+
+
+def test_prefix_wildcards_are_escaped():
+    compiled = JobService.suggest_statement(Jobs.title, '50%_off\\', 8).compile(dialect=pg.dialect())
+
+    assert '50\\%\\_off\\\\%' in compiled.params.values()  # only the trailing % is a wildcard
+    assert '50%_off\\' in compiled.params.values()  # the trigram match gets the prefix as typed
+
+
+def test_suggestions_are_served_by_the_trigram_operators():
+    sql = str(JobService.suggest_statement(Jobs.title, 'dev', 8).compile(dialect=pg.dialect()))
+
+    assert 'ILIKE' in sql and '%>' in sql and 'jobs.is_active' in sql  # the partial GIN index's predicate
@@ -0,0 +1,74 @@
+import math
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine, event, literal, select
+from app.config import Settings
+from app.jobs.trending import (LIKE_WEIGHT, NO_SCORE, TrendingLeaderboard, decayed_score, log_add, log_subtract,
+                               log_weight)
+
+
+@pytest.fixture(scope='module')
+def database():
+    """SQLite with the PostgreSQL functions the score expressions use, to evaluate them as they are compiled."""
+    engine = create_engine('sqlite://')
+
+    @event.listens_for(engine, 'connect')
+    def register_functions(connection: sqlite3.Connection, _):
+        connection.create_function('greatest', 2, max)
+        connection.create_function('least', 2, min)
+        connection.create_function('power', 2, math.pow)
+        connection.create_function('ln', 1, math.log)
+
+    with engine.connect() as connection:
+        yield connection
+
+
+def evaluate(database, expression) -> float:
+    return database.execute(select(expression)).scalar_one()
+
+
+def test_scores_never_overflow(database):
+    half_life_hours = 1  # an event ten years after the epoch weighs 2 ^ 87600
+    liked_at = datetime(2035, 1, 1)
+    score = NO_SCORE
+    for at in (liked_at - timedelta(hours=2), liked_at - timedelta(hours=1), liked_at):
+        score = evaluate(database, log_add(literal(score), log_weight(LIKE_WEIGHT, at, half_life_hours)))
+
+    now = liked_at + timedelta(hours=1)
+    decayed = 2 ** (score - log_weight(1, now, half_life_hours))
+    assert decayed == pytest.approx(0.25 + 0.5 + 1 / 8)  # each like halved once per hour
+
+
+def test_unlike_takes_back_the_weight_of_the_like(database):
+    first, second = log_weight(LIKE_WEIGHT, datetime(2025, 6, 1)), log_weight(LIKE_WEIGHT, datetime(2025, 6, 2))
+    both = evaluate(database, log_add(log_add(literal(NO_SCORE), first), second))
+
+    only_second = evaluate(database, log_subtract(literal(both), first))
+    assert only_second == pytest.approx(second)
+    assert evaluate(database, log_subtract(literal(only_second), second)) == NO_SCORE
+    assert evaluate(database, log_subtract(literal(NO_SCORE), second)) == NO_SCORE  # nothing to take back
+
+
+def test_old_events_underflow_to_nothing(database):
+    old, new = log_weight(LIKE_WEIGHT, datetime(2025, 1, 1), 1), log_weight(LIKE_WEIGHT, datetime(2026, 1, 1), 1)
+
+    assert evaluate(database, log_add(literal(new), old)) == pytest.approx(new)
+    assert decayed_score(NO_SCORE, datetime.utcnow()) == 0
+
+
+def test_leaderboard_drops_jobs_without_score():
+    board = TrendingLeaderboard(size=2)
+    board.update('a', 3.0)
+    board.update('b', 2.0)
+    board.update('c', 1.0)  # not in the top 2
+    board.update('a', NO_SCORE)
+
+    assert board._scores == {'b': 2.0}
+
+
+@pytest.mark.parametrize('half_life', [0, -72])
+def test_half_life_must_be_positive(half_life):
+    with pytest.raises(ValidationError):
+        Settings(TRENDING_HALF_LIFE_HOURS=half_life)